@@ -0,0 +1,206 @@
+"""
+Generates a synthetic database with the same layout as data/ and stores/, for benchmarking
+The output only depends on the arguments, so the same arguments always give the same files
+"""
+import json
+import os
+import random
+import sys
+from io import BytesIO
+from pathlib import Path
+from typing import Union
+
+PathLike = Union[str, os.PathLike[str]]
+
+MATERIALS = ["PLA", "PETG", "ABS", "ASA", "TPU", "PA", "PC", "PVB", "PP", "HIPS"]
+COUNTRIES = ["CZ", "DE", "DK", "US", "CN", "NL", "GB", "FR", "SE", "PL"]
+COLOR_WORDS = ["Red", "Blue", "Green", "Black", "White", "Grey", "Orange", "Yellow", "Purple", "Pink",
+               "Silver", "Gold", "Brown", "Teal", "Navy", "Olive"]
+TRAITS = ["translucent", "glow", "matte", "recycled", "recyclable", "biodegradable"]
+LOGO_SIZE = 128
+
+# How many of each child each parent has
+MATERIALS_PER_BRAND = 4
+FILAMENTS_PER_MATERIAL = 5
+VARIANTS_PER_FILAMENT = 10
+
+
+def write_json(path: Path, data):
+    with path.open(mode="w", encoding="utf8") as f:
+        json.dump(data, f, indent=4)
+
+
+def make_png_logo() -> bytes:
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", (LOGO_SIZE, LOGO_SIZE), (32, 96, 160)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_svg_logo() -> bytes:
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{LOGO_SIZE}" height="{LOGO_SIZE}" '
+            f'viewBox="0 0 {LOGO_SIZE} {LOGO_SIZE}"><rect width="{LOGO_SIZE}" height="{LOGO_SIZE}" fill="#2060a0"/>'
+            f'</svg>').encode("utf8")
+
+
+def make_store(idx: int, rng: random.Random) -> dict:
+    return {
+        "id": f"store{idx:04d}",
+        "name": f"Store {idx:04d}",
+        "storefront_url": f"https://store{idx:04d}.example.com/",
+        "affiliate": rng.random() < 0.2,
+        "logo": "logo.svg" if idx % 5 == 0 else "logo.png",
+        "ships_from": rng.choice(COUNTRIES),
+        "ships_to": rng.sample(COUNTRIES, rng.randint(0, 4))
+    }
+
+
+def make_material(name: str, rng: random.Random) -> dict:
+    material: dict = {"material": name}
+    if rng.random() < 0.5:
+        nozzle_temp = rng.randrange(190, 280, 5)
+        bed_temp = rng.randrange(50, 110, 5)
+        material["default_slicer_settings"] = {
+            "generic": {
+                "first_layer_nozzle_temp": nozzle_temp + 5,
+                "nozzle_temp": nozzle_temp,
+                "first_layer_bed_temp": bed_temp + 5,
+                "bed_temp": bed_temp
+            }
+        }
+    if rng.random() < 0.3:
+        material["default_max_dry_temperature"] = rng.randrange(40, 90, 5)
+    return material
+
+
+def make_filament(name: str, rng: random.Random) -> dict:
+    filament: dict = {
+        "name": name,
+        "diameter_tolerance": rng.choice([0.02, 0.03, 0.05]),
+        "density": round(rng.uniform(1.0, 1.4), 2)
+    }
+    if rng.random() < 0.3:
+        filament["data_sheet_url"] = f"https://example.com/{name.lower().replace(' ', '-')}/tds.pdf"
+    if rng.random() < 0.2:
+        filament["max_dry_temperature"] = rng.randrange(40, 90, 5)
+    return filament
+
+
+def make_variant(name: str, rng: random.Random) -> dict:
+    variant: dict = {
+        "color_name": name,
+        "color_hex": f"#{rng.randrange(0x1000000):06X}"
+    }
+    if rng.random() < 0.1:
+        variant["hex_variants"] = [f"#{rng.randrange(0x1000000):06X}"]
+    if rng.random() < 0.3:
+        variant["traits"] = {trait: True for trait in rng.sample(TRAITS, rng.randint(1, 2))}
+    if rng.random() < 0.05:
+        variant["color_standards"] = {"ral": f"RAL {rng.randint(1000, 9999)}"}
+    return variant
+
+
+def make_sizes(variant_idx: int, store_ids: list[str], rng: random.Random) -> list[dict]:
+    sizes = []
+    for size_idx, weight in enumerate(rng.sample([250, 500, 750, 1000, 2000], rng.randint(1, 2))):
+        size: dict = {
+            "filament_weight": weight,
+            "diameter": 1.75,
+            "empty_spool_weight": rng.randrange(150, 260, 10),
+            "ean": f"{rng.randrange(10 ** 12, 10 ** 13)}",
+            "article_number": f"A{variant_idx:07d}-{size_idx}",
+            "purchase_links": []
+        }
+        for store_id in rng.sample(store_ids, min(len(store_ids), rng.randint(1, 3))):
+            size["purchase_links"].append({
+                "store_id": store_id,
+                "url": f"https://{store_id}.example.com/products/{variant_idx}-{weight}",
+                "affiliate": rng.random() < 0.2
+            })
+        sizes.append(size)
+    return sizes
+
+
+def generate_dataset(output_dir: PathLike, variants: int = 1000, stores: int = 20, seed: int = 0) -> Path:
+    """
+    Write a synthetic database to output_dir/data and output_dir/stores
+    Every file passes the schemas and every folder is named the way the validator expects
+    :param variants: The number of variants to generate, rounded up to fill the last filament
+    :returns The output folder
+    """
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    data_dir = output_dir.joinpath("data")
+    stores_dir = output_dir.joinpath("stores")
+    data_dir.mkdir(parents=True, exist_ok=True)
+    stores_dir.mkdir(parents=True, exist_ok=True)
+    png_logo = make_png_logo()
+    svg_logo = make_svg_logo()
+
+    store_ids = []
+    for store_idx in range(stores):
+        store = make_store(store_idx, rng)
+        store_dir = stores_dir.joinpath(store["id"])
+        store_dir.mkdir(exist_ok=True)
+        write_json(store_dir.joinpath("store.json"), store)
+        store_dir.joinpath(store["logo"]).write_bytes(svg_logo if store["logo"].endswith(".svg") else png_logo)
+        store_ids.append(store["id"])
+
+    variant_idx = 0
+    filament_count = 0
+    brand_idx = 0
+    while variant_idx < variants:
+        brand_name = f"Brand {brand_idx:04d}"
+        brand_dir = data_dir.joinpath(brand_name)
+        brand_dir.mkdir(exist_ok=True)
+        logo = "logo.svg" if brand_idx % 5 == 0 else "logo.png"
+        write_json(brand_dir.joinpath("brand.json"), {
+            "brand": brand_name,
+            "website": f"https://brand{brand_idx:04d}.example.com/",
+            "logo": logo,
+            "origin": rng.choice(COUNTRIES)
+        })
+        brand_dir.joinpath(logo).write_bytes(svg_logo if logo.endswith(".svg") else png_logo)
+
+        for material_name in rng.sample(MATERIALS, MATERIALS_PER_BRAND):
+            if variant_idx >= variants:
+                break
+            material_dir = brand_dir.joinpath(material_name)
+            material_dir.mkdir(exist_ok=True)
+            write_json(material_dir.joinpath("material.json"), make_material(material_name, rng))
+
+            for _ in range(FILAMENTS_PER_MATERIAL):
+                if variant_idx >= variants:
+                    break
+                filament_name = f"{material_name} {filament_count:05d}"
+                filament_count += 1
+                filament_dir = material_dir.joinpath(filament_name)
+                filament_dir.mkdir(exist_ok=True)
+                write_json(filament_dir.joinpath("filament.json"), make_filament(filament_name, rng))
+
+                for color_idx in range(VARIANTS_PER_FILAMENT):
+                    variant_name = f"{COLOR_WORDS[color_idx % len(COLOR_WORDS)]} {variant_idx:06d}"
+                    variant_dir = filament_dir.joinpath(variant_name)
+                    variant_dir.mkdir(exist_ok=True)
+                    write_json(variant_dir.joinpath("variant.json"), make_variant(variant_name, rng))
+                    write_json(variant_dir.joinpath("sizes.json"), make_sizes(variant_idx, store_ids, rng))
+                    variant_idx += 1
+        brand_idx += 1
+    return output_dir
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Generate a synthetic filament database for benchmarking")
+    parser.add_argument("output_dir", help="The folder to write the data and stores folders to")
+    parser.add_argument("--variants", type=int, default=1000)
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if Path(args.output_dir).exists() and any(Path(args.output_dir).iterdir()):
+        print(f"The output folder isn't empty: {args.output_dir}")
+        sys.exit(1)
+    generate_dataset(args.output_dir, args.variants, args.stores, args.seed)
@@ -0,0 +1,289 @@
+"""
+Times the validator and the serializer against synthetic databases of increasing size
+The results can be stored as a baseline, later runs are compared against it and fail when they regressed
+"""
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+from typing import Callable, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import data_validator
+from generate_data import generate_dataset
+
+DEFAULT_SIZES = [1000, 10000]
+DEFAULT_BASELINE = Path(__file__).resolve().parent.joinpath("baseline.json")
+BENCHMARK_CHECKS = ["json-files", "logo-files", "folder-names", "store-ids"]
+
+# A metric regressed if it grew by more than this fraction of its baseline
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.10
+# Timings below this many seconds are too noisy to compare
+MIN_SECONDS = 0.005
+
+
+# ---------------------------------
+# Measuring
+# ---------------------------------
+
+@contextmanager
+def quiet():
+    """The serializer prints a line for every folder it imports, which would be timed as well"""
+    with open(os.devnull, mode="w") as devnull, redirect_stdout(devnull):
+        yield
+
+
+def measure_peak_memory(func: Callable[[], object]) -> int:
+    """The peak of the memory allocated while running the function, in bytes"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure_retained_memory(func: Callable[[], object]) -> int:
+    """The memory still allocated by the function once it returned, while its result is alive, in bytes"""
+    tracemalloc.start()
+    try:
+        result = func()
+        retained = tracemalloc.get_traced_memory()[0]
+        del result
+        return retained
+    finally:
+        tracemalloc.stop()
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+# ---------------------------------
+# Benchmarks
+# ---------------------------------
+
+def benchmark_validator(dataset_dir: Path, repeat: int) -> dict[str, float]:
+    data_dir = dataset_dir.joinpath("data")
+    stores_dir = dataset_dir.joinpath("stores")
+    metrics: dict[str, float] = {}
+
+    def validate(cache: Optional[data_validator.ValidationCache] = None,
+                 stats: Optional[data_validator.ValidationStats] = None):
+        result = data_validator.run_validation(BENCHMARK_CHECKS, data_dir=data_dir, stores_dir=stores_dir, cache=cache,
+                                               stats=stats)
+        if result.failed:
+            raise RuntimeError("The synthetic data didn't pass validation:\n" + "\n".join(result.messages[:10]))
+
+    # Every phase is timed from the fastest of the cold runs
+    runs = []
+    for _ in range(repeat):
+        stats = data_validator.ValidationStats()
+        validate(stats=stats)
+        runs.append(stats)
+    fastest = min(runs, key=lambda x: x.timings["total"])
+    for phase, seconds in fastest.timings.items():
+        metrics[f"validate.{phase}"] = seconds
+    for name, amount in fastest.counters.items():
+        metrics[f"count.{name}"] = amount
+
+    cache = data_validator.ValidationCache()
+    validate(cache)
+    metrics["validate.cached"] = best_time(lambda: validate(cache), repeat)
+    metrics["memory.validate"] = measure_peak_memory(validate)
+    return metrics
+
+
+def load_database(dataset_dir: Path) -> tuple['db_serializer.Database', list]:
+    import db_serializer
+
+    database = db_serializer.Database(dataset_dir)
+    with quiet():
+        database.load_stores()
+        brands = database.load_brands()
+    return database, brands
+
+
+def load_database_concurrently(dataset_dir: Path, workers: int, processes: bool) -> 'db_serializer.Database':
+    """Loads with db_serializer.load_database, on worker processes or on threads"""
+    import db_serializer
+
+    with quiet():
+        return db_serializer.load_database(dataset_dir, workers, processes)
+
+
+def save_database(database: 'db_serializer.Database', brands: list, output_dir: Path):
+    data_dir = output_dir.joinpath("data")
+    stores_dir = output_dir.joinpath("stores")
+    data_dir.mkdir(parents=True, exist_ok=True)
+    stores_dir.mkdir(parents=True, exist_ok=True)
+    with quiet():
+        for brand in brands:
+            brand.to_folder(data_dir)
+        database.save_stores(stores_dir)
+
+
+def benchmark_serializer(dataset_dir: Path, repeat: int, workers: int) -> dict[str, float]:
+    import db_serializer
+
+    metrics: dict[str, float] = {"serializer.load": best_time(lambda: load_database(dataset_dir), repeat)}
+    metrics["serializer.load_processes"] = best_time(lambda: load_database_concurrently(dataset_dir, workers, True),
+                                                     repeat)
+    metrics["serializer.load_threads"] = best_time(lambda: load_database_concurrently(dataset_dir, workers, False),
+                                                   repeat)
+    database, brands = load_database(dataset_dir)
+
+    save_timings = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.perf_counter()
+            save_database(database, brands, Path(output_dir))
+            save_timings.append(time.perf_counter() - start)
+    metrics["serializer.save"] = min(save_timings)
+
+    database.brands = brands
+    for processes in (True, False):
+        save_timings = []
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as output_dir:
+                start = time.perf_counter()
+                with quiet():
+                    db_serializer.save_database(database, output_dir, workers, processes)
+                save_timings.append(time.perf_counter() - start)
+        metrics["serializer.save_processes" if processes else "serializer.save_threads"] = min(save_timings)
+    metrics["memory.load"] = measure_peak_memory(lambda: load_database(dataset_dir))
+    variant_count = sum(len(filament.variants) for brand in brands for material in brand.materials
+                        for filament in material.filaments)
+    metrics["memory.per_variant"] = measure_retained_memory(lambda: load_database(dataset_dir)) / variant_count
+    return metrics
+
+
+def get_dataset(work_dir: Path, variants: int, seed: int) -> Path:
+    """Generate the dataset, or reuse it if it was generated with the same arguments before"""
+    dataset_dir = work_dir.joinpath(f"variants-{variants}-seed-{seed}")
+    marker = dataset_dir.joinpath("complete")
+    if not marker.exists():
+        generate_dataset(dataset_dir, variants=variants, seed=seed)
+        marker.touch()
+    return dataset_dir
+
+
+def run_benchmarks(sizes: list[int], work_dir: Path, repeat: int = 3, seed: int = 0,
+                   workers: Optional[int] = None) -> dict:
+    """
+    :param workers: The number of workers the concurrent loads and saves use, defaults to the number of CPU cores
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "workers": workers,
+        "sizes": {}
+    }
+    for variants in sizes:
+        print(f"Benchmarking {variants} variants")
+        dataset_dir = get_dataset(work_dir, variants, seed)
+        metrics = benchmark_validator(dataset_dir, repeat)
+        metrics.update(benchmark_serializer(dataset_dir, repeat, workers))
+        results["sizes"][str(variants)] = metrics
+    return results
+
+
+# ---------------------------------
+# Comparing
+# ---------------------------------
+
+def format_metric(name: str, value) -> str:
+    if name.startswith("memory."):
+        return f"{value / 2 ** 20:.1f} MiB" if value >= 2 ** 20 else f"{value:.0f} B"
+    return f"{value:.4f}" if isinstance(value, float) else str(value)
+
+
+def compare(results: dict, baseline: dict, time_threshold: float = TIME_THRESHOLD,
+            memory_threshold: float = MEMORY_THRESHOLD) -> list[str]:
+    """
+    Print every metric next to its baseline
+    :returns The metrics that regressed by more than their threshold
+    """
+    regressions = []
+    for size, metrics in results["sizes"].items():
+        baseline_metrics = baseline.get("sizes", {}).get(size, {})
+        print(f"\n{size} variants")
+        print(f"{'metric':<28}{'value':>14}{'baseline':>14}{'change':>10}")
+        for name, value in metrics.items():
+            old = baseline_metrics.get(name)
+            is_memory = name.startswith("memory.")
+            shown = format_metric(name, value)
+            if old is None or old == 0:
+                print(f"{name:<28}{shown:>14}{'-':>14}{'-':>10}")
+                continue
+            old_shown = format_metric(name, old)
+            change = value / old - 1
+            print(f"{name:<28}{shown:>14}{old_shown:>14}{change:>+10.1%}")
+
+            if name.startswith("count."):
+                continue
+            threshold = memory_threshold if is_memory else time_threshold
+            if change > threshold and (is_memory or value - old > MIN_SECONDS):
+                regressions.append(f"{size} variants: {name} went from {old_shown} to {shown} ({change:+.1%})")
+    return regressions
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Benchmark the validator and serializer against synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help=f"The numbers of variants to benchmark with (default: {' '.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument("--repeat", type=int, default=3, help="Timings are the fastest of this many runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int,
+                        help="The number of workers of the concurrent loads and saves (default: the number of CPU cores)")
+    parser.add_argument("--work-dir", help="Keep the generated data in this folder so later runs can reuse it")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="The baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--output", help="Also write the results to this file")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD)
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD)
+
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        benchmark_results = run_benchmarks(args.sizes, Path(args.work_dir or tmp_dir), args.repeat, args.seed,
+                                           args.workers)
+
+    if args.output:
+        with open(args.output, mode="w", encoding="utf8") as f:
+            json.dump(benchmark_results, f, indent=4)
+
+    baseline_path = Path(args.baseline)
+    baseline_results = {}
+    if baseline_path.exists():
+        with baseline_path.open(mode="r", encoding="utf8") as f:
+            baseline_results = json.load(f)
+    found_regressions = compare(benchmark_results, baseline_results, args.time_threshold, args.memory_threshold)
+
+    if args.save_baseline:
+        with baseline_path.open(mode="w", encoding="utf8") as f:
+            json.dump(benchmark_results, f, indent=4)
+        print(f"\nSaved the results as the baseline: {baseline_path}")
+    elif len(found_regressions) > 0:
+        print("\nRegressions:")
+        for regression in found_regressions:
+            print(regression)
+        sys.exit(1)
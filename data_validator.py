@@ -1,20 +1,21 @@
+import hashlib
 import json
 import os
+import time
+from contextlib import contextmanager
+from functools import partial
+from io import BytesIO
 from json import JSONDecodeError
 from pathlib import Path
-from typing import Union
+from typing import Any, Iterable, Optional, Union
 
-from jsonschema.exceptions import ValidationError
-from jsonschema.validators import validate
+from schema_registry import SCHEMA_FILES, registry
 
-from PIL import Image
+# Modules that only some of the checks need (PIL, load_profiles, subprocess, concurrent.futures...) are imported where
+# they are used, so importing this module stays cheap
 
 PathLike = Union[str, os.PathLike[str]]
 
-# Global variable that denotes the last json file that was read
-# This is used to for json validation error messages
-last_json_file_loaded = ""
-
 illegal_characters = [
   "#","%","&","{","}","\\","<",
   ">","*","?","/","$","!","'",
@@ -22,14 +23,123 @@ illegal_characters = [
 ] # TODO: Add emojis and alt codes
 # This should at all times be the same as /webui/src/lib/server/helpers.ts:26
 
+
+class ValidationIssue:
+    message: str
+    rule: str  # What was violated, such as 'json-schema' or 'store-id'
+    severity: str  # 'error' or 'warning'
+    file: Optional[str]  # The file the issue was found in
+    json_path: Optional[str]  # Where in the file the issue was found
+    check: Optional[str]  # The check that found the issue
+
+    def __init__(self, message: str, rule: str, severity: str = "error", file: Optional[PathLike] = None,
+                 json_path: Optional[str] = None, check: Optional[str] = None):
+        self.message = message
+        self.rule = rule
+        self.severity = severity
+        self.file = Path(file).as_posix() if file is not None else None
+        self.json_path = json_path
+        self.check = check
+
+    def to_dict(self) -> dict:
+        return {
+            "check": self.check,
+            "rule": self.rule,
+            "severity": self.severity,
+            "message": self.message,
+            "file": self.file,
+            "json_path": self.json_path
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> 'ValidationIssue':
+        return ValidationIssue(data["message"], data["rule"], data.get("severity", "error"), data.get("file"),
+                               data.get("json_path"), data.get("check"))
+
+
+class ValidationResult:
+    """
+    Collects the issues found by a validation task
+    Every task gets its own result so tasks running in other processes can't mix up their error context
+    """
+    issues: list[ValidationIssue]
+    check: Optional[str]  # The check the issues are found by
+    failed: bool
+
+    def __init__(self, check: Optional[str] = None):
+        self.issues = []
+        self.check = check
+        self.failed = False
+
+    @property
+    def messages(self) -> list[str]:
+        return [x.message for x in self.issues]
+
+    def add(self, issue: ValidationIssue):
+        if issue.check is None:
+            issue.check = self.check
+        self.issues.append(issue)
+        self.failed |= issue.severity == "error"
+
+    def error(self, *values: Any, rule: Optional[str] = None, file: Optional[PathLike] = None,
+              json_path: Optional[str] = None):
+        """
+        Record a validation error, the values are joined the same way print() joins them
+        :param rule: What was violated, defaults to the name of the check
+        """
+        self.add(ValidationIssue(" ".join(str(x) for x in values), rule or self.check or "error", "error",
+                                 file, json_path))
+
+    def extend(self, other: 'ValidationResult'):
+        for issue in other.issues:
+            self.add(issue)
+        self.failed |= other.failed
+
+
+class ValidationStats:
+    """
+    Counters and the time spent in each phase of a validation run
+    The stats of tasks running in other processes are added together, so phase timings are the total time spent by
+    all workers, which can be more than the time the run took
+    """
+    counters: dict[str, int]
+    timings: dict[str, float]  # In seconds
+
+    def __init__(self):
+        self.counters = {}
+        self.timings = {}
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def phase(self, name: str):
+        """Adds the time spent within the with block to the timing of the phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def extend(self, other: 'ValidationStats'):
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+        for name, seconds in other.timings.items():
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "counters": dict(sorted(self.counters.items())),
+            "timings": {k: round(v, 6) for k, v in sorted(self.timings.items())}
+        }
+
+
 def get_json_from_file(json_path: PathLike):
     """
     Attempt to load JSON from the specified path
     :returns Loaded JSON as a dict or None if there is an error
     """
     try:
-        global last_json_file_loaded
-        last_json_file_loaded = json_path.__str__()
         with open(json_path, mode="r", encoding="utf8") as file:
             return json.load(file)
     except JSONDecodeError:
@@ -39,291 +149,1211 @@ def get_json_from_file(json_path: PathLike):
     return None
 
 
-def validate_json(json_data, schema) -> bool:
+def validate_json(json_data, schema_name: str, json_file: PathLike, result: ValidationResult) -> bool:
     """
-    Validate the json data with the provided schema
+    Validate the json data with the named schema from the schema registry
     If valid, returns true.
-    If not valid, returns false and emits an error message
+    If not valid, returns false and records an error message in the result
     """
-    try:
-        validate(json_data, schema)
+    error = registry.best_error(schema_name, json_data)
+    if error is None:
         return True
-    except ValidationError as error:
-        print(
-            f"Failed to validate json. JSON path: {error.json_path}, Error: {error.message}, JSON file: {last_json_file_loaded}")
-        return False
-
-
-def validate_json_file(json_path: PathLike, schema: dict):
-    return validate_json(get_json_from_file(json_path), schema)
+    result.error(
+        f"Failed to validate json. JSON path: {error.json_path}, Error: {error.message}, JSON file: {json_file}",
+        rule="json-schema", file=json_file, json_path=error.json_path)
+    return False
 
 
 def cleanse_folder_name(name: str) -> str:
     return name.replace("/", " ").strip()
 
 
-STORE_SCHEMA = get_json_from_file("schemas/store_schema.json")
-BRAND_SCHEMA = get_json_from_file("schemas/brand_schema.json")
-MATERIAL_SCHEMA = get_json_from_file("schemas/material_schema.json")
-FILAMENT_SCHEMA = get_json_from_file("schemas/filament_schema.json")
-VARIANT_SCHEMA = get_json_from_file("schemas/variant_schema.json")
-SIZE_SCHEMA = get_json_from_file("schemas/sizes_schema.json")
+def sorted_dirs(folder: Path) -> list[Path]:
+    """The sub folders of a folder, sorted so the output is the same on every platform"""
+    with os.scandir(folder) as it:
+        return sorted(Path(x.path) for x in it if x.is_dir())
+
 
-failed_validation = False
+def hash_bytes(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
 
 
 # -------------------------
-# Validate against JSON schemas
+# Data manifest
+# The data and store folders are walked once and every JSON file is loaded once.
+# All the checks below are run against the resulting manifest.
 # -------------------------
 
-def validate_json_files():
-    global failed_validation
-    for _brand_dir in Path("./data").iterdir():
-        if not _brand_dir.is_dir():
-            continue
+class ManifestEntry:
+    kind: str  # The JSON file name without extension (brand, material, filament, variant, sizes or store)
+    folder: Path  # The folder that contains the JSON file
+    path: Path  # The path of the JSON file
+    exists: bool
+    raw: Optional[bytes]  # The content of the file, None if it is missing or could not be read
+    digest: Optional[str]  # The hash of the content, used as the key of the validation cache
+
+    def __init__(self, kind: str, folder: Path):
+        self.kind = kind
+        self.folder = folder
+        self.path = folder.joinpath(f"{kind}.json")
+        self.exists = True
+        self.raw = None
+        self.digest = None
+        self.__data = None
+        self.__load_error = None
+        self.__parsed = False
+        self.__read()
+
+    def __read(self):
+        try:
+            with open(self.path, mode="rb") as file:
+                self.raw = file.read()
+            self.digest = hash_bytes(self.raw)
+        except FileNotFoundError:
+            self.exists = False
+            self.__parsed = True
+        except OSError:
+            self.__load_error = f"Failed to open the provided JSON file: {self.path}"
+            self.__parsed = True
+
+    def __parse(self):
+        # The JSON is only parsed when it's needed, which it isn't if every result is cached
+        if self.__parsed:
+            return
+        self.__parsed = True
+        try:
+            self.__data = json.loads(self.raw.decode("utf8"))
+        except (JSONDecodeError, UnicodeDecodeError):
+            self.__load_error = f"Failed to import JSON from file: {self.path}"
+
+    @property
+    def data(self) -> Any:
+        """The loaded JSON, None if the file is missing or could not be loaded"""
+        self.__parse()
+        return self.__data
+
+    @property
+    def load_error(self) -> Optional[str]:
+        self.__parse()
+        return self.__load_error
+
+
+class DataManifest:
+    entries: list[ManifestEntry]  # In the order the folders were walked
+
+    def __init__(self, entries: Optional[list[ManifestEntry]] = None):
+        if entries is None:
+            entries = []
+        self.entries = entries
+
+    def of_kind(self, *kinds: str):
+        return (entry for entry in self.entries if entry.kind in kinds)
+
+
+def scan_brand(brand_dir: Path) -> list[ManifestEntry]:
+    """Walk a single brand folder and load every JSON file within it"""
+    entries = [ManifestEntry("brand", brand_dir)]
+    for _material_dir in sorted_dirs(brand_dir):
+        entries.append(ManifestEntry("material", _material_dir))
+
+        for _filament_dir in sorted_dirs(_material_dir):
+            entries.append(ManifestEntry("filament", _filament_dir))
+
+            for _variant_dir in sorted_dirs(_filament_dir):
+                entries.append(ManifestEntry("variant", _variant_dir))
+                entries.append(ManifestEntry("sizes", _variant_dir))
+    return entries
+
+
+def scan_store(store_dir: Path) -> list[ManifestEntry]:
+    return [ManifestEntry("store", store_dir)]
+
+
+def list_units(data_dir: PathLike = "./data", stores_dir: PathLike = "./stores") -> list[tuple[str, Path]]:
+    """
+    Returns the independent units of work, each brand folder and each store folder, in a stable order
+    Each unit is returned as a tuple of its kind ("brand" or "store") and its folder
+    """
+    units = [("brand", x) for x in sorted_dirs(Path(data_dir))]
+    units += [("store", x) for x in sorted_dirs(Path(stores_dir))]
+    return units
+
+
+def scan_unit(kind: str, folder: Path) -> DataManifest:
+    if kind == "brand":
+        return DataManifest(scan_brand(folder))
+    return DataManifest(scan_store(folder))
+
+
+def build_manifest(data_dir: PathLike = "./data", stores_dir: PathLike = "./stores") -> DataManifest:
+    manifest = DataManifest()
+    for kind, folder in list_units(data_dir, stores_dir):
+        manifest.entries.extend(scan_unit(kind, folder).entries)
+    return manifest
+
+
+# -------------------------
+# Validation cache
+# What the checks found out about each file is stored in a record keyed by the path of the file.
+# A record is only used while the hash of the file's content is unchanged, so unchanged files aren't loaded again.
+# -------------------------
 
-        # Validate brand.json
-        brand_file = _brand_dir.joinpath("brand.json")
-        if brand_file.exists():
-            failed_validation |= not validate_json_file(brand_file, BRAND_SCHEMA)
-            brandData = get_json_from_file(brand_file)
-            logoName = brandData["logo"]
-
-            if "/" in logoName:
-                print("/ exists in logo path, only use file name.", brandData)
-                failed_validation = True
-            
-            logoFile = _brand_dir.joinpath(logoName)
-
-            if not logoFile.exists():
-                print("Missing", logoFile)
-                failed_validation = True
+CACHE_VERSION = 2
+DEFAULT_CACHE_FILE = ".validation_cache.json"
+
+# Changes to these files can change the result of every check
+VALIDATOR_FILES = ["data_validator.py", "schema_registry.py"]
+
+
+def cache_fingerprint() -> dict:
+    """Everything besides the files themselves that the cached results depend on"""
+    source_dir = Path(__file__).parent
+    return {
+        "version": CACHE_VERSION,
+        "validator": {name: hash_bytes(source_dir.joinpath(name).read_bytes()) for name in VALIDATOR_FILES},
+        "schemas": {name: hash_bytes(registry.schema_path(name).read_bytes()) for name in SCHEMA_FILES}
+    }
+
+
+class ValidationCache:
+    records: dict[str, dict]  # Keyed by the path of the file
+    fingerprint: Optional[dict]
+    hits: int  # The number of results that were taken from the cache
+    misses: int  # The number of results that had to be computed
+
+    def __init__(self, records: Optional[dict[str, dict]] = None, fingerprint: Optional[dict] = None):
+        if records is None:
+            records = {}
+        self.records = records
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self.__used: set[str] = set()
+
+    def record(self, path: Path, digest: Optional[str], kind: str) -> dict:
+        """
+        Returns the record for the file, which is emptied if the content of the file changed
+        Files that couldn't be read get a record that isn't stored
+        """
+        if digest is None:
+            return {"kind": kind}
+        key = path.as_posix()
+        self.__used.add(key)
+        record = self.records.get(key)
+        if record is None or record.get("hash") != digest:
+            record = {"hash": digest, "kind": kind}
+            self.records[key] = record
+        return record
+
+    def cached(self, record: dict, key: str, compute):
+        """Returns the value stored in the record under the key, computing and storing it first if it isn't there"""
+        if key in record:
+            self.hits += 1
         else:
-            print("Missing", brand_file)
-            failed_validation = True
+            self.misses += 1
+            record[key] = compute()
+        return record[key]
+
+    def entry_record(self, entry: ManifestEntry) -> dict:
+        return self.record(entry.path, entry.digest, entry.kind)
+
+    def file_record(self, path: Path, kind: str) -> dict:
+        try:
+            digest = hash_bytes(path.read_bytes())
+        except OSError:
+            digest = None
+        return self.record(path, digest, kind)
+
+    def split(self, folders: list[Path]) -> list['ValidationCache']:
+        """Split the cache into one cache per folder, holding the records of the files within that folder"""
+        subsets = {folder.as_posix(): ValidationCache() for folder in folders}
+        for key, record in self.records.items():
+            folder = key
+            while "/" in folder:
+                folder = folder.rsplit("/", 1)[0]
+                subset = subsets.get(folder)
+                if subset is not None:
+                    subset.records[key] = record
+                    break
+        return list(subsets.values())
+
+    def used_records(self) -> dict[str, dict]:
+        """The records that were used since this cache was created, records of removed files are left out"""
+        return {k: v for k, v in self.records.items() if k in self.__used}
+
+    @staticmethod
+    def load(path: PathLike) -> 'ValidationCache':
+        """
+        Load the cache from disk
+        Records are dropped when the validator changed, and schema results are dropped when the schema they were
+        validated against changed
+        """
+        fingerprint = cache_fingerprint()
+        try:
+            with open(path, mode="r", encoding="utf8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return ValidationCache(fingerprint=fingerprint)
+
+        old_fingerprint = data.get("fingerprint", {})
+        if old_fingerprint.get("version") != fingerprint["version"] or \
+                old_fingerprint.get("validator") != fingerprint["validator"]:
+            return ValidationCache(fingerprint=fingerprint)
+
+        old_schemas = old_fingerprint.get("schemas", {})
+        changed_schemas = {k for k, v in fingerprint["schemas"].items() if old_schemas.get(k) != v}
+        records = data.get("records", {})
+        for record in records.values():
+            if record.get("kind") in changed_schemas:
+                record.pop("json-files", None)
+        return ValidationCache(records, fingerprint)
+
+    def save(self, path: PathLike):
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open(mode="w", encoding="utf8") as file:
+            file.write(json.dumps({"fingerprint": self.fingerprint or cache_fingerprint(), "records": self.records}))
+        os.replace(tmp_path, path)
+
+
+def get_logo_name(entry: ManifestEntry, cache: ValidationCache) -> Optional[str]:
+    """The logo of a brand or store entry, None if the entry couldn't be loaded"""
+    return cache.cached(cache.entry_record(entry), "logo",
+                        lambda: entry.data.get("logo", "") if isinstance(entry.data, dict) else None)
 
-        for _material_dir in _brand_dir.iterdir():
-            if not _material_dir.is_dir():
-                continue
 
-            # Validate material.json
-            material_file = _material_dir.joinpath("material.json")
-            if material_file.exists():
-                failed_validation |= not validate_json_file(material_file, MATERIAL_SCHEMA)
-            else:
-                print("Missing", material_file)
-                failed_validation = True
+# -------------------------
+# Validate against JSON schemas
+# -------------------------
+
+def get_schema_issues(entry: ManifestEntry) -> list[dict]:
+    """The errors of the entry that only depend on its content"""
+    result = ValidationResult()
+    if entry.load_error is not None:
+        result.error(entry.load_error, rule="invalid-json", file=entry.path)
+        return [x.to_dict() for x in result.issues]
 
-            for _filament_dir in _material_dir.iterdir():
-                if not _filament_dir.is_dir():
-                    continue
+    validate_json(entry.data, entry.kind, entry.path, result)
 
-                # Validate filament.json
-                filament_file = _filament_dir.joinpath("filament.json")
-                if filament_file.exists():
-                    failed_validation |= not validate_json_file(filament_file, FILAMENT_SCHEMA)
-                else:
-                    print("Missing", filament_file)
-                    failed_validation = True
-
-                for _variant_dir in _filament_dir.iterdir():
-                    if not _variant_dir.is_dir():
-                        continue
-
-                    # Validate variant.json
-                    variant_file = _variant_dir.joinpath("variant.json")
-                    if variant_file.exists():
-                        failed_validation |= not validate_json_file(variant_file, VARIANT_SCHEMA)
-                    else:
-                        print("Missing", variant_file)
-                        failed_validation = True
-
-                    # Validate sizes.json
-                    sizes_file = _variant_dir.joinpath("sizes.json")
-                    if sizes_file.exists():
-                        failed_validation |= not validate_json_file(sizes_file, SIZE_SCHEMA)
-                    else:
-                        print("Missing", sizes_file)
-                        failed_validation = True
-
-    for _store_dir in Path("./stores").iterdir():
-        if not _store_dir.is_dir():
+    if entry.kind == "brand" and isinstance(entry.data, dict):
+        logo_name = entry.data.get("logo", "")
+
+        if "/" in logo_name:
+            result.error("/ exists in logo path, only use file name.", entry.data,
+                         rule="logo-path", file=entry.path, json_path="$.logo")
+    return [x.to_dict() for x in result.issues]
+
+
+def check_json_schemas(manifest: DataManifest, result: ValidationResult, cache: Optional[ValidationCache] = None,
+                       stats: Optional['ValidationStats'] = None):
+    if cache is None:
+        cache = ValidationCache()
+    if stats is None:
+        stats = ValidationStats()
+
+    def validate(entry: ManifestEntry) -> list[dict]:
+        stats.count("documents_validated")
+        return get_schema_issues(entry)
+
+    for entry in manifest.entries:
+        if not entry.exists:
+            result.error("Missing", entry.path, rule="missing-file", file=entry.path)
             continue
 
-        # Validate sizes.json
-        store_file = _store_dir.joinpath("store.json")
-        if store_file.exists():
-            failed_validation |= not validate_json_file(store_file, STORE_SCHEMA)
-        else:
-            print("Missing", store_file)
-            failed_validation = True
+        record = cache.entry_record(entry)
+        for issue in cache.cached(record, "json-files", lambda: validate(entry)):
+            result.add(ValidationIssue.from_dict(issue))
+
+        if entry.kind == "brand":
+            logo_name = get_logo_name(entry, cache)
+            if logo_name is None:
+                continue
+
+            logo_file = entry.folder.joinpath(logo_name)
+
+            if not logo_file.exists():
+                result.error("Missing", logo_file, rule="missing-file", file=logo_file)
+
 
 # -------------------------
 # Validate logo files against rules
 # Rules right now:
 # Width and Height are the same
 # dimensions are min 100x100 and max 400x400 if not svg
+# Only the header of raster images and the root element of SVGs are parsed to get the size of a logo,
+# the size is cached by the hash of the logo so unchanged logos aren't parsed again.
 # -------------------------
 
 minSize = 100
 maxSize = 400
 
-def validate_icon(logo_file):
-    img = Image.open(logo_file)
-                    
-    width, height = img.size
+
+def is_svg(logo_file: Path) -> bool:
+    return logo_file.suffix.lower() == ".svg"
+
+
+def parse_svg_length(value: Optional[str]) -> Optional[float]:
+    """Parse an SVG width or height, None if it is missing or not an absolute length in user units"""
+    if value is None:
+        return None
+    value = value.strip().removesuffix("px")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def get_svg_size(raw: bytes) -> Optional[tuple[float, float]]:
+    """
+    The size of an SVG from the width and height of its root element, falling back to its viewBox
+    Parsing stops at the root element, so the rest of the document is never read
+    """
+    from xml.etree import ElementTree
+
+    try:
+        for _, element in ElementTree.iterparse(BytesIO(raw), events=("start",)):
+            if element.tag.rsplit("}", 1)[-1] != "svg":
+                return None
+            width = parse_svg_length(element.get("width"))
+            height = parse_svg_length(element.get("height"))
+            if width is None or height is None:
+                view_box = element.get("viewBox", "").replace(",", " ").split()
+                if len(view_box) != 4:
+                    return None
+                width, height = float(view_box[2]), float(view_box[3])
+            return width, height
+    except (ElementTree.ParseError, ValueError):
+        return None
+    return None
+
+
+def get_raster_size(raw: bytes) -> Optional[tuple[int, int]]:
+    """The size of a raster image, only its header is decoded"""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(BytesIO(raw)) as img:
+            return img.size
+    except (UnidentifiedImageError, OSError):
+        return None
+
+
+def get_logo_size(logo_file: Path, raw: bytes) -> Optional[list[float]]:
+    size = get_svg_size(raw) if is_svg(logo_file) else get_raster_size(raw)
+    return list(size) if size is not None else None
+
+
+def probe_logo(logo_file: Path, cache: ValidationCache) -> tuple[dict, Optional[bool]]:
+    """
+    Returns the cache record of the logo, with its size stored under "size"
+    The logo is read once to hash it, it's only parsed if its hash changed
+    This runs on the threads of probe_logos, so it doesn't count the hits and misses of the cache itself
+    :returns The record and whether the size was taken from the cache, None if the logo couldn't be read
+    """
+    try:
+        raw = logo_file.read_bytes()
+    except OSError:
+        return {"kind": "logo", "size": None}, None
+    record = cache.record(logo_file, hash_bytes(raw), "logo")
+    record["bytes"] = len(raw)
+    hit = "size" in record
+    if not hit:
+        record["size"] = get_logo_size(logo_file, raw)
+    return record, hit
+
+
+def probe_logos(logo_files: list[Path], cache: ValidationCache,
+                stats: Optional['ValidationStats'] = None) -> list[dict]:
+    """Probe the logos on a thread pool, returns the cache record of each logo in the same order"""
+    if stats is None:
+        stats = ValidationStats()
+    with stats.phase("logo-probe"):
+        if len(logo_files) <= 1:
+            probed = [probe_logo(x, cache) for x in logo_files]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor() as executor:
+                probed = list(executor.map(partial(probe_logo, cache=cache), logo_files))
+    # Counted here instead of in the threads, += on the counters of the cache isn't atomic
+    records = []
+    for record, hit in probed:
+        if hit:
+            cache.hits += 1
+        elif hit is not None:
+            cache.misses += 1
+        records.append(record)
+    stats.count("logos_probed", len(logo_files))
+    stats.count("bytes_read", sum(x.get("bytes", 0) for x in records))
+    return records
+
+
+def get_logo_files(manifest: DataManifest, cache: ValidationCache) -> list[Path]:
+    """The existing logos of the brand and store entries"""
+    logo_files = []
+    for entry in manifest.of_kind("brand", "store"):
+        if not entry.exists:
+            continue
+        icon_name = get_logo_name(entry, cache)
+        if icon_name:
+            logo_file = entry.folder.joinpath(icon_name)
+            if logo_file.exists():
+                logo_files.append(logo_file)
+    return logo_files
+
+
+def validate_icon(logo_file: Path, size: Optional[list[float]], result: ValidationResult):
+    if size is None:
+        result.error(f"Failed to read the size of {logo_file}", rule="logo-unreadable", file=logo_file)
+        return
+
+    width, height = size
 
     if width != height:
-        print(f"Width and height of {logo_file} are unequal")
-        failed_validation = True
-    
+        result.error(f"Width and height of {logo_file} are unequal", rule="logo-aspect-ratio", file=logo_file)
+
+    if is_svg(logo_file):
+        return
+
     if width < minSize or height < minSize:
-        print(f"Width/height of {logo_file} are smaller than the allowed size {minSize}")
-        failed_validation = True
-    
+        result.error(f"Width/height of {logo_file} are smaller than the allowed size {minSize}",
+                     rule="logo-min-size", file=logo_file)
+
     if width > maxSize or height > maxSize:
-        print(f"Width/height of {logo_file} are bigger than the allowed size {maxSize}")
-        failed_validation = True
+        result.error(f"Width/height of {logo_file} are bigger than the allowed size {maxSize}",
+                     rule="logo-max-size", file=logo_file)
 
-def validate_logo_files():
-    global failed_validation
 
-    # Validate brand folder logos
-    for _brand_dir in Path("./data").iterdir():
-        if not _brand_dir.is_dir():
-            continue
+def check_logo_files(manifest: DataManifest, result: ValidationResult, cache: Optional[ValidationCache] = None,
+                     stats: Optional['ValidationStats'] = None):
+    if cache is None:
+        cache = ValidationCache()
 
-        brand_file = _brand_dir.joinpath("brand.json")
-        if brand_file.exists():
-            brand_data = get_json_from_file(brand_file)
-            icon_name = brand_data.get("logo", "")
-            
-            if icon_name != "":
-                logo_file = _brand_dir.joinpath(icon_name)
-                if logo_file.exists() and not ".svg" in icon_name:
-                    validate_icon(logo_file)
-
-    # Validate store folder logos
-    for _store_dir in Path("./stores").iterdir():
-        if not _store_dir.is_dir():
-            continue
+    # Validate brand and store folder logos
+    logo_files = get_logo_files(manifest, cache)
+    for logo_file, record in zip(logo_files, probe_logos(logo_files, cache, stats)):
+        validate_icon(logo_file, record["size"], result)
 
-        store_file = _store_dir.joinpath("store.json")
-        if store_file.exists():
-            store_data = get_json_from_file(store_file)
-            icon_name = store_data.get("logo", "")
-            
-            if icon_name != "":
-                logo_file = _store_dir.joinpath(icon_name)
-                if logo_file.exists() and not ".svg" in icon_name:
-                    validate_icon(logo_file)
 
 # -------------------------
 # Validate folder names
 # -------------------------
 
-def validate_folder_names():
-    global failed_validation
-    for _brand_dir in Path("./data").iterdir():
-        if not _brand_dir.is_dir():
+# The key holding the name that each kind of folder should be named after
+FOLDER_NAME_KEYS = {
+    "brand": "brand",
+    "material": "material",
+    "filament": "name",
+    "variant": "color_name",
+    "store": "id"
+}
+
+
+def get_folder_name_issues(entry: ManifestEntry) -> list[dict]:
+    if not isinstance(entry.data, dict):
+        return []
+
+    key = FOLDER_NAME_KEYS[entry.kind]
+    name = cleanse_folder_name(entry.data.get(key, ""))
+    if entry.folder.name == name:
+        return []
+
+    # Brand names containing illegal characters can't be used as folder names
+    if entry.kind == "brand" and any(char in illegal_characters for char in name):
+        return []
+
+    result = ValidationResult()
+    result.error("The name of the folder", entry.folder,
+                 f"does not match the value of '{key}' ({name}) of", entry.path.name,
+                 rule="folder-name", file=entry.path, json_path=f"$.{key}")
+    return [x.to_dict() for x in result.issues]
+
+
+def check_folder_names(manifest: DataManifest, result: ValidationResult, cache: Optional[ValidationCache] = None):
+    if cache is None:
+        cache = ValidationCache()
+
+    # The folder is part of the path the records are keyed by, so cached issues are still valid
+    for entry in manifest.of_kind(*FOLDER_NAME_KEYS.keys()):
+        if not entry.exists:
+            continue
+        record = cache.entry_record(entry)
+        for issue in cache.cached(record, "folder-names", lambda: get_folder_name_issues(entry)):
+            result.add(ValidationIssue.from_dict(issue))
+
+
+# -------------------------
+# Validate references
+# Store IDs and slicer profile names are looked up in hashed indexes that are built once per run,
+# every reference in the database is then checked in a single pass over the entries.
+# -------------------------
+
+# The key holding the slicer settings of each kind of JSON file
+SLICER_SETTINGS_KEYS = {
+    "material": "default_slicer_settings",
+    "filament": "slicer_settings"
+}
+
+
+class ReferenceIndex:
+    store_ids: frozenset[str]
+    profile_names: dict[str, frozenset[str]]  # Keyed by slicer, names are stored with and without printer suffix
+
+    def __init__(self, store_ids: Iterable[str] = (), profile_names: Optional[dict[str, Iterable[str]]] = None):
+        if profile_names is None:
+            profile_names = {}
+        self.store_ids = frozenset(store_ids)
+        self.profile_names = {k: frozenset(v) for k, v in profile_names.items()}
+
+    @staticmethod
+    def build(manifest: DataManifest, profiles_dir: Optional[PathLike] = "./profiles",
+              cache: Optional[ValidationCache] = None) -> 'ReferenceIndex':
+        """
+        Index the store IDs of the store entries of the manifest and the names of the profiles in the profiles folder
+        :param profiles_dir: The folder with the extracted slicer profiles, profile names aren't indexed if None
+        """
+        from load_profiles import SLICERS, load_profile_index
+
+        profile_names = {}
+        if profiles_dir is not None:
+            # The saved profile index is used, so the profiles are only read again when they changed
+            profile_index = load_profile_index(profiles_dir)
+            profile_names = {slicer: profile_index.get_names(slicer) for slicer in SLICERS}
+        return ReferenceIndex(get_store_ids(manifest, cache), profile_names)
+
+
+def get_store_ids(manifest: DataManifest, cache: Optional[ValidationCache] = None) -> list[str]:
+    if cache is None:
+        cache = ValidationCache()
+
+    valid_store_ids = []
+    for entry in manifest.of_kind("store"):
+        if not entry.exists:
+            continue
+        store_id = cache.cached(cache.entry_record(entry), "store_id",
+                                lambda: entry.data.get("id") if isinstance(entry.data, dict) else None)
+        if store_id is not None:
+            valid_store_ids.append(store_id)
+    return valid_store_ids
+
+
+def get_store_refs(entry: ManifestEntry) -> list[tuple[str, int, int]]:
+    """The store IDs referenced by a sizes entry, each with the index of the size and the purchase link"""
+    refs = []
+    if not isinstance(entry.data, list):
+        return refs
+    for size_idx, size in enumerate(entry.data):
+        for purchase_link_idx, purchase_link in enumerate(size.get("purchase_links", [])):
+            if "store_id" in purchase_link:
+                refs.append((purchase_link["store_id"], size_idx, purchase_link_idx))
+    return refs
+
+
+def get_profile_refs(entry: ManifestEntry) -> list[tuple[str, str, str]]:
+    """The profiles referenced by a material or filament entry, each as its slicer, its name and its JSON path"""
+    from load_profiles import SLICERS
+
+    refs = []
+    if not isinstance(entry.data, dict):
+        return refs
+    key = SLICER_SETTINGS_KEYS[entry.kind]
+    slicer_settings = entry.data.get(key)
+    if not isinstance(slicer_settings, dict):
+        return refs
+    for slicer in SLICERS:
+        settings = slicer_settings.get(slicer)
+        if isinstance(settings, dict) and isinstance(settings.get("profile_name"), str):
+            refs.append((slicer, settings["profile_name"], f"$.{key}.{slicer}.profile_name"))
+    return refs
+
+
+def check_references(manifest: DataManifest, results: dict[str, ValidationResult], index: ReferenceIndex,
+                     cache: Optional[ValidationCache] = None):
+    """
+    Make sure referenced store IDs in sizes.json files and profile names in material.json and filament.json files exist
+    Only the references of the checks in results ("store-ids" and "profile-names") are checked
+    """
+    from load_profiles import strip_printer_suffix
+
+    if cache is None:
+        cache = ValidationCache()
+    store_ids_result = results.get("store-ids")
+    profile_names_result = results.get("profile-names")
+
+    # The references are cached rather than the messages, as the messages also depend on the indexes
+    for entry in manifest.entries:
+        if not entry.exists:
             continue
 
-        # Validate brand folder name
-        brand_file = _brand_dir.joinpath("brand.json")
-        if brand_file.exists():
-            brand_data = get_json_from_file(brand_file)
-            brand_name = cleanse_folder_name(brand_data.get("brand", ""))
-            if _brand_dir.name != brand_name:
-                is_error_illegal_char = False
-
-                for char in brand_name:
-                    if char in illegal_characters:
-                        is_error_illegal_char = True
-
-                if not is_error_illegal_char:
-                    print("The name of the folder", _brand_dir,
-                        f"does not match the value of 'brand' ({brand_name}) of", brand_file.name)
-                    failed_validation = True
-
-        for _material_dir in _brand_dir.iterdir():
-            if not _material_dir.is_dir():
+        if entry.kind == "sizes" and store_ids_result is not None:
+            store_refs = cache.cached(cache.entry_record(entry), "refs", lambda: get_store_refs(entry))
+            for store_id, size_idx, purchase_link_idx in store_refs:
+                if store_id not in index.store_ids:
+                    store_ids_result.error(
+                        f"'{store_id}' is not a valid store ID. Found in {entry.path} at location $[{size_idx}].purchase_links[{purchase_link_idx}]",
+                        rule="store-id", file=entry.path,
+                        json_path=f"$[{size_idx}].purchase_links[{purchase_link_idx}].store_id")
+
+        elif entry.kind in SLICER_SETTINGS_KEYS and profile_names_result is not None:
+            profile_refs = cache.cached(cache.entry_record(entry), "profile_refs", lambda: get_profile_refs(entry))
+            for slicer, profile_name, json_path in profile_refs:
+                if strip_printer_suffix(profile_name) not in index.profile_names.get(slicer, ()):
+                    profile_names_result.error(
+                        f"'{profile_name}' is not a known {slicer} profile name. Found in {entry.path} at location {json_path}",
+                        rule="profile-name", file=entry.path, json_path=json_path)
+
+
+def check_store_ids(manifest: DataManifest, result: ValidationResult, valid_store_ids: Optional[Iterable[str]] = None,
+                    cache: Optional[ValidationCache] = None):
+    """
+    Make sure referenced IDs in sizes.json files are valid
+    :param valid_store_ids: The known store IDs, taken from the store entries of the manifest if not provided
+    """
+    if valid_store_ids is None:
+        valid_store_ids = get_store_ids(manifest, cache)
+    check_references(manifest, {"store-ids": result}, ReferenceIndex(valid_store_ids), cache)
+
+
+def check_profile_names(manifest: DataManifest, result: ValidationResult, profiles_dir: PathLike = "./profiles",
+                        cache: Optional[ValidationCache] = None):
+    """Make sure the profile names in the slicer settings of material.json and filament.json files exist"""
+    index = ReferenceIndex.build(DataManifest(), profiles_dir, cache)
+    check_references(manifest, {"profile-names": result}, index, cache)
+
+
+# -------------------------
+# Validating changes
+# Only the files changed since a git revision are validated, along with the files depending on them.
+# -------------------------
+
+class Selection:
+    """The entries to validate, everything else is skipped"""
+    paths: set[str]  # Paths of selected JSON files, and folders of which all JSON files are selected
+    kinds: set[str]  # Kinds of which every entry is selected
+
+    def __init__(self):
+        self.paths = set()
+        self.kinds = set()
+
+    def __len__(self):
+        return len(self.paths) + len(self.kinds)
+
+    def includes(self, entry: ManifestEntry) -> bool:
+        return entry.kind in self.kinds or entry.path.as_posix() in self.paths or entry.folder.as_posix() in self.paths
+
+    def includes_unit(self, kind: str, folder: Path) -> bool:
+        """If the brand or store folder may have selected entries"""
+        if len(self.kinds) > 0 and (kind == "store") == ("store" in self.kinds):
+            return True
+        if kind == "brand" and len(self.kinds - {"store"}) > 0:
+            return True
+        prefix = folder.as_posix()
+        return any(x == prefix or x.startswith(prefix + "/") for x in self.paths)
+
+
+def run_git(*args: str) -> str:
+    import subprocess
+
+    return subprocess.run(["git", *args], capture_output=True, text=True, encoding="utf8", check=True).stdout
+
+
+def get_changed_paths(rev: str) -> list[str]:
+    """The paths of the files that were added, changed or removed since the revision, including uncommitted changes"""
+    changed = run_git("diff", "--name-only", "--no-renames", "--relative", "-z", rev).split("\0")
+    changed += run_git("ls-files", "--others", "--exclude-standard", "-z").split("\0")
+    return sorted({x for x in changed if x != ""})
+
+
+def get_json_at_revision(rev: str, path: str) -> Any:
+    """The content of a JSON file at the revision, None if it didn't exist or couldn't be loaded"""
+    from subprocess import CalledProcessError
+
+    try:
+        return json.loads(run_git("show", f"{rev}:./{path}"))
+    except (CalledProcessError, ValueError):
+        return None
+
+
+def build_store_index(units: list[tuple[str, Path]], cache: ValidationCache) -> dict[str, set[str]]:
+    """
+    Maps each store ID to the sizes.json files referencing it
+    The references are kept in the cache records, so with a cache only the changed sizes.json files are loaded
+    """
+    index: dict[str, set[str]] = {}
+    for kind, folder in units:
+        if kind != "brand":
+            continue
+        for entry in scan_unit(kind, folder).of_kind("sizes"):
+            if not entry.exists:
                 continue
+            for store_id, _, _ in cache.cached(cache.entry_record(entry), "refs", lambda: get_store_refs(entry)):
+                index.setdefault(store_id, set()).add(entry.path.as_posix())
+    return index
 
-            # Validate material folder name
-            material_file = _material_dir.joinpath("material.json")
-            if material_file.exists():
-                material_data = get_json_from_file(material_file)
-                material_name = cleanse_folder_name(material_data.get("material", ""))
-                if _material_dir.name != material_name:
-                    print("The name of the folder", _material_dir,
-                          f"does not match the value of 'material' ({material_name}) of", material_file.name)
-                    failed_validation = True
-
-            for _filament_dir in _material_dir.iterdir():
-                if not _filament_dir.is_dir():
-                    continue
 
-                # Validate filament folder name
-                filament_file = _filament_dir.joinpath("filament.json")
-                if filament_file.exists():
-                    filament_data = get_json_from_file(filament_file)
-                    filament_name = cleanse_folder_name(filament_data.get("name", ""))
-                    if _filament_dir.name != filament_name:
-                        print("The name of the folder", _filament_dir,
-                              f"does not match the value of 'name' ({filament_name}) of", filament_file.name)
-                        failed_validation = True
-
-                for _variant_dir in _filament_dir.iterdir():
-                    if not _variant_dir.is_dir():
-                        continue
-
-                    # Validate variant folder name
-                    variant_file = _variant_dir.joinpath("variant.json")
-                    if variant_file.exists():
-                        variant_data = get_json_from_file(variant_file)
-                        variant_name = cleanse_folder_name(variant_data.get("color_name", ""))
-                        if _variant_dir.name != variant_name:
-                            print("The name of the folder", _variant_dir,
-                                  f"does not match the value of 'color_name' ({variant_name}) of", variant_file.name)
-                            failed_validation = True
-
-    for _store_dir in Path("./stores").iterdir():
-        if not _store_dir.is_dir():
+def select_changes(rev: str, data_dir: PathLike = "./data", stores_dir: PathLike = "./stores",
+                   profiles_dir: PathLike = "./profiles", cache: Optional[ValidationCache] = None) -> Optional[Selection]:
+    """
+    Select the entries affected by the changes since the revision
+    - A changed file selects every JSON file in its folder, which also covers a logo of a brand or store
+    - A changed schema selects every file of that kind
+    - A changed material.json selects the filament.json files of the material
+    - A changed store.json selects the sizes.json files referencing its old or new store ID
+    - A changed slicer profile selects every material.json and filament.json file, as they may reference it
+    :returns The selection, or None if everything needs to be validated
+    """
+    if cache is None:
+        cache = ValidationCache()
+    data_dir = Path(data_dir)
+    stores_dir = Path(stores_dir)
+    profiles_dir = Path(profiles_dir)
+    schema_kinds = {registry.schema_path(name).as_posix(): name for name in SCHEMA_FILES}
+
+    selection = Selection()
+    changed_store_ids: set[str] = set()
+    for changed in get_changed_paths(rev):
+        changed_path = Path(changed)
+        if changed in VALIDATOR_FILES:
+            return None
+
+        if changed_path.resolve().as_posix() in schema_kinds:
+            selection.kinds.add(schema_kinds[changed_path.resolve().as_posix()])
+            continue
+
+        if changed_path.is_relative_to(profiles_dir) or changed == "load_profiles.py":
+            selection.kinds.update(SLICER_SETTINGS_KEYS)
             continue
 
-        # Validate brand folder name
-        store_file = _store_dir.joinpath("store.json")
+        if not changed_path.is_relative_to(data_dir) and not changed_path.is_relative_to(stores_dir):
+            continue
+        selection.paths.add(changed_path.parent.as_posix())
 
-        if store_file.exists():
-            store_data = get_json_from_file(store_file)
-            store_id = cleanse_folder_name(store_data.get("id", ""))
-            if _store_dir.name != store_id:
-                print("The name of the folder", _store_dir,
-                    f"does not match the value of 'id' ({store_id}) of", brand_file.name)
-                failed_validation = True
+        if changed_path.name == "material.json" and changed_path.parent.is_dir():
+            selection.paths.update(x.as_posix() for x in sorted_dirs(changed_path.parent))
 
-def validate_store_ids():
-    global failed_validation
+        if changed_path.name == "store.json":
+            for store_data in [get_json_at_revision(rev, changed), get_json_from_file(changed_path) if changed_path.exists() else None]:
+                if isinstance(store_data, dict) and isinstance(store_data.get("id"), str):
+                    changed_store_ids.add(store_data["id"])
 
-    valid_store_ids = []
+    if len(changed_store_ids) > 0:
+        store_index = build_store_index(list_units(data_dir, stores_dir), cache)
+        for store_id in changed_store_ids:
+            selection.paths.update(store_index.get(store_id, set()))
+    return selection
+
+
+# -------------------------
+# Running the checks
+# -------------------------
+
+# The available checks, in the order their messages are emitted
+CHECKS = ["json-files", "logo-files", "folder-names", "store-ids", "profile-names"]
 
-    # Get the valid IDs
-    for _store_file in Path("./stores").glob("*/store.json"):
-        if _store_file.exists():
-            store_data = get_json_from_file(_store_file)
-            if "id" in store_data:
-                valid_store_ids.append(store_data["id"])
-
-    # Make sure referenced IDs in sizes.json files are valid
-    for _sizes_file in Path("./data").glob("**/sizes.json"):
-        sizes_data = get_json_from_file(_sizes_file)
-        for size_idx, size in enumerate(sizes_data):
-            for purchase_link_idx, purchase_link in enumerate(size.get("purchase_links", [])):
-                if "store_id" in purchase_link:
-                    if purchase_link["store_id"] not in valid_store_ids:
-                        print(
-                            f"'{purchase_link['store_id']}' is not a valid store ID. Found in {_sizes_file} at location $[{size_idx}].purchase_links[{purchase_link_idx}]")
-                        failed_validation = True
+
+def validate_unit(unit: tuple[str, Path], cache: Optional[ValidationCache], checks: list[str],
+                  references: ReferenceIndex, selection: Optional[Selection] = None
+                  ) -> tuple[dict[str, ValidationResult], dict[str, dict], ValidationStats]:
+    """
+    Scan a single brand or store folder and run the checks on it
+    This is the task each worker runs when validating in parallel
+    :param cache: The cache records of the files within the folder
+    :param selection: The entries to check, every entry is checked if None
+    :returns The result of each check, the updated cache records of the folder and the stats of the task
+    """
+    if cache is None:
+        cache = ValidationCache()
+    stats = ValidationStats()
+    with stats.phase("scan"):
+        manifest = scan_unit(*unit)
+
+    # Make sure the records of every file are kept, even those the enabled checks don't need
+    for entry in manifest.entries:
+        if entry.raw is not None:
+            stats.count("files_scanned")
+            stats.count("bytes_read", len(entry.raw))
+        cache.entry_record(entry)
+
+    if selection is not None:
+        manifest = DataManifest([x for x in manifest.entries if selection.includes(x)])
+    results = check_manifest(manifest, checks, references, cache, stats)
+
+    # Logo records are kept as long as the logo exists, as not every run checks the logos
+    records = cache.used_records()
+    for key, record in cache.records.items():
+        if record.get("kind") == "logo" and key not in records and Path(key).exists():
+            records[key] = record
+    stats.count("cache_hits", cache.hits)
+    stats.count("cache_misses", cache.misses)
+    return results, records, stats
+
+
+def check_manifest(manifest: DataManifest, checks: list[str], references: ReferenceIndex, cache: ValidationCache,
+                   stats: ValidationStats) -> dict[str, ValidationResult]:
+    """Run the checks on the entries of the manifest, returns the result of each check"""
+    results = {check: ValidationResult(check) for check in checks}
+    if "json-files" in checks:
+        with stats.phase("json-files"):
+            check_json_schemas(manifest, results["json-files"], cache, stats)
+    if "logo-files" in checks:
+        with stats.phase("logo-files"):
+            check_logo_files(manifest, results["logo-files"], cache, stats)
+    if "folder-names" in checks:
+        with stats.phase("folder-names"):
+            check_folder_names(manifest, results["folder-names"], cache)
+    if "store-ids" in checks or "profile-names" in checks:
+        with stats.phase("references"):
+            check_references(manifest, results, references, cache)
+    return results
+
+
+def check_unit_logos(units: list[tuple[str, Path]], cache: ValidationCache, selection: Optional[Selection] = None,
+                     stats: Optional[ValidationStats] = None) -> list[ValidationResult]:
+    """
+    Check the logos of the brand and store folders, probing every logo on a single thread pool
+    :returns The result of each folder, in the order of the folders
+    """
+    if stats is None:
+        stats = ValidationStats()
+    entries = [ManifestEntry(kind, folder) for kind, folder in units]
+    logo_units: list[int] = []
+    logo_files: list[Path] = []
+    for idx, entry in enumerate(entries):
+        if entry.raw is not None:
+            stats.count("files_scanned")
+            stats.count("bytes_read", len(entry.raw))
+        if selection is not None and not selection.includes(entry):
+            continue
+        for logo_file in get_logo_files(DataManifest([entry]), cache):
+            logo_units.append(idx)
+            logo_files.append(logo_file)
+
+    results = [ValidationResult("logo-files") for _ in units]
+    for idx, logo_file, record in zip(logo_units, logo_files, probe_logos(logo_files, cache, stats)):
+        validate_icon(logo_file, record["size"], results[idx])
+    return results
+
+
+def run_validation(checks: list[str], jobs: int = 1,
+                   data_dir: PathLike = "./data", stores_dir: PathLike = "./stores",
+                   profiles_dir: PathLike = "./profiles",
+                   cache: Optional[ValidationCache] = None, selection: Optional[Selection] = None,
+                   stats: Optional[ValidationStats] = None) -> ValidationResult:
+    """
+    Run the checks on every brand and store folder
+    The messages are ordered by check, then by folder, so the output doesn't depend on the number of jobs
+    :param jobs: The number of worker processes, 1 runs everything in this process
+    :param cache: Results of earlier runs, updated with the results of this run
+    :param selection: The entries to check, every entry is checked if None
+    :param stats: Updated with the counters and timings of the run, the "total" timing is the time the run took
+    """
+    checks = [x for x in CHECKS if x in checks]
+    if len(checks) == 0:
+        return ValidationResult()
+    if cache is None:
+        cache = ValidationCache()
+    if stats is None:
+        stats = ValidationStats()
+    start = time.perf_counter()
+    units = list_units(data_dir, stores_dir)
+
+    # The referenced store IDs and profiles are needed by every unit, so they're indexed up front
+    references = ReferenceIndex()
+    if "store-ids" in checks or "profile-names" in checks:
+        with stats.phase("index"):
+            stores = DataManifest([entry for kind, folder in units if kind == "store" for entry in scan_store(folder)]
+                                  if "store-ids" in checks else [])
+            references = ReferenceIndex.build(stores, profiles_dir if "profile-names" in checks else None, cache)
+
+    selected = [i for i, unit in enumerate(units) if selection is None or selection.includes_unit(*unit)]
+
+    # The logos of all units are checked here, so they can share a thread pool
+    logo_results = {}
+    if "logo-files" in checks:
+        with stats.phase("logo-files"):
+            logo_results = dict(zip(selected, check_unit_logos([units[i] for i in selected], cache, selection, stats)))
+    stats.count("cache_hits", cache.hits)
+    stats.count("cache_misses", cache.misses)
+
+    unit_caches = cache.split([folder for _, folder in units])
+
+    # Folders without selected entries aren't scanned, their cache records are kept as they are
+    unit_results = [({check: ValidationResult(check) for check in checks}, unit_cache.records)
+                    for unit_cache in unit_caches]
+
+    unit_checks = [x for x in checks if x != "logo-files"]
+    if len(unit_checks) > 0:
+        task = partial(validate_unit, checks=unit_checks, references=references, selection=selection)
+        if jobs > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                outputs = list(executor.map(task, [units[i] for i in selected], [unit_caches[i] for i in selected]))
+        else:
+            outputs = [task(units[i], unit_caches[i]) for i in selected]
+        for i, (results, records, unit_stats) in zip(selected, outputs):
+            unit_results[i] = (results, records)
+            stats.extend(unit_stats)
+
+    for i, logo_result in logo_results.items():
+        unit_results[i][0]["logo-files"] = logo_result
+
+    # Records of removed brands and stores are dropped
+    cache.records = {k: v for _, records in unit_results for k, v in records.items()}
+
+    result = ValidationResult()
+    for check in checks:
+        for results, _ in unit_results:
+            result.extend(results[check])
+    stats.timings["total"] = stats.timings.get("total", 0.0) + time.perf_counter() - start
+    return result
+
+
+def validate_json_files(data_dir: PathLike = "./data", stores_dir: PathLike = "./stores") -> ValidationResult:
+    return run_validation(["json-files"], data_dir=data_dir, stores_dir=stores_dir)
+
+
+def validate_logo_files(data_dir: PathLike = "./data", stores_dir: PathLike = "./stores") -> ValidationResult:
+    return run_validation(["logo-files"], data_dir=data_dir, stores_dir=stores_dir)
+
+
+def validate_folder_names(data_dir: PathLike = "./data", stores_dir: PathLike = "./stores") -> ValidationResult:
+    return run_validation(["folder-names"], data_dir=data_dir, stores_dir=stores_dir)
+
+
+def validate_store_ids(data_dir: PathLike = "./data", stores_dir: PathLike = "./stores") -> ValidationResult:
+    return run_validation(["store-ids"], data_dir=data_dir, stores_dir=stores_dir)
+
+
+def validate_profile_names(data_dir: PathLike = "./data", stores_dir: PathLike = "./stores",
+                           profiles_dir: PathLike = "./profiles") -> ValidationResult:
+    return run_validation(["profile-names"], data_dir=data_dir, stores_dir=stores_dir, profiles_dir=profiles_dir)
+
+
+# -------------------------
+# Reports
+# Besides the plain messages, the issues and stats of a run can be written as JSON or as SARIF for CI tools.
+# -------------------------
+
+REPORT_FORMATS = ["text", "json", "sarif"]
+REPORT_VERSION = 1
+
+# A short description of each rule an issue can be reported for
+RULES = {
+    "missing-file": "A JSON file or logo that should exist is missing",
+    "invalid-json": "The file could not be read or is not valid JSON",
+    "json-schema": "The JSON file does not match its schema",
+    "logo-path": "The logo is not a plain file name",
+    "logo-unreadable": "The size of the logo could not be read",
+    "logo-aspect-ratio": "The width and height of the logo are unequal",
+    "logo-min-size": "The logo is smaller than the minimum size",
+    "logo-max-size": "The logo is bigger than the maximum size",
+    "folder-name": "The folder is not named after the JSON file within it",
+    "store-id": "A purchase link refers to a store that doesn't exist",
+    "profile-name": "The slicer settings refer to a profile that doesn't exist"
+}
+
+# The SARIF levels of the issue severities
+SARIF_LEVELS = {
+    "error": "error",
+    "warning": "warning"
+}
+
+
+def build_json_report(result: ValidationResult, stats: ValidationStats, checks: list[str]) -> dict:
+    return {
+        "version": REPORT_VERSION,
+        "checks": checks,
+        "failed": result.failed,
+        "issues": [x.to_dict() for x in result.issues],
+        "stats": stats.to_dict()
+    }
+
+
+def build_sarif_report(result: ValidationResult, stats: ValidationStats) -> dict:
+    """A SARIF 2.1.0 log with a single run, the stats are stored in the properties of the run"""
+    sarif_results = []
+    for issue in result.issues:
+        sarif_result: dict[str, Any] = {
+            "ruleId": issue.rule,
+            "level": SARIF_LEVELS.get(issue.severity, "note"),
+            "message": {"text": issue.message}
+        }
+        if issue.file is not None:
+            location: dict[str, Any] = {"physicalLocation": {"artifactLocation": {"uri": issue.file}}}
+            if issue.json_path is not None:
+                location["logicalLocations"] = [{"fullyQualifiedName": issue.json_path, "kind": "member"}]
+            sarif_result["locations"] = [location]
+        sarif_results.append(sarif_result)
+
+    rule_ids = sorted(set(RULES.keys()) | {x.rule for x in result.issues})
+    return {
+        "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+        "version": "2.1.0",
+        "runs": [{
+            "tool": {
+                "driver": {
+                    "name": "data_validator",
+                    "informationUri": "https://github.com/lostboyslab/open-filament-database",
+                    "rules": [{"id": x, "shortDescription": {"text": RULES.get(x, x)}} for x in rule_ids]
+                }
+            },
+            "results": sarif_results,
+            "properties": stats.to_dict()
+        }]
+    }
+
+
+def format_report(report_format: str, result: ValidationResult, stats: ValidationStats, checks: list[str]) -> str:
+    if report_format == "json":
+        return json.dumps(build_json_report(result, stats, checks), indent=4)
+    if report_format == "sarif":
+        return json.dumps(build_sarif_report(result, stats), indent=4)
+    return "\n".join(result.messages)
+
+
+# -------------------------
+# Watching for changes
+# The tree is scanned and validated once, after that only the changed files are read again. The checks are then run
+# against the whole tree kept in memory, which only takes a moment as the results of unchanged files are cached.
+# -------------------------
+
+def get_issue_key(issue: ValidationIssue) -> tuple:
+    return issue.check, issue.rule, issue.file, issue.json_path, issue.message
+
+
+class WatchState:
+    """The scanned brand and store folders and their validation result, as they were after the last change"""
+    checks: list[str]
+    data_dir: Path
+    stores_dir: Path
+    cache: ValidationCache
+    units: dict[Path, DataManifest]  # Keyed by folder, in the order of list_units()
+    profile_names: dict[str, frozenset[str]]
+    result: ValidationResult
+
+    def __init__(self, checks: list[str], data_dir: PathLike = "./data", stores_dir: PathLike = "./stores",
+                 profiles_dir: PathLike = "./profiles", cache: Optional[ValidationCache] = None):
+        if cache is None:
+            cache = ValidationCache()
+        self.checks = [x for x in CHECKS if x in checks]
+        self.data_dir = Path(data_dir)
+        self.stores_dir = Path(stores_dir)
+        self.cache = cache
+        self.units = {folder: scan_unit(kind, folder) for kind, folder in list_units(self.data_dir, self.stores_dir)}
+        self.profile_names = {}
+        if "profile-names" in self.checks:
+            self.profile_names = ReferenceIndex.build(DataManifest(), profiles_dir).profile_names
+        self.result = ValidationResult()
+
+    def manifest(self) -> DataManifest:
+        return DataManifest([entry for unit in self.units.values() for entry in unit.entries])
+
+    def validate(self, stats: Optional[ValidationStats] = None) -> ValidationResult:
+        """Run the checks on the whole tree, only files that changed since the last run are validated again"""
+        if stats is None:
+            stats = ValidationStats()
+        manifest = self.manifest()
+        store_ids = get_store_ids(manifest, self.cache) if "store-ids" in self.checks else []
+        results = check_manifest(manifest, self.checks, ReferenceIndex(store_ids, self.profile_names), self.cache,
+                                 stats)
+
+        self.result = ValidationResult()
+        for check in self.checks:
+            self.result.extend(results[check])
+        return self.result
+
+    def get_unit_folder(self, path: Path) -> Optional[Path]:
+        """The brand or store folder the path is in, None if it isn't in one"""
+        for root in [self.data_dir, self.stores_dir]:
+            if path != root and path.is_relative_to(root):
+                return root.joinpath(path.relative_to(root).parts[0])
+        return None
+
+    def apply(self, changed: set[Path]):
+        """
+        Read the changed files again
+        Changed JSON files are replaced in the tree, folders where files or folders were added or removed are scanned
+        again and schemas that changed are loaded again
+        """
+        schema_kinds = {registry.schema_path(name).resolve(): name for name in SCHEMA_FILES}
+        rescan: set[Path] = set()
+        rescan_all = False
+
+        for path in changed:
+            schema_kind = schema_kinds.get(path.resolve())
+            if schema_kind is not None:
+                registry.clear()
+                for record in self.cache.records.values():
+                    if record.get("kind") == schema_kind:
+                        record.pop("json-files", None)
+                continue
+
+            if path in (self.data_dir, self.stores_dir):
+                rescan_all = True
+                continue
+            unit_folder = self.get_unit_folder(path)
+            if unit_folder is None:
+                continue
+
+            unit = self.units.get(unit_folder)
+            entry_idx = None
+            if unit is not None and path.suffix == ".json":
+                entry_idx = next((i for i, x in enumerate(unit.entries) if x.path == path), None)
+            if entry_idx is not None:
+                entry = unit.entries[entry_idx]
+                unit.entries[entry_idx] = ManifestEntry(entry.kind, entry.folder)
+            elif path.suffix == ".json" or not path.is_file():
+                # Logos are read on every run, so only added or removed JSON files and folders need a new scan
+                rescan.add(unit_folder)
+
+        if rescan_all or len(rescan) > 0:
+            self.units = {folder: self.units[folder] if folder in self.units and folder not in rescan and not rescan_all
+                          else scan_unit(kind, folder)
+                          for kind, folder in list_units(self.data_dir, self.stores_dir)}
+
+
+def watch(checks: list[str], data_dir: PathLike = "./data", stores_dir: PathLike = "./stores",
+          profiles_dir: PathLike = "./profiles", cache: Optional[ValidationCache] = None,
+          polling: bool = False) -> WatchState:
+    """
+    Validate the tree, then validate it again every time something changes and print how the issues changed
+    Runs until interrupted with Ctrl+C
+    :param polling: Poll for changes even if inotify is available
+    :returns The state after the last change
+    """
+    from file_watcher import create_watcher
+
+    state = WatchState(checks, data_dir, stores_dir, profiles_dir, cache)
+    for message in state.validate().messages:
+        print(message)
+
+    with create_watcher([state.data_dir, state.stores_dir, registry.schema_dir], polling) as watcher:
+        print(f"Watching for changes with {type(watcher).__name__}, press Ctrl+C to stop")
+        try:
+            while True:
+                changed = watcher.wait()
+                if len(changed) == 0:
+                    continue
+                start = time.perf_counter()
+                old_result = state.result
+                state.apply(changed)
+                new_result = state.validate()
+                elapsed = time.perf_counter() - start
+
+                old_keys = {get_issue_key(x) for x in old_result.issues}
+                new_keys = {get_issue_key(x) for x in new_result.issues}
+                fixed = [x for x in old_result.issues if get_issue_key(x) not in new_keys]
+                added = [x for x in new_result.issues if get_issue_key(x) not in old_keys]
+                for issue in fixed:
+                    print("-", issue.message)
+                for issue in added:
+                    print("+", issue.message)
+                print(f"[{time.strftime('%H:%M:%S')}] {len(new_result.issues)} issues, "
+                      f"{len(added)} new, {len(fixed)} fixed ({elapsed * 1000:.0f} ms)")
+        except KeyboardInterrupt:
+            pass
+    return state
 
 
 if __name__ == '__main__':
@@ -334,19 +1364,51 @@ if __name__ == '__main__':
     parser.add_argument("--logo-files", action="store_true")
     parser.add_argument("--folder-names", action="store_true")
     parser.add_argument("--store-ids", action="store_true")
+    parser.add_argument("--profile-names", action="store_true",
+                        help="Check the slicer profile names against the profiles extracted by load_profiles.py")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Number of worker processes to validate with, 0 uses every CPU core")
+    parser.add_argument("--changed-since", metavar="REV",
+                        help="Only validate the files changed since the git revision, and the files depending on them")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_FILE, metavar="CACHE_FILE",
+                        help=f"Only re-validate files that changed since the last run, results are kept in CACHE_FILE (default: {DEFAULT_CACHE_FILE})")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep validating the files as they change, only printing the issues that were added or fixed")
+    parser.add_argument("--polling", action="store_true",
+                        help="Poll for changes in watch mode, instead of using inotify")
+    parser.add_argument("--report", choices=REPORT_FORMATS, default="text",
+                        help="The format of the output, json and sarif include the timings and counters of the run")
+    parser.add_argument("--report-file", metavar="FILE",
+                        help="Write the report to FILE and print the plain messages instead")
 
     args = parser.parse_args()
-    if args.json_files:
-        validate_json_files()
-
-    if args.logo_files:
-        validate_logo_files()
-
-    if args.folder_names:
-        validate_folder_names()
-
-    if args.store_ids:
-        validate_store_ids()
-
-    if failed_validation:
+    enabled_checks = [x for x in CHECKS if getattr(args, x.replace("-", "_"))]
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+
+    validation_cache = ValidationCache.load(args.cache) if args.cache else ValidationCache()
+
+    if args.watch:
+        watch_state = watch(enabled_checks, cache=validation_cache, polling=args.polling)
+        if args.cache:
+            validation_cache.records = {k: v for k, v in validation_cache.records.items() if Path(k).exists()}
+            validation_cache.save(args.cache)
+        exit(-1 if watch_state.result.failed else 0)
+
+    validation_selection = select_changes(args.changed_since, cache=validation_cache) if args.changed_since else None
+
+    validation_stats = ValidationStats()
+    validation_result = run_validation(enabled_checks, jobs, cache=validation_cache, selection=validation_selection,
+                                       stats=validation_stats)
+    report = format_report(args.report, validation_result, validation_stats, enabled_checks)
+    if args.report_file:
+        with open(args.report_file, mode="w", encoding="utf8") as report_file:
+            report_file.write(report + "\n")
+        report = format_report("text", validation_result, validation_stats, enabled_checks)
+    if len(report) > 0:
+        print(report)
+
+    if args.cache:
+        validation_cache.save(args.cache)
+
+    if validation_result.failed:
         exit(-1)
@@ -0,0 +1,288 @@
+from typing import Iterable, Optional
+
+import numpy as np
+
+from db_serializer import Brand, Filament, FilamentSize, FilamentVariant, Material, VariantTraits
+
+# The bit of each trait in the traits column
+TRAIT_BITS = {name: 1 << idx for idx, name in enumerate(VariantTraits.__slots__)}
+
+# Columns that hold a number, missing values are NaN
+NUMBER_COLUMNS = ["filament_weight", "diameter", "empty_spool_weight", "spool_core_diameter", "density",
+                  "diameter_tolerance", "max_dry_temperature"]
+# Columns that hold a string, these are dictionary encoded (see StringColumn)
+STRING_COLUMNS = ["brand", "material", "filament", "color_name", "ean", "article_number"]
+
+
+# ---------------------------------
+# Columns
+# ---------------------------------
+
+class StringColumn:
+    """
+    A dictionary encoded column of strings
+    Every row holds the index of its string in values, or -1 if it has none
+    Like a numpy array, == and != compare every row with a string and give a mask instead of a bool, so columns
+    can't be compared with each other or hashed
+    """
+    codes: np.ndarray
+    values: list[str]
+    __hash__ = None
+
+    def __init__(self, codes: np.ndarray, values: list[str]):
+        self.codes = codes
+        self.values = values
+        self.__lookup = {value: code for code, value in enumerate(values)}
+
+    @staticmethod
+    def from_strings(strings: Iterable[Optional[str]]) -> 'StringColumn':
+        lookup: dict[str, int] = {}
+        codes = [-1 if x is None else lookup.setdefault(x, len(lookup)) for x in strings]
+        return StringColumn(np.array(codes, dtype=np.int32), list(lookup))
+
+    def isin(self, *values: str) -> np.ndarray:
+        """A mask of the rows that hold one of the values"""
+        codes = [self.__lookup[x] for x in values if x in self.__lookup]
+        return np.isin(self.codes, codes)
+
+    def __eq__(self, value: str) -> np.ndarray:
+        """A mask of the rows that hold the value, see isin"""
+        return self.isin(value)
+
+    def __ne__(self, value: str) -> np.ndarray:
+        return ~self.isin(value)
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        code = self.codes[row]
+        return None if code < 0 else self.values[code]
+
+    def __len__(self):
+        return len(self.codes)
+
+
+# ---------------------------------
+# Size table
+# ---------------------------------
+
+class SizeTable:
+    """
+    A columnar view over every size of a loaded database, with a row for each FilamentSize
+    Filters are masks over the columns, for example the 1.75 mm spools of 750 g to 1 kg that are still sold:
+        mask = (table["diameter"] == 1.75) & (table["filament_weight"] >= 750) & (table["filament_weight"] <= 1000) \\
+               & (table["empty_spool_weight"] < 200) & ~table["discontinued"]
+        sizes = table.get_sizes(mask)
+    The table is a snapshot, build a new one after the database changed
+    """
+    # The objects each row came from, the row id is the index into these lists
+    sizes: list[FilamentSize]
+    variants: list[FilamentVariant]
+    filaments: list[Filament]
+    materials: list[Material]
+    brands: list[Brand]
+    columns: dict[str, np.ndarray | StringColumn]
+
+    def __init__(self, sizes: list[FilamentSize], variants: list[FilamentVariant], filaments: list[Filament],
+                 materials: list[Material], brands: list[Brand]):
+        self.sizes = sizes
+        self.variants = variants
+        self.filaments = filaments
+        self.materials = materials
+        self.brands = brands
+        self.columns = {}
+
+        def numbers(values: Iterable[Optional[float]]) -> np.ndarray:
+            return np.array([np.nan if x is None else x for x in values], dtype=np.float64)
+
+        # Cache the values that are the same for every size of a filament or variant
+        max_dry_temperatures = {id(x): x.get_max_dry_temperature() for x in set(filaments)}
+
+        self.columns["filament_weight"] = numbers(x.filament_weight for x in sizes)
+        self.columns["diameter"] = numbers(x.diameter for x in sizes)
+        self.columns["empty_spool_weight"] = numbers(x.empty_spool_weight for x in sizes)
+        self.columns["spool_core_diameter"] = numbers(x.spool_core_diameter for x in sizes)
+        self.columns["density"] = numbers(x.density for x in filaments)
+        self.columns["diameter_tolerance"] = numbers(x.diameter_tolerance for x in filaments)
+        self.columns["max_dry_temperature"] = numbers(max_dry_temperatures[id(x)] for x in filaments)
+
+        self.columns["discontinued"] = np.array(
+            [size.get_discontinued(variant, filament) for size, variant, filament in zip(sizes, variants, filaments)],
+            dtype=np.bool_)
+
+        trait_bits: dict[int, int] = {}
+        for variant in variants:
+            if id(variant) not in trait_bits:
+                trait_bits[id(variant)] = sum(bit for name, bit in TRAIT_BITS.items() if getattr(variant.traits, name))
+        self.columns["traits"] = np.array([trait_bits[id(x)] for x in variants], dtype=np.uint8)
+
+        self.columns["brand"] = StringColumn.from_strings(x.brand_name for x in brands)
+        self.columns["material"] = StringColumn.from_strings(x.material_name for x in materials)
+        self.columns["filament"] = StringColumn.from_strings(x.name for x in filaments)
+        self.columns["color_name"] = StringColumn.from_strings(x.color_name for x in variants)
+        self.columns["ean"] = StringColumn.from_strings(x.ean for x in sizes)
+        self.columns["article_number"] = StringColumn.from_strings(x.article_number for x in sizes)
+
+    @staticmethod
+    def from_brands(brands: Iterable[Brand]) -> 'SizeTable':
+        """Builds the table from loaded brands, see db_serializer.load_database"""
+        sizes = []
+        variants = []
+        filaments = []
+        materials = []
+        row_brands = []
+        for brand in brands:
+            for material in brand.materials:
+                for filament in material.filaments:
+                    for variant in filament.variants:
+                        for size in variant.sizes:
+                            sizes.append(size)
+                            variants.append(variant)
+                            filaments.append(filament)
+                            materials.append(material)
+                            row_brands.append(brand)
+        return SizeTable(sizes, variants, filaments, materials, row_brands)
+
+    def __getitem__(self, column: str) -> np.ndarray | StringColumn:
+        return self.columns[column]
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def has_traits(self, *traits: str) -> np.ndarray:
+        """A mask of the rows whose variant has all the traits"""
+        bits = sum(TRAIT_BITS[x] for x in traits)
+        return (self.columns["traits"] & bits) == bits
+
+    def get_rows(self, mask: np.ndarray) -> np.ndarray:
+        """The row ids of the rows in the mask"""
+        return np.flatnonzero(mask)
+
+    def get_sizes(self, mask: np.ndarray) -> list[FilamentSize]:
+        return [self.sizes[x] for x in self.get_rows(mask)]
+
+    def get_variants(self, mask: np.ndarray) -> list[FilamentVariant]:
+        """The variants of the rows in the mask, every variant is only returned once"""
+        return list({id(x): x for x in (self.variants[row] for row in self.get_rows(mask))}.values())
+
+
+# ---------------------------------
+# Color index
+# ---------------------------------
+
+# The D65 white point, which sRGB is defined against
+WHITE_POINT = np.array([0.95047, 1.0, 1.08883])
+SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041]
+])
+
+
+def hex_to_lab(color_hexes: list[str]) -> np.ndarray:
+    """
+    Converts sRGB hex colors (without the '#', see normalize_color_hex) to CIELAB
+    :returns An array with the L*, a* and b* of each color
+    """
+    values = np.array([int(x, 16) for x in color_hexes], dtype=np.uint32).reshape(-1, 1)
+    rgb = ((values >> np.array([16, 8, 0], dtype=np.uint32)) & 0xFF) / 255.0
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ SRGB_TO_XYZ.T / WHITE_POINT
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+class ColorIndex:
+    """
+    Finds the variants with the closest color to a given color
+    Every color of a variant is converted to CIELAB once, the distance between two colors is their ΔE (CIE76), the
+    euclidean distance in CIELAB. A variant with several colors is as close as its closest color
+    There's a row for every color and diameter of a variant, so queries can filter on the diameter of the sizes
+    Like SizeTable this is a snapshot, build a new one after the variants changed
+    """
+    variants: list[FilamentVariant]
+    lab: np.ndarray
+    columns: dict[str, np.ndarray | StringColumn]
+
+    def __init__(self, variants: list[FilamentVariant], materials: list[Material]):
+        self.variants = variants
+        variant_ids = []
+        color_hexes = []
+        diameters = []
+        for variant_id, variant in enumerate(variants):
+            variant_diameters = {x.diameter for x in variant.sizes} or {np.nan}
+            for color_hex in variant.color_hex:
+                for diameter in variant_diameters:
+                    variant_ids.append(variant_id)
+                    color_hexes.append(color_hex)
+                    diameters.append(diameter)
+
+        self.lab = hex_to_lab(color_hexes) if len(color_hexes) > 0 else np.empty((0, 3))
+        # Contiguous copies of L*, a* and b*, which are quicker to compute with than the columns of lab
+        self.__lab_columns = [np.ascontiguousarray(self.lab[:, x]) for x in range(3)]
+        self.columns = {
+            "variant": np.array(variant_ids, dtype=np.int32),
+            "diameter": np.array(diameters, dtype=np.float64)
+        }
+        material_codes = StringColumn.from_strings(x.material_name for x in materials)
+        self.columns["material"] = StringColumn(material_codes.codes[self.columns["variant"]], material_codes.values)
+        trait_bits = np.array([sum(bit for name, bit in TRAIT_BITS.items() if getattr(x.traits, name))
+                               for x in variants], dtype=np.uint8)
+        self.columns["traits"] = trait_bits[self.columns["variant"]]
+
+    @staticmethod
+    def from_brands(brands: Iterable[Brand]) -> 'ColorIndex':
+        variants = []
+        materials = []
+        for brand in brands:
+            for material in brand.materials:
+                for filament in material.filaments:
+                    variants.extend(filament.variants)
+                    materials.extend(material for _ in filament.variants)
+        return ColorIndex(variants, materials)
+
+    def nearest(self, color_hex: str, k: int = 10, materials: Optional[list[str]] = None,
+                diameter: Optional[float] = None, traits: Iterable[str] = ()) -> list[tuple[FilamentVariant, float]]:
+        """
+        The k variants closest to the color
+        :param color_hex: The color, with or without the leading '#'
+        :param materials: Only variants of these materials
+        :param diameter: Only variants with a size of this diameter
+        :param traits: Only variants with all of these traits
+        :returns The variants along with their ΔE, closest first
+        """
+        target = hex_to_lab([color_hex.strip().lstrip("#")])[0]
+        mask = None
+        if materials is not None:
+            mask = self.columns["material"].isin(*materials)
+        if diameter is not None:
+            diameter_mask = self.columns["diameter"] == diameter
+            mask = diameter_mask if mask is None else mask & diameter_mask
+        bits = sum(TRAIT_BITS[x] for x in traits)
+        if bits:
+            traits_mask = (self.columns["traits"] & bits) == bits
+            mask = traits_mask if mask is None else mask & traits_mask
+
+        rows = np.arange(len(self.lab)) if mask is None else np.flatnonzero(mask)
+        # Squared distances sort the same as the distances, the square root is only taken of the results
+        distances = np.zeros(len(rows))
+        for column, value in zip(self.__lab_columns, target):
+            distances += np.square((column if mask is None else column[rows]) - value)
+        row_variants = self.columns["variant"][rows]
+
+        # A variant can have more than one row, so look at more rows than needed and skip the repeats
+        candidates = min(len(rows), k * 4)
+        while True:
+            if candidates < len(rows):
+                closest = np.argpartition(distances, candidates)[:candidates]
+            else:
+                closest = np.arange(len(rows))
+            closest = closest[np.argsort(distances[closest], kind="stable")]
+
+            found: dict[int, float] = {}
+            for variant_id, distance in zip(row_variants[closest].tolist(), distances[closest].tolist()):
+                if variant_id not in found:
+                    found[variant_id] = distance
+                    if len(found) == k:
+                        break
+            if len(found) == k or candidates >= len(rows):
+                return [(self.variants[x], distance ** 0.5) for x, distance in found.items()]
+            candidates = min(len(rows), candidates * 4)
@@ -0,0 +1,249 @@
+import csv
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, TextIO, Union
+
+from db_serializer import Brand, Database, DEFAULT_ROOT, Filament, FilamentSize, FilamentVariant, Material, \
+    SizePurchaseLink, VariantTraits, as_list, cleanse_folder_name
+
+PathLike = Union[str, os.PathLike[str]]
+
+EXPORT_FORMATS = ["ndjson", "csv"]
+
+
+class RowSource:
+    """The objects a row is made from, a purchase link along with everything it belongs to"""
+    __slots__ = ("brand", "material", "filament", "variant", "size", "link")
+
+    brand: Brand
+    material: Material
+    filament: Filament
+    variant: FilamentVariant
+    size: FilamentSize
+    link: SizePurchaseLink
+
+    def __init__(self, brand: Brand, material: Material, filament: Filament, variant: FilamentVariant,
+                 size: FilamentSize, link: SizePurchaseLink):
+        self.brand = brand
+        self.material = material
+        self.filament = filament
+        self.variant = variant
+        self.size = size
+        self.link = link
+
+
+# Every column that can be exported, in their default order
+COLUMNS: dict[str, Callable[[RowSource], Any]] = {
+    "brand": lambda x: x.brand.brand_name,
+    "brand_website": lambda x: x.brand.website,
+    "brand_origin": lambda x: x.brand.origin,
+    "material": lambda x: x.material.material_name,
+    "filament": lambda x: x.filament.name,
+    "density": lambda x: x.filament.density,
+    "diameter_tolerance": lambda x: x.filament.diameter_tolerance,
+    "max_dry_temperature": lambda x: x.filament.get_max_dry_temperature(),
+    "data_sheet_url": lambda x: x.filament.data_sheet_url,
+    "color_name": lambda x: x.variant.color_name,
+    "color_hex": lambda x: x.variant.pretty_color_hex,
+    "traits": lambda x: [name for name in VariantTraits.__slots__ if getattr(x.variant.traits, name)],
+    "filament_weight": lambda x: x.size.filament_weight,
+    "diameter": lambda x: x.size.diameter,
+    "empty_spool_weight": lambda x: x.size.empty_spool_weight,
+    "spool_core_diameter": lambda x: x.size.spool_core_diameter,
+    "ean": lambda x: x.size.ean,
+    "article_number": lambda x: x.size.article_number,
+    "discontinued": lambda x: x.size.get_discontinued(x.variant, x.filament),
+    "store_id": lambda x: x.link.store.store_id,
+    "store_name": lambda x: x.link.store.name,
+    "url": lambda x: x.link.url,
+    "affiliate": lambda x: x.link.affiliate,
+    "spool_refill": lambda x: x.link.spool_refill,
+    "ships_from": lambda x: as_list(x.link.get_ships_from()),
+    "ships_to": lambda x: as_list(x.link.get_ships_to())
+}
+
+
+# ---------------------------------
+# Walking the data folder
+# ---------------------------------
+
+def read_name(json_file: Path, key: str) -> Optional[str]:
+    """The name in a json file, without validating it"""
+    try:
+        with json_file.open(mode="r", encoding="utf8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data.get(key) if isinstance(data, dict) else None
+
+
+def sub_folders(folder: Path, names: Optional[Iterable[str]] = None, json_name: Optional[str] = None,
+                name_key: Optional[str] = None) -> list[Path]:
+    """
+    The folders within a folder, sorted so the rows always come out in the same order
+    :param names: Only the folders of the objects with these names, a name can be given as it's in the json file of
+        the object (the name_key of json_name within the folder) or as the name of its folder
+    """
+    folders = sorted(x for x in folder.iterdir() if x.is_dir())
+    if names is not None:
+        names = set(names)
+        folder_names = {cleanse_folder_name(x) for x in names}
+        # Names with characters that can't be in a folder name don't match their folder, so those folders are
+        # matched by the name in their json file
+        folders = [x for x in folders
+                   if x.name in folder_names or read_name(x.joinpath(json_name), name_key) in names]
+    return folders
+
+
+def iter_sources(database: Database, brands: Optional[Iterable[str]] = None,
+                 materials: Optional[Iterable[str]] = None) -> Iterator[RowSource]:
+    """
+    Walks the data folder, a variant at a time, only the objects of the current variant and its parents are loaded
+    :param brands: Only walk the folders of the brands with these names, see sub_folders
+    :param materials: Only walk the folders of the materials with these names, see sub_folders
+    """
+    with database:
+        for brand_folder in sub_folders(database.data_dir, brands, "brand.json", "brand"):
+            if not Brand.check_folder(brand_folder):
+                continue
+            brand = Brand.from_json_file(brand_folder.joinpath("brand.json"), None)
+            if brand is None:
+                continue
+
+            for material_folder in sub_folders(brand_folder, materials, "material.json", "material"):
+                material = Material.from_json_file(material_folder.joinpath("material.json"), None) \
+                    if Material.check_folder(material_folder) else None
+                if material is None:
+                    continue
+
+                for filament_folder in sub_folders(material_folder):
+                    filament = Filament.from_json_file(filament_folder.joinpath("filament.json"), material) \
+                        if Filament.check_folder(filament_folder) else None
+                    if filament is None:
+                        continue
+
+                    for variant_folder in sub_folders(filament_folder):
+                        variant = FilamentVariant.from_folder(variant_folder, filament)
+                        if variant is None:
+                            continue
+                        for size in variant.sizes:
+                            for link in size.purchase_links:
+                                yield RowSource(brand, material, filament, variant, size, link)
+
+
+def iter_rows(database: Database, columns: Optional[list[str]] = None,
+              where: Optional[Callable[[dict], bool]] = None, brands: Optional[Iterable[str]] = None,
+              materials: Optional[Iterable[str]] = None) -> Iterator[dict]:
+    """
+    One row for every purchase link of every size, joined with its variant, filament, material, brand and store
+    :param columns: The columns of each row (see COLUMNS), defaults to all of them
+    :param where: Only rows this returns True for are yielded, it's called with the row before columns is applied
+    """
+    if columns is None:
+        columns = list(COLUMNS)
+    for name in columns:
+        if name not in COLUMNS:
+            raise ValueError(f"Unknown column '{name}', the columns are: {', '.join(COLUMNS)}")
+
+    for source in iter_sources(database, brands, materials):
+        if where is None:
+            yield {name: COLUMNS[name](source) for name in columns}
+            continue
+        row = {name: get_value(source) for name, get_value in COLUMNS.items()}
+        if where(row):
+            yield {name: row[name] for name in columns}
+
+
+# ---------------------------------
+# Writing
+# ---------------------------------
+
+def write_ndjson(rows: Iterable[dict], output: TextIO) -> int:
+    """:returns The number of written rows"""
+    count = 0
+    for row in rows:
+        output.write(json.dumps(row, ensure_ascii=False))
+        output.write("\n")
+        count += 1
+    return count
+
+
+def write_csv(rows: Iterable[dict], columns: list[str], output: TextIO) -> int:
+    """
+    Lists are written as their items separated by ';', missing values as empty cells
+    :returns The number of written rows
+    """
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(["" if x is None else ";".join(x) if isinstance(x, list) else x for x in row.values()])
+        count += 1
+    return count
+
+
+def parse_where(conditions: list[str]) -> Optional[Callable[[dict], bool]]:
+    """
+    Turns 'column=value' conditions into a filter, a row has to match all of them
+    The value is compared to the column as text, a list matches if any of its items does
+    """
+    if len(conditions) == 0:
+        return None
+    parsed = []
+    for condition in conditions:
+        name, _, value = condition.partition("=")
+        if name not in COLUMNS:
+            raise ValueError(f"Unknown column '{name}', the columns are: {', '.join(COLUMNS)}")
+        parsed.append((name, value))
+
+    def matches(value, expected: str) -> bool:
+        if isinstance(value, list):
+            return any(matches(x, expected) for x in value)
+        if isinstance(value, bool):
+            return str(value).lower() == expected.lower()
+        return str(value) == expected
+
+    return lambda row: all(matches(row[name], value) for name, value in parsed)
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Export a row for every purchase link of every size, as it's read")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--output", help="The file to write to, defaults to stdout")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="The folder with the data and stores folders")
+    parser.add_argument("--columns", nargs="+", choices=list(COLUMNS), help="The columns to export")
+    parser.add_argument("--brand", action="append",
+                        help="Only export the brand with this name, as in brand.json or as its folder name, can be "
+                             "given more than once")
+    parser.add_argument("--material", action="append",
+                        help="Only export the material with this name, as in material.json or as its folder name, can "
+                             "be given more than once")
+    parser.add_argument("--where", action="append", default=[], metavar="COLUMN=VALUE",
+                        help="Only export rows where the column has the value, can be given more than once")
+
+    args = parser.parse_args()
+    export_columns = args.columns or list(COLUMNS)
+    export_rows = iter_rows(Database(args.root), export_columns, parse_where(args.where), args.brand, args.material)
+
+    output_file = open(args.output, mode="w", encoding="utf8", newline="") if args.output else sys.stdout
+    try:
+        # Validation errors are printed, they must not end up between the rows
+        with redirect_stdout(sys.stderr):
+            if args.format == "csv":
+                written = write_csv(export_rows, export_columns, output_file)
+            else:
+                written = write_ndjson(export_rows, output_file)
+            output_file.flush()
+    except BrokenPipeError:
+        # The output was piped into something that stopped reading, like head
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    finally:
+        if args.output:
+            output_file.close()
+    print(f"Exported {written} rows", file=sys.stderr)
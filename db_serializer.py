@@ -1,21 +1,30 @@
+import hashlib
 import json
 import os
+import pickle
 import re
-from copy import deepcopy
+import struct
+import threading
+import weakref
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextvars import ContextVar, Token, copy_context
 from json import JSONDecodeError
 from pathlib import Path
-from typing import Optional, Any, Union, Self
+from types import MappingProxyType
+from typing import Callable, Iterable, Iterator, Optional, Any, Union, Self
 
-from jsonschema.exceptions import ValidationError
-from jsonschema.validators import validate
+from schema_registry import registry
 
 PathLike = Union[str, os.PathLike[str]]
 
+# The folder holding the data and stores folders that is used when no other database is given
+DEFAULT_ROOT = Path(__file__).parent
+
 COLOR_HEX_PATTERN = re.compile(r"#?([a-fA-F0-9]{6})")
 
-# Global variable that denotes the last json file that was read
-# This is used to for json validation error messages
-last_json_file_loaded = ""
+# The last json file that was read, this is used to for json validation error messages
+# Every thread (and every task of load_database) has its own value
+last_json_file_loaded: ContextVar[str] = ContextVar("last_json_file_loaded", default="")
 
 
 # ---------------------------------
@@ -26,11 +35,16 @@ def shallow_remove_empty(input_dict: dict):
     """Remove elements that are 'None' or have an empty list/dict"""
     cpy = input_dict.copy()
     for k, v in input_dict.items():
-        if v is None or (isinstance(v, (list, dict)) and len(v) == 0):
+        if v is None or (isinstance(v, (list, tuple, dict)) and len(v) == 0):
             del cpy[k]
     return cpy
 
 
+def slot_values(obj) -> dict[str, Any]:
+    """The attributes of an object of a class with __slots__, as a dict in the order they are declared"""
+    return {name: getattr(obj, name) for name in type(obj).__slots__}
+
+
 def normalize_color_hex(input_data: list[str]):
     """Takes a list of color hex values and strips whitespace then removes the leading '#'"""
     res: list[str] = []
@@ -43,18 +57,45 @@ def normalize_color_hex(input_data: list[str]):
     return res
 
 
+def to_json_bytes(json_data) -> bytes:
+    """The json data the way it's stored in the database"""
+    return json.dumps(json_data, indent=4).encode("utf8")
+
+
+def write_if_changed(path: Path, content: bytes) -> bool:
+    """
+    Write the content to the file, unless the file already holds exactly that content
+    The content is written to a temporary file that then replaces the file, so the file is never left half written
+    :returns If the file was written
+    """
+    try:
+        if path.stat().st_size == len(content) and path.read_bytes() == content:
+            return False
+    except OSError:
+        pass
+    temp_path = path.with_name(f".{path.name}.tmp")
+    with temp_path.open(mode="wb") as f:
+        f.write(content)
+    os.replace(temp_path, path)
+    return True
+
+
 def cleanse_folder_name(name: str) -> str:
     return name.replace("/", " ").strip()
 
 
+def as_list(value) -> list:
+    """ships_from and ships_to can be a single location instead of a list"""
+    return [value] if isinstance(value, str) else list(value)
+
+
 def get_json_from_file(json_path: PathLike):
     """
     Attempt to load JSON from the specified path
     :returns Loaded JSON as a dict or None if there is an error
     """
     try:
-        global last_json_file_loaded
-        last_json_file_loaded = json_path.__str__()
+        last_json_file_loaded.set(json_path.__str__())
         with open(json_path, mode="r", encoding="utf8") as file:
             return json.load(file)
     except JSONDecodeError:
@@ -64,22 +105,21 @@ def get_json_from_file(json_path: PathLike):
     return None
 
 
-def validate_json(json_data, schema) -> bool:
+def validate_json(json_data, schema_name: str) -> bool:
     """
-    Validate the json data with the provided schema
+    Validate the json data with the named schema from the schema registry
     If valid, returns true.
     If not valid, returns false and emits an error message
     """
-    try:
-        validate(json_data, schema)
+    error = registry.best_error(schema_name, json_data)
+    if error is None:
         return True
-    except ValidationError as error:
-        print(
-            f"Failed to validate json. JSON path: {error.json_path}, Error: {error.message}, JSON file: {last_json_file_loaded}")
-        return False
+    print(
+        f"Failed to validate json. JSON path: {error.json_path}, Error: {error.message}, JSON file: {last_json_file_loaded.get()}")
+    return False
 
 
-# These will be inited at the end of the file
+# These are loaded on first use, see __getattr__ at the end of the file
 STORE_SCHEMA: dict
 BRAND_SCHEMA: dict
 MATERIAL_SCHEMA: dict
@@ -87,6 +127,15 @@ FILAMENT_SCHEMA: dict
 VARIANT_SCHEMA: dict
 SIZE_SCHEMA: dict
 
+SCHEMA_CONSTANTS = {
+    "STORE_SCHEMA": "store",
+    "BRAND_SCHEMA": "brand",
+    "MATERIAL_SCHEMA": "material",
+    "FILAMENT_SCHEMA": "filament",
+    "VARIANT_SCHEMA": "variant",
+    "SIZE_SCHEMA": "sizes"
+}
+
 
 # ---------------------------------
 # Interfaces
@@ -96,6 +145,8 @@ class IToFromJSONData:
     """
     An interface that defines the required methods for storing and retrieving from json data
     """
+    # Every model class defines __slots__, a catalog holds a lot of small objects and slots make them a lot smaller
+    __slots__ = ()
 
     def to_dict(self) -> dict:
         """
@@ -112,21 +163,26 @@ class IToFromFS(IToFromJSONData):
     """
     This is an interface that defines the required methods for storing and retrieving from a folder based structure
     """
+    __slots__ = ()
 
-    def to_json_file(self, parent_folder: PathLike):
+    def to_json_file(self, parent_folder: PathLike) -> list[Path]:
         """
-        Saves this object as a json file
+        Saves this object as a json file, the file is left alone if it already holds the same json
         :param parent_folder: The folder where the json file should be stored
+        :returns The files that changed
         """
         path = Path(parent_folder)
         if not path.is_dir():
             print(f"The provided path is not a folder: {path.__str__()}")
-            return
-        with path.joinpath(f"{self._file_name()}.json").open("w") as f:
-            json.dump(self.to_dict(), f, indent=4)
+            return []
+        json_path = path.joinpath(f"{self._file_name()}.json")
+        return [json_path] if write_if_changed(json_path, to_json_bytes(self.to_dict())) else []
 
-    def to_folder(self, parent_folder: PathLike):
-        """Creates a folder within the parent folder and store the json file within it"""
+    def to_folder(self, parent_folder: PathLike) -> list[Path]:
+        """
+        Creates a folder within the parent folder and store the json file within it
+        :returns The files that changed
+        """
         ...
 
     @classmethod
@@ -161,11 +217,95 @@ class IToFromFS(IToFromJSONData):
         return True
 
 
+class IChild:
+    """
+    An interface for objects that belong to a parent object
+    The parent is referenced strongly, so a child can be used on its own. The objects form a tree, the reference
+    cycles between a parent and its children are collected by the garbage collector
+    """
+    __slots__ = ("_parent",)
+
+    def _set_parent(self, parent):
+        self._parent = parent
+
+    @property
+    def parent(self):
+        return self._parent
+
+
+class IFreezable:
+    """
+    An interface for objects that can be frozen, a frozen object can't be changed so it can be shared safely
+    Copy a frozen object to get one that can be changed
+    """
+    __slots__ = ("_frozen",)
+
+    @property
+    def frozen(self) -> bool:
+        return getattr(self, "_frozen", False)
+
+    def freeze(self) -> Self:
+        object.__setattr__(self, "_frozen", True)
+        return self
+
+    def copy(self) -> Self:
+        """A copy that isn't frozen, which doesn't share anything that can be changed with this object"""
+        ...
+
+    def __setattr__(self, name: str, value):
+        if self.frozen:
+            raise AttributeError(f"This {type(self).__name__} is frozen, copy it to change it")
+        object.__setattr__(self, name, value)
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+
+class LazyFolder:
+    """Stands in for the children of an object that aren't loaded yet, see LazyLoader"""
+    __slots__ = ("loader", "folder", "evicted")
+
+    loader: 'LazyLoader'
+    folder: Path  # The folder of the object the children belong to
+    evicted: dict[Path, weakref.ref]  # The children that were loaded before by their folder, see LazyLoader
+
+    def __init__(self, loader: 'LazyLoader', folder: Path, evicted: Optional[dict[Path, weakref.ref]] = None):
+        self.loader = loader
+        self.folder = folder
+        self.evicted = {} if evicted is None else evicted
+
+    def __reduce__(self):
+        raise TypeError("Children that aren't loaded yet can't be pickled, access them first or load eagerly")
+
+
+class LazyChildren:
+    """
+    The list of children of an object, kept in the slot with the same name prefixed with an underscore
+    If the object was loaded lazily the slot holds a LazyFolder, which is replaced by the children on first access
+    """
+    __slots__ = ("slot",)
+
+    def __set_name__(self, owner, name: str):
+        self.slot = owner.__dict__[f"_{name}"]
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = self.slot.__get__(obj, owner)
+        if type(value) is LazyFolder:
+            value = value.loader.load(obj, self, value)
+        return value
+
+    def __set__(self, obj, value):
+        self.slot.__set__(obj, value)
+
+
 # ---------------------------------
 # store.json
 # ---------------------------------
 
 class Store(IToFromJSONData):
+    __slots__ = ("store_id", "name", "storefront_url", "logo", "affiliate", "ships_from", "ships_to")
     store_id: str
     name: str
     storefront_url: str
@@ -214,8 +354,8 @@ class Store(IToFromJSONData):
             storefront_url=json_data["storefront_url"],
             logo=json_data["logo"],
             affiliate=json_data["affiliate"],
-            ships_from=json_data.get("ships_from", []),
-            ships_to=json_data.get("ships_to", [])
+            ships_from=json_data.get("ships_from"),
+            ships_to=json_data.get("ships_to")
         )
 
 
@@ -223,21 +363,21 @@ class Store(IToFromJSONData):
 # Load/Save Stores
 # ---------------------------------
 
+# The stores of the current database, loaded on first use (see Database.stores)
 stores: dict[str, Store]
 
 
-def load_stores():
-    global stores
+def read_stores(stores_dir: PathLike) -> dict[str, Store]:
+    """Load every valid store.json within the folder, keyed by store ID"""
     stores = {}
-    stores_dir = Path("stores")
-    for item in stores_dir.iterdir():
+    for item in sorted(Path(stores_dir).iterdir()):
         store_file = item.joinpath("store.json")
         if not item.is_dir() or not store_file.exists():
             continue
 
         # Verify the schema
         json_data = get_json_from_file(store_file)
-        if not validate_json(json_data, STORE_SCHEMA):
+        if not validate_json(json_data, "store"):
             # An error msg will be emitted by the validate function if there is an error
             continue
         store = Store.from_json_data(json_data)
@@ -245,18 +385,35 @@ def load_stores():
             print(f"There were multiple stores with the same store ID: {store.store_id}")
             continue
         stores[store.store_id] = store
+    return stores
+
+
+def load_stores():
+    """Load the stores of the current database again"""
+    get_database().load_stores()
+
+
+def save_stores(parent_folder: PathLike) -> list[Path]:
+    return get_database().save_stores(parent_folder)
 
 
-def save_stores(parent_folder: PathLike):
+def write_stores(stores: dict[str, Store], parent_folder: PathLike) -> list[Path]:
+    """
+    Write a store.json for every store, files that already hold the same json are left alone
+    :returns The files that changed
+    """
     path = Path(parent_folder)
     if not path.is_dir():
         print(f"The provided path is not a folder: {path.__str__()}")
-        return
+        return []
+    changed = []
     for store_id, store_data in stores.items():
         store_path = path.joinpath(store_id)
         store_path.mkdir(exist_ok=True)
-        with store_path.joinpath("store.json").open("w") as f:
-            json.dump(store_data.to_dict(), f, indent=4)
+        store_file = store_path.joinpath("store.json")
+        if write_if_changed(store_file, to_json_bytes(store_data.to_dict())):
+            changed.append(store_file)
+    return changed
 
 
 # ---------------------------------
@@ -264,6 +421,7 @@ def save_stores(parent_folder: PathLike):
 # ---------------------------------
 
 class SizePurchaseLink(IToFromJSONData):
+    __slots__ = ("store", "url", "affiliate", "spool_refill", "ships_from", "ships_to")
     store: Store  # Required
     url: str  # Required
     affiliate: bool  # Required
@@ -283,7 +441,7 @@ class SizePurchaseLink(IToFromJSONData):
         if ships_to is None:
             ships_to = []
 
-        self.store = stores[store_id]
+        self.store = get_database().stores[store_id]
         self.url = url
         self.affiliate = affiliate
         self.spool_refill = spool_refill
@@ -327,12 +485,14 @@ class SizePurchaseLink(IToFromJSONData):
             url=json_data["url"],
             affiliate=json_data["affiliate"],
             spool_refill=json_data.get("spool_refill", False),
-            ships_from=json_data.get("ships_from", []),
-            ships_to=json_data.get("ships_to", [])
+            ships_from=json_data.get("ships_from"),
+            ships_to=json_data.get("ships_to")
         )
 
 
 class FilamentSize(IToFromJSONData):
+    __slots__ = ("filament_weight", "diameter", "empty_spool_weight", "spool_core_diameter", "ean", "article_number",
+                 "barcode_identifier", "nfc_identifier", "qr_identifier", "discontinued", "purchase_links")
     filament_weight: float  # Required
     diameter: float  # Required
     empty_spool_weight: Optional[float]
@@ -372,6 +532,13 @@ class FilamentSize(IToFromJSONData):
         self.discontinued = discontinued
         self.purchase_links = purchase_links
 
+    def get_discontinued(self, variant: 'FilamentVariant', filament: 'Filament') -> bool:
+        """
+        Get the correct discontinued value
+        A size is discontinued if it, its variant or its filament is
+        """
+        return bool(self.discontinued or variant.discontinued or filament.discontinued)
+
     def to_dict(self):
         return shallow_remove_empty({
             "filament_weight": self.filament_weight,
@@ -413,6 +580,7 @@ class FilamentSize(IToFromJSONData):
 # ---------------------------------
 
 class VariantTraits(IToFromJSONData):
+    __slots__ = ("translucent", "glow", "matte", "recycled", "recyclable", "biodegradable")
     translucent: Optional[bool]
     glow: Optional[bool]
     matte: Optional[bool]
@@ -435,7 +603,7 @@ class VariantTraits(IToFromJSONData):
         self.biodegradable = biodegradable
 
     def to_dict(self):
-        return shallow_remove_empty(self.__dict__)
+        return shallow_remove_empty(slot_values(self))
 
     @staticmethod
     def from_json_data(json_data: Optional[dict[str, Any]], parent: None = None) -> 'VariantTraits':
@@ -453,6 +621,7 @@ class VariantTraits(IToFromJSONData):
 
 
 class ColorStandards(IToFromJSONData):
+    __slots__ = ("ral", "ncs", "pantone", "bs", "munsell")
     ral: Optional[str]
     ncs: Optional[str]
     pantone: Optional[str]
@@ -472,7 +641,7 @@ class ColorStandards(IToFromJSONData):
         self.munsell = munsell
 
     def to_dict(self):
-        return shallow_remove_empty(self.__dict__)
+        return shallow_remove_empty(slot_values(self))
 
     @staticmethod
     def from_json_data(json_data: dict[str, Any], parent: None = None) -> Optional['ColorStandards']:
@@ -486,8 +655,8 @@ class ColorStandards(IToFromJSONData):
                               munsell=json_data.get("munsell"))
 
 
-class FilamentVariant(IToFromFS):
-    __parent: 'Filament'
+class FilamentVariant(IChild, IToFromFS):
+    __slots__ = ("color_name", "color_hex", "discontinued", "color_standards", "traits", "sizes", "__weakref__")
 
     color_name: str  # Required
     color_hex: list[str]  # Required
@@ -513,7 +682,7 @@ class FilamentVariant(IToFromFS):
         if isinstance(color_hex, str):
             color_hex = [color_hex]
 
-        self.__parent = parent
+        self._set_parent(parent)
         self.color_name = color_name
         self.color_hex = normalize_color_hex(color_hex)
         self.discontinued = discontinued
@@ -521,10 +690,6 @@ class FilamentVariant(IToFromFS):
         self.traits = traits
         self.sizes = sizes
 
-    @property
-    def parent(self):
-        return self.__parent
-
     @classmethod
     def _file_name(cls) -> str:
         return "variant"
@@ -545,27 +710,26 @@ class FilamentVariant(IToFromFS):
             "traits": self.traits.to_dict()
         })
 
-    def __sizes_to_json_file(self, parent_folder: PathLike):
+    def __sizes_to_json_file(self, parent_folder: PathLike) -> list[Path]:
         path = Path(parent_folder)
         if not path.is_dir():
             print(f"The provided path is not a folder: {path.__str__()}")
-            return
-        with path.joinpath("sizes.json").open("w") as f:
-            json.dump([x.to_dict() for x in self.sizes], f, indent=4)
+            return []
+        sizes_path = path.joinpath("sizes.json")
+        return [sizes_path] if write_if_changed(sizes_path, to_json_bytes([x.to_dict() for x in self.sizes])) else []
 
-    def to_folder(self, parent_folder: PathLike):
+    def to_folder(self, parent_folder: PathLike) -> list[Path]:
         path = Path(parent_folder)
         if not path.exists() or not path.is_dir():
             print(f"The provided path is not a folder: {path.__str__()}")
-            return
+            return []
         path = path.joinpath(cleanse_folder_name(self.color_name))
         path.mkdir(parents=True, exist_ok=True)
-        self.to_json_file(path)
-        self.__sizes_to_json_file(path)
+        return self.to_json_file(path) + self.__sizes_to_json_file(path)
 
     @staticmethod
     def from_json_data(json_data: dict[str, Any], parent: 'Filament') -> Optional['FilamentVariant']:
-        if not validate_json(json_data, VARIANT_SCHEMA):
+        if not validate_json(json_data, "variant"):
             # An error msg will be emitted by the validate function if there is an error
             return None
 
@@ -581,7 +745,7 @@ class FilamentVariant(IToFromFS):
     @staticmethod
     def __sizes_from_folder(folder_path: PathLike) -> Optional[list[FilamentSize]]:
         json_data = get_json_from_file(f"{folder_path}/sizes.json")
-        if not validate_json(json_data, SIZE_SCHEMA):
+        if not validate_json(json_data, "sizes"):
             # An error msg will be emitted by the validate function if there is an error
             return None
         if not isinstance(json_data, list):
@@ -608,7 +772,8 @@ class FilamentVariant(IToFromFS):
 # For filament.json and material.json
 # ---------------------------------
 
-class GenericSlicerSettings(IToFromJSONData):
+class GenericSlicerSettings(IFreezable, IToFromJSONData):
+    __slots__ = ("first_layer_bed_temp", "first_layer_nozzle_temp", "bed_temp", "nozzle_temp")
     first_layer_bed_temp: Optional[int]
     first_layer_nozzle_temp: Optional[int]
     bed_temp: Optional[int]
@@ -624,6 +789,13 @@ class GenericSlicerSettings(IToFromJSONData):
         self.bed_temp = bed_temp
         self.nozzle_temp = nozzle_temp
 
+    def copy(self) -> 'GenericSlicerSettings':
+        return GenericSlicerSettings(**slot_values(self))
+
+    def get_key(self) -> tuple:
+        """A value that is only equal for settings that are the same"""
+        return tuple(slot_values(self).values())
+
     def update(self, other: 'GenericSlicerSettings'):
         if other.first_layer_bed_temp is not None:
             self.first_layer_bed_temp = other.first_layer_bed_temp
@@ -635,7 +807,7 @@ class GenericSlicerSettings(IToFromJSONData):
             self.nozzle_temp = other.nozzle_temp
 
     def to_dict(self):
-        return shallow_remove_empty(self.__dict__)
+        return shallow_remove_empty(slot_values(self))
 
     @staticmethod
     def from_json_data(json_data: Optional[dict[str, Any]], parent: None = None) -> Optional['GenericSlicerSettings']:
@@ -650,7 +822,8 @@ class GenericSlicerSettings(IToFromJSONData):
         )
 
 
-class SpecificSlicerSettings(IToFromJSONData):
+class SpecificSlicerSettings(IFreezable, IToFromJSONData):
+    __slots__ = ("profile_name", "overrides")
     profile_name: str  # Required
     overrides: dict[str, str]
 
@@ -665,6 +838,17 @@ class SpecificSlicerSettings(IToFromJSONData):
         self.profile_name = profile_name
         self.overrides = overrides
 
+    def freeze(self) -> 'SpecificSlicerSettings':
+        object.__setattr__(self, "overrides", MappingProxyType(self.overrides))
+        return super().freeze()
+
+    def copy(self) -> 'SpecificSlicerSettings':
+        return SpecificSlicerSettings(self.profile_name, dict(self.overrides))
+
+    def get_key(self) -> tuple:
+        """A value that is only equal for settings that are the same"""
+        return self.profile_name, tuple(self.overrides.items())
+
     def update(self, other: 'SpecificSlicerSettings'):
         if other is None: return
         self.profile_name = other.profile_name
@@ -673,7 +857,7 @@ class SpecificSlicerSettings(IToFromJSONData):
     def to_dict(self):
         return shallow_remove_empty({
             "profile_name": self.profile_name,
-            "overrides": self.overrides
+            "overrides": dict(self.overrides)
         })
 
     @staticmethod
@@ -687,7 +871,8 @@ class SpecificSlicerSettings(IToFromJSONData):
         )
 
 
-class SlicerSettings(IToFromJSONData):
+class SlicerSettings(IFreezable, IToFromJSONData):
+    __slots__ = ("prusaslicer", "bambustudio", "orcaslicer", "cura", "generic", "__weakref__")
     prusaslicer: Optional[SpecificSlicerSettings]
     bambustudio: Optional[SpecificSlicerSettings]
     orcaslicer: Optional[SpecificSlicerSettings]
@@ -731,6 +916,22 @@ class SlicerSettings(IToFromJSONData):
         self.cura = cura
         self.generic = generic
 
+    def copy(self) -> 'SlicerSettings':
+        return SlicerSettings(**{k: None if v is None else v.copy() for k, v in self.__settings().items()})
+
+    def __settings(self) -> dict[str, Optional[SpecificSlicerSettings | GenericSlicerSettings]]:
+        return {name: getattr(self, name) for name in SLICER_SETTINGS_NAMES}
+
+    def freeze(self) -> 'SlicerSettings':
+        for settings in self.__settings().values():
+            if settings is not None and not settings.frozen:
+                settings.freeze()
+        return super().freeze()
+
+    def get_key(self) -> tuple:
+        """A value that is only equal for settings that are the same"""
+        return tuple(None if x is None else x.get_key() for x in self.__settings().values())
+
     def __contains__(self, item: str):
         attrib = self.__getattribute__(item)
         if isinstance(attrib, (SpecificSlicerSettings, GenericSlicerSettings)):
@@ -746,28 +947,28 @@ class SlicerSettings(IToFromJSONData):
     def get_prusaslicer_data(self):
         if self.prusaslicer is None:
             return None
-        prusaslicer = deepcopy(self.prusaslicer)
+        prusaslicer = self.prusaslicer.copy()
         self.__map_generic_to_overrides(prusaslicer, self.PS_MAP)
         return prusaslicer
 
     def get_bambustudio_data(self):
         if self.bambustudio is None:
             return None
-        bambustudio = deepcopy(self.bambustudio)
+        bambustudio = self.bambustudio.copy()
         self.__map_generic_to_overrides(bambustudio, self.BS_MAP)
         return bambustudio
 
     def get_orcaslicer_data(self):
         if self.orcaslicer is None:
             return None
-        orcaslicer = deepcopy(self.orcaslicer)
+        orcaslicer = self.orcaslicer.copy()
         self.__map_generic_to_overrides(orcaslicer, self.ORCA_MAP)
         return orcaslicer
 
     def get_cura_data(self):
         if self.cura is None:
             return None
-        cura = deepcopy(self.cura)
+        cura = self.cura.copy()
         self.__map_generic_to_overrides(cura, self.CURA_MAP)
         return cura
 
@@ -789,7 +990,7 @@ class SlicerSettings(IToFromJSONData):
                 specific_settings.overrides[v] = value
 
     def update(self, other: 'SlicerSettings'):
-        for var in ["prusaslicer", "bambustudio", "orcaslicer", "cura", "generic"]:
+        for var in SLICER_SETTINGS_NAMES:
             this_var = getattr(self, var)
             other_var = getattr(other, var)
             if other_var is not None:
@@ -799,7 +1000,7 @@ class SlicerSettings(IToFromJSONData):
                     this_var.update(other_var)
 
     def to_dict(self):
-        return {k: v.to_dict() for k, v in self.__dict__.items() if v is not None}
+        return {k: v.to_dict() for k, v in self.__settings().items() if v is not None}
 
     @staticmethod
     def from_json_data(json_data: Optional[dict[str, Any]], parent: None = None):
@@ -817,11 +1018,61 @@ class SlicerSettings(IToFromJSONData):
         )
 
 
+# The settings of each slicer in SlicerSettings, along with the generic settings
+SLICER_SETTINGS_NAMES = ["prusaslicer", "bambustudio", "orcaslicer", "cura", "generic"]
+
+EMPTY_SLICER_SETTINGS = SlicerSettings().freeze()
+
+# Resolved slicer settings, see Material.get_frozen_slicer_settings and Filament.get_resolved_slicer_settings
+# Every entry starts with what the settings were resolved from, so they're resolved again once that changed
+_frozen_defaults: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_resolved_settings: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# The settings of each slicer of resolved slicer settings, see Filament.get_slicer_data
+_slicer_data: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def resolve_slicer_settings(defaults: SlicerSettings, settings: Optional[SlicerSettings]) -> SlicerSettings:
+    """
+    The frozen defaults updated with the settings, the settings of the defaults that aren't changed are shared
+    :param defaults: Frozen settings, see Material.get_frozen_slicer_settings
+    :returns Frozen settings
+    """
+    if settings is None:
+        return defaults
+    resolved = SlicerSettings()
+    for name in SLICER_SETTINGS_NAMES:
+        default = getattr(defaults, name)
+        own = getattr(settings, name)
+        if own is None:
+            value = default
+        elif default is None:
+            value = own.copy()
+        else:
+            value = default.copy()
+            value.update(own)
+        setattr(resolved, name, value)
+    return resolved.freeze()
+
+
+def resolve_all_slicer_settings(brands: Iterable['Brand']) -> dict['Filament', SlicerSettings]:
+    """
+    The resolved slicer settings of every filament, see Filament.get_resolved_slicer_settings
+    The defaults of each material are only copied once, filaments that don't change them share them
+    """
+    resolved = {}
+    for brand in brands:
+        for material in brand.materials:
+            for filament in material.filaments:
+                resolved[filament] = filament.get_resolved_slicer_settings()
+    return resolved
+
+
 # ---------------------------------
 # filament.json
 # ---------------------------------
 
 class SlicerIDs(IToFromJSONData):
+    __slots__ = ("prusaslicer", "bambustudio", "orcaslicer", "cura")
     prusaslicer: Optional[str]
     bambustudio: Optional[str]
     orcaslicer: Optional[str]
@@ -838,7 +1089,7 @@ class SlicerIDs(IToFromJSONData):
         self.cura = cura
 
     def to_dict(self):
-        return shallow_remove_empty(self.__dict__)
+        return shallow_remove_empty(slot_values(self))
 
     @staticmethod
     def from_json_data(json_data: dict[str, Any], parent: None = None) -> 'SlicerIDs':
@@ -853,8 +1104,9 @@ class SlicerIDs(IToFromJSONData):
         )
 
 
-class Filament(IToFromFS):
-    __parent: 'Material'
+class Filament(IChild, IToFromFS):
+    __slots__ = ("name", "diameter_tolerance", "density", "max_dry_temperature", "data_sheet_url", "safety_sheet_url",
+                 "discontinued", "slicer_ids", "slicer_settings", "_variants", "__weakref__")
 
     name: str  # Required
     diameter_tolerance: float  # Required
@@ -865,7 +1117,7 @@ class Filament(IToFromFS):
     discontinued: Optional[bool]
     slicer_ids: SlicerIDs
     slicer_settings: Optional[SlicerSettings]
-    variants: list[FilamentVariant]  # Required
+    variants: list[FilamentVariant] = LazyChildren()  # Required
 
     def __init__(self,
                  parent: 'Material',
@@ -885,7 +1137,7 @@ class Filament(IToFromFS):
         if variants is None:
             variants = []
 
-        self.__parent = parent
+        self._set_parent(parent)
         self.name = name
         self.diameter_tolerance = diameter_tolerance
         self.density = density
@@ -897,28 +1149,36 @@ class Filament(IToFromFS):
         self.slicer_settings = slicer_settings
         self.variants = variants
 
-    @property
-    def parent(self):
-        return self.__parent
-
-    def get_resolved_slicer_settings(self):
+    def get_resolved_slicer_settings(self) -> SlicerSettings:
         """
         Get the resolved slicer_settings value
-        If the parent Material has default_slicer_settings, a copy is made
-        If not, a new SlicerSettings is created
-        If this Filament has slicer_settings, that is used to update the copy/new SlicerSettings
-        The result of these operations is returned
+        This is the default_slicer_settings of the parent Material (or empty settings if it has none),
+        updated with the slicer_settings of this Filament
+        The result is frozen and cached, it's resolved again once the settings of this Filament or its Material
+        changed. Copy it to change it
         """
-        def_settings = self.parent.default_slicer_settings
-        if def_settings is None:
-            data = SlicerSettings()
-        else:
-            data = deepcopy(def_settings)
-
-        if self.slicer_settings is not None:
-            data.update(self.slicer_settings)
-
-        return data
+        defaults = EMPTY_SLICER_SETTINGS if self.parent is None else self.parent.get_frozen_slicer_settings()
+        key = None if self.slicer_settings is None else self.slicer_settings.get_key()
+        cached = _resolved_settings.get(self)
+        if cached is None or cached[0] is not defaults or cached[1] != key:
+            cached = (defaults, key, resolve_slicer_settings(defaults, self.slicer_settings))
+            _resolved_settings[self] = cached
+        return cached[2]
+
+    def get_slicer_data(self, slicer_name: str) -> Optional[SpecificSlicerSettings]:
+        """
+        The resolved settings of a slicer with the generic settings mapped to its overrides, see
+        SlicerSettings.get_slicer_data. Frozen and cached like get_resolved_slicer_settings
+        """
+        resolved = self.get_resolved_slicer_settings()
+        slicer_data = _slicer_data.get(resolved)
+        if slicer_data is None:
+            slicer_data = {}
+            _slicer_data[resolved] = slicer_data
+        if slicer_name not in slicer_data:
+            data = resolved.get_slicer_data(slicer_name)
+            slicer_data[slicer_name] = None if data is None else data.freeze()
+        return slicer_data[slicer_name]
 
     def get_max_dry_temperature(self):
         """
@@ -943,20 +1203,21 @@ class Filament(IToFromFS):
             "slicer_settings": self.slicer_settings.to_dict() if self.slicer_settings else None
         })
 
-    def to_folder(self, parent_folder: PathLike):
+    def to_folder(self, parent_folder: PathLike) -> list[Path]:
         path = Path(parent_folder)
         if not path.exists() or not path.is_dir():
             print(f"The provided path is not a folder: {path.__str__()}")
-            return
+            return []
         path = path.joinpath(cleanse_folder_name(self.name))
         path.mkdir(parents=True, exist_ok=True)
-        self.to_json_file(path)
+        changed = self.to_json_file(path)
         for variant in self.variants:
-            variant.to_folder(path)
+            changed.extend(variant.to_folder(path))
+        return changed
 
     @staticmethod
     def from_json_data(json_data: dict[str, Any], parent: 'Material') -> Optional['Filament']:
-        if not validate_json(json_data, FILAMENT_SCHEMA):
+        if not validate_json(json_data, "filament"):
             # An error msg will be emitted by the validate function if there is an error
             return None
 
@@ -974,32 +1235,41 @@ class Filament(IToFromFS):
         )
 
     @classmethod
-    def from_folder(cls, folder_path: PathLike, parent: 'Material') -> Optional['Filament']:
+    def from_folder(cls, folder_path: PathLike, parent: 'Material',
+                    loader: Optional['LazyLoader'] = None) -> Optional['Filament']:
+        """:param loader: Load the variants on first access instead, see LazyLoader"""
         filament = super().from_folder(folder_path, parent)
 
         # ensure return was not None and hint the typing system
         if not isinstance(filament, Filament): return None
 
-        entry: Path
-        for entry in Path(folder_path).iterdir():
-            if not entry.is_dir():
-                continue
+        if loader is not None:
+            filament.variants = LazyFolder(loader, Path(folder_path))
+            return filament
+
+        for entry in cls.variant_folders(folder_path):
             variant = FilamentVariant.from_folder(entry, filament)
             if variant is None:
                 continue
             filament.variants.append(variant)
         return filament
 
+    @staticmethod
+    def variant_folders(folder_path: PathLike) -> list[Path]:
+        """The folders of the variants of the filament, in the order they are loaded"""
+        return [x for x in Path(folder_path).iterdir() if x.is_dir()]
+
 
 # ---------------------------------
 # material.json
 # ---------------------------------
 
 class Material(IToFromFS):
+    __slots__ = ("material_name", "default_max_dry_temperature", "default_slicer_settings", "_filaments", "__weakref__")
     material_name: str  # Required
     default_max_dry_temperature: Optional[int]
     default_slicer_settings: Optional[SlicerSettings]
-    filaments: list[Filament]  # Required
+    filaments: list[Filament] = LazyChildren()  # Required
 
     def __init__(self,
                  material_name: str,
@@ -1014,6 +1284,20 @@ class Material(IToFromFS):
         self.default_slicer_settings = default_slicer_settings
         self.filaments = filaments
 
+    def get_frozen_slicer_settings(self) -> SlicerSettings:
+        """
+        A frozen copy of default_slicer_settings, or empty settings if there are none
+        The copy is cached, a new one is made once default_slicer_settings changed
+        """
+        if self.default_slicer_settings is None:
+            return EMPTY_SLICER_SETTINGS
+        key = self.default_slicer_settings.get_key()
+        cached = _frozen_defaults.get(self)
+        if cached is None or cached[0] != key:
+            cached = (key, self.default_slicer_settings.copy().freeze())
+            _frozen_defaults[self] = cached
+        return cached[1]
+
     def to_dict(self):
         return shallow_remove_empty({
             "material": self.material_name,
@@ -1021,20 +1305,21 @@ class Material(IToFromFS):
             "default_slicer_settings": self.default_slicer_settings.to_dict() if self.default_slicer_settings else None
         })
 
-    def to_folder(self, parent_folder: PathLike):
+    def to_folder(self, parent_folder: PathLike) -> list[Path]:
         path = Path(parent_folder)
         if not path.exists() or not path.is_dir():
             print(f"The provided path is not a folder: {path.__str__()}")
-            return
+            return []
         path = path.joinpath(cleanse_folder_name(self.material_name))
         path.mkdir(parents=True, exist_ok=True)
-        self.to_json_file(path)
+        changed = self.to_json_file(path)
         for filament in self.filaments:
-            filament.to_folder(path)
+            changed.extend(filament.to_folder(path))
+        return changed
 
     @staticmethod
     def from_json_data(json_data: dict[str, Any], parent: None = None) -> Optional['Material']:
-        if not validate_json(json_data, MATERIAL_SCHEMA):
+        if not validate_json(json_data, "material"):
             # An error msg will be emitted by the validate function if there is an error
             return None
 
@@ -1045,33 +1330,42 @@ class Material(IToFromFS):
         )
 
     @classmethod
-    def from_folder(cls, folder_path: PathLike, parent: None = None) -> Optional['Material']:
+    def from_folder(cls, folder_path: PathLike, parent: None = None,
+                    loader: Optional['LazyLoader'] = None) -> Optional['Material']:
+        """:param loader: Load the filaments on first access instead, see LazyLoader"""
         material = super().from_folder(folder_path, None)
 
         # ensure return was not None and hint the typing system
         if not isinstance(material, Material): return None
 
-        entry: Path
-        for entry in Path(folder_path).iterdir():
-            if not entry.is_dir():
-                continue
+        if loader is not None:
+            material.filaments = LazyFolder(loader, Path(folder_path))
+            return material
+
+        for entry in cls.filament_folders(folder_path):
             filament = Filament.from_folder(entry, material)
             if filament is None:
                 continue
             material.filaments.append(filament)
         return material
 
+    @staticmethod
+    def filament_folders(folder_path: PathLike) -> list[Path]:
+        """The folders of the filaments of the material, in the order they are loaded"""
+        return [x for x in Path(folder_path).iterdir() if x.is_dir()]
+
 
 # ---------------------------------
 # brand.json
 # ---------------------------------
 
 class Brand(IToFromFS):
+    __slots__ = ("brand_name", "website", "logo", "origin", "_materials", "__weakref__")
     brand_name: str
     website: str
     logo: str
     origin: str
-    materials: list[Material]
+    materials: list[Material] = LazyChildren()
 
     def __init__(self,
                  brand_name: str,
@@ -1096,20 +1390,21 @@ class Brand(IToFromFS):
             "origin": self.origin
         })
 
-    def to_folder(self, parent_folder: PathLike):
+    def to_folder(self, parent_folder: PathLike) -> list[Path]:
         path = Path(parent_folder)
         if not path.exists() or not path.is_dir():
             print(f"The provided path is not a folder: {path.__str__()}")
-            return
+            return []
         path = path.joinpath(cleanse_folder_name(self.brand_name))
         path.mkdir(parents=True, exist_ok=True)
-        self.to_json_file(path)
+        changed = self.to_json_file(path)
         for material in self.materials:
-            material.to_folder(path)
+            changed.extend(material.to_folder(path))
+        return changed
 
     @staticmethod
     def from_json_data(json_data: dict[str, Any], parent: None = None) -> Optional['Brand']:
-        if not validate_json(json_data, BRAND_SCHEMA):
+        if not validate_json(json_data, "brand"):
             # An error msg will be emitted by the validate function if there is an error
             return None
         return Brand(
@@ -1120,7 +1415,9 @@ class Brand(IToFromFS):
         )
 
     @classmethod
-    def from_folder(cls, folder_path: PathLike, parent: None = None) -> Optional['Brand']:
+    def from_folder(cls, folder_path: PathLike, parent: None = None,
+                    loader: Optional['LazyLoader'] = None) -> Optional['Brand']:
+        """:param loader: Load the materials on first access instead, see LazyLoader"""
         brand = super().from_folder(folder_path, None)
 
         # ensure return was not None and hint the typing system
@@ -1128,10 +1425,11 @@ class Brand(IToFromFS):
 
         print(f"Attempting to import {folder_path} as a brand")
 
-        entry: Path
-        for entry in Path(folder_path).iterdir():
-            if not entry.is_dir():
-                continue
+        if loader is not None:
+            brand.materials = LazyFolder(loader, Path(folder_path))
+            return brand
+
+        for entry in cls.material_folders(folder_path):
             print(f"Attempting to import {entry} as a material")
             material = Material.from_folder(entry)
             if material is None:
@@ -1139,24 +1437,760 @@ class Brand(IToFromFS):
             brand.materials.append(material)
         return brand
 
+    @staticmethod
+    def material_folders(folder_path: PathLike) -> list[Path]:
+        """The folders of the materials of the brand, in the order they are loaded"""
+        return [x for x in Path(folder_path).iterdir() if x.is_dir()]
+
+
+# ---------------------------------
+# Lazy loading
+# ---------------------------------
+
+class LazyLoader:
+    """
+    Loads the children of lazily loaded brands, see Database.load_brands
+    The first access of Brand.materials, Material.filaments or Filament.variants lists the folder of the object and
+    loads (and validates) the json files of its children, whose own children are lazy again. A variant is loaded
+    along with its sizes, as a variant isn't loaded at all if its sizes.json is invalid or empty
+    The children come out in the same order as when loading eagerly, and are the same objects on every access
+
+    max_loaded bounds the number of loaded lists of children, once there are more the list that was loaded longest
+    ago is dropped, and loaded again on its next access. Children that are still used elsewhere are reused when the
+    list is loaded again, so they keep their identity. Changes to dropped children that aren't used anywhere are
+    lost, only change the data with max_loaded at None, or through Database.add and Database.remove. Those keep the
+    list they change from being dropped, along with every list above it up to the brand, so the change stays
+    reachable from the brand. A loaded child keeps its parent alive for this, while it's used elsewhere
+    """
+    database: 'Database'
+    max_loaded: Optional[int]
+
+    def __init__(self, database: 'Database', max_loaded: Optional[int] = None):
+        self.database = database
+        self.max_loaded = max_loaded
+        # The loaded lists of children that can be dropped, the oldest first, keyed by the id of their parent
+        # Each holds the parent, the attribute and id of the list, the folder of the parent and the folder of each child
+        self.__loaded: dict[int, tuple[weakref.ref, LazyChildren, int, Path, list[tuple[Path, weakref.ref]]]] = {}
+        # The parent of each loaded child while lists can be dropped, materials don't link to their brand themselves
+        self.__parents: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.__lock = threading.Lock()
+
+    def __load_child(self, parent, folder: Path):
+        if isinstance(parent, Brand):
+            print(f"Attempting to import {folder} as a material")
+            return Material.from_folder(folder, None, self)
+        if isinstance(parent, Material):
+            return Filament.from_folder(folder, parent, self)
+        return FilamentVariant.from_folder(folder, parent)
+
+    def load(self, parent, children: LazyChildren, lazy_folder: LazyFolder) -> list:
+        """Load the children of the object, called by LazyChildren on first access"""
+        with self.__lock:
+            current = children.slot.__get__(parent)
+            if type(current) is not LazyFolder:
+                # Loaded by another thread in the meantime
+                return current
+            lazy_folder = current
+
+            loaded_children = []
+            child_refs = []
+            with self.database:
+                for folder in LAZY_CHILD_FOLDERS[type(parent)](lazy_folder.folder):
+                    child_ref = lazy_folder.evicted.get(folder)
+                    child = None if child_ref is None else child_ref()
+                    if child is None:
+                        child = self.__load_child(parent, folder)
+                        if child is None:
+                            continue
+                    loaded_children.append(child)
+                    child_refs.append((folder, weakref.ref(child)))
+            children.__set__(parent, loaded_children)
+
+            if self.max_loaded is not None:
+                for child in loaded_children:
+                    self.__parents[child] = parent
+                self.__loaded.pop(id(parent), None)
+                self.__loaded[id(parent)] = (weakref.ref(parent), children, id(loaded_children), lazy_folder.folder,
+                                             child_refs)
+                while len(self.__loaded) > max(self.max_loaded, 1):
+                    self.__evict(next(iter(self.__loaded)))
+            return loaded_children
+
+    def __evict(self, key: int):
+        parent_ref, children, list_id, folder, child_refs = self.__loaded.pop(key)
+        parent = parent_ref()
+        # A list that was replaced since it was loaded is kept
+        if parent is not None and id(children.slot.__get__(parent)) == list_id:
+            children.__set__(parent, LazyFolder(self, folder, dict(child_refs)))
+
+    def keep(self, parent):
+        """
+        Keep the loaded children of the object from being dropped, along with every list above it up to its brand
+        Lists above it that were dropped already are loaded again, which reuses the objects that are still used
+        """
+        obj = parent
+        with self.__lock:
+            self.__loaded.pop(id(obj), None)
+            up = self.__parents.get(obj)
+        while up is not None:
+            children = getattr(type(up), CHILD_LISTS[type(obj)])
+            while True:
+                children.__get__(up)
+                with self.__lock:
+                    # Unless it was dropped again by another thread in the meantime
+                    if type(children.slot.__get__(up)) is not LazyFolder:
+                        self.__loaded.pop(id(up), None)
+                        break
+            obj = up
+            with self.__lock:
+                up = self.__parents.get(obj)
+
+    def loaded_count(self) -> int:
+        """The number of loaded lists of children that can be dropped"""
+        return len(self.__loaded)
+
+
+# The folders of the children of each kind of lazily loaded object
+LAZY_CHILD_FOLDERS: dict[type, Callable[[PathLike], list[Path]]] = {
+    Brand: Brand.material_folders,
+    Material: Material.filament_folders,
+    Filament: Filament.variant_folders
+}
+
+
+# ---------------------------------
+# Identifier index
+# ---------------------------------
+
+# The identifiers of a FilamentSize that a spool can be looked up by
+IDENTIFIER_KINDS = ["ean", "article_number", "barcode_identifier", "nfc_identifier", "qr_identifier"]
+
+# The list each kind of object is kept in by its parent
+CHILD_LISTS = {
+    Material: "materials",
+    Filament: "filaments",
+    FilamentVariant: "variants",
+    FilamentSize: "sizes"
+}
+
+
+class SizeLocation:
+    """A size along with the variant, filament, material and brand it belongs to"""
+    __slots__ = ("size", "variant", "filament", "material", "brand")
+
+    size: FilamentSize
+    variant: FilamentVariant
+    filament: Filament
+    material: Material
+    brand: Brand
+
+    def __init__(self, size: FilamentSize, variant: FilamentVariant, filament: Filament, material: Material,
+                 brand: Brand):
+        self.size = size
+        self.variant = variant
+        self.filament = filament
+        self.material = material
+        self.brand = brand
+
+
+class IdentifierIndex:
+    """
+    Finds sizes by their identifiers (see IDENTIFIER_KINDS) with a dict lookup
+    Add and remove objects through Database.add and Database.remove to keep the index up to date, or through
+    add and remove of the index itself. An identifier that changes on an indexed size isn't picked up,
+    remove the size before changing it and add it again afterward
+    """
+
+    def __init__(self, brands: Iterable[Brand] = ()):
+        self.__identifiers: dict[str, dict[str, list[SizeLocation]]] = {kind: {} for kind in IDENTIFIER_KINDS}
+        self.__brands: list[Brand] = []
+        # Materials don't know their brand, so the index keeps track of it
+        self.__material_brands: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        for brand in brands:
+            self.add(brand)
+
+    def __locations(self, obj, parent) -> Iterator[SizeLocation]:
+        """The locations of every size within obj, parent is the object obj belongs to (None for a brand)"""
+        if isinstance(obj, Brand):
+            for material in obj.materials:
+                yield from self.__locations(material, obj)
+        elif isinstance(obj, Material):
+            for filament in obj.filaments:
+                yield from self.__locations(filament, obj)
+        elif isinstance(obj, Filament):
+            for variant in obj.variants:
+                yield from self.__locations(variant, obj)
+        elif isinstance(obj, FilamentVariant):
+            for size in obj.sizes:
+                yield from self.__locations(size, obj)
+        elif isinstance(obj, FilamentSize):
+            filament = parent.parent
+            material = filament.parent
+            yield SizeLocation(obj, parent, filament, material, self.__get_brand(material))
+        else:
+            raise TypeError(f"Can't index an object of type {type(obj).__name__}")
+
+    def __get_brand(self, material: Material) -> Brand:
+        brand = self.__material_brands.get(material)
+        if brand is None:
+            # A material that was dropped by the LazyLoader and loaded again as a new object since it was indexed
+            brand = next((x for x in self.__brands if any(m is material for m in x.materials)), None)
+            if brand is None:
+                raise ValueError(f"The material {material.material_name} doesn't belong to an indexed brand")
+            self.__material_brands[material] = brand
+        return brand
+
+    def add(self, obj, parent=None):
+        """
+        Index a brand, or a material, filament, variant or size along with everything within it
+        :param parent: The object obj belongs to, required for a material and otherwise unused
+        """
+        if isinstance(obj, Brand):
+            self.__brands.append(obj)
+            for material in obj.materials:
+                self.__material_brands[material] = obj
+        elif isinstance(obj, Material):
+            self.__material_brands[obj] = parent
+        for location in self.__locations(obj, parent):
+            for kind, identifiers in self.__identifiers.items():
+                identifier = getattr(location.size, kind)
+                if identifier:
+                    identifiers.setdefault(identifier, []).append(location)
+
+    def remove(self, obj, parent=None):
+        """Remove a brand, or a material, filament, variant or size along with everything within it from the index"""
+        for location in self.__locations(obj, parent):
+            for kind, identifiers in self.__identifiers.items():
+                identifier = getattr(location.size, kind)
+                locations = identifiers.get(identifier)
+                if not locations:
+                    continue
+                locations[:] = [x for x in locations if x.size is not location.size]
+                if len(locations) == 0:
+                    del identifiers[identifier]
+        if isinstance(obj, Brand):
+            self.__brands = [x for x in self.__brands if x is not obj]
+            for material in obj.materials:
+                self.__material_brands.pop(material, None)
+        elif isinstance(obj, Material):
+            self.__material_brands.pop(obj, None)
+
+    def find(self, kind: str, identifier: str) -> Optional[SizeLocation]:
+        """The size with the identifier, if more than one size has it, the first one that was indexed"""
+        locations = self.__identifiers[kind].get(identifier.strip())
+        return locations[0] if locations else None
+
+    def find_all(self, kind: str, identifier: str) -> list[SizeLocation]:
+        return list(self.__identifiers[kind].get(identifier.strip(), ()))
+
+    def find_any(self, identifier: str) -> Optional[SizeLocation]:
+        """The size with the identifier, for a scanned code that can be any kind of identifier"""
+        for kind in IDENTIFIER_KINDS:
+            location = self.find(kind, identifier)
+            if location is not None:
+                return location
+        return None
+
+
+# ---------------------------------
+# Database
+# ---------------------------------
+
+class Database:
+    """
+    A database folder, which holds a data and a stores folder
+    Nothing is loaded until it's needed, the stores are loaded the first time a store is looked up
+    Store IDs are resolved against the current database, which is the one of the innermost active 'with' block,
+    or the database next to this file if there is none
+    """
+    root: Path
+    brands: list[Brand]  # Filled by load_brands() and load_database()
+    loader: Optional[LazyLoader]  # Set by load_brands() when the brands are loaded lazily
+
+    def __init__(self, root: PathLike = DEFAULT_ROOT):
+        self.root = Path(root)
+        self.brands = []
+        self.loader = None
+        self.__identifiers: Optional[IdentifierIndex] = None
+        self.__stores: Optional[dict[str, Store]] = None
+        self.__lock = threading.Lock()
+        self.__tokens: list[Token] = []
+
+    @property
+    def data_dir(self) -> Path:
+        return self.root.joinpath("data")
+
+    @property
+    def stores_dir(self) -> Path:
+        return self.root.joinpath("stores")
+
+    @property
+    def stores(self) -> dict[str, Store]:
+        """The stores keyed by store ID"""
+        if self.__stores is None:
+            with self.__lock:
+                if self.__stores is None:
+                    self.__stores = read_stores(self.stores_dir)
+        return self.__stores
+
+    def load_stores(self):
+        """Load the stores again, replacing the loaded stores"""
+        self.__stores = read_stores(self.stores_dir)
+
+    def save_stores(self, parent_folder: PathLike) -> list[Path]:
+        """:returns The files that changed"""
+        return write_stores(self.stores, parent_folder)
+
+    def brand_folders(self) -> list[Path]:
+        return sorted(x for x in self.data_dir.iterdir() if x.is_dir())
+
+    def load_brand(self, brand_folder: str, loader: Optional[LazyLoader] = None) -> Optional[Brand]:
+        """
+        Load a single brand, along with everything within its folder
+        :param loader: Only load the brand.json file, everything within the brand is loaded once it's used
+        """
+        with self:
+            return Brand.from_folder(self.data_dir.joinpath(brand_folder), None, loader)
+
+    def load_brands(self, lazy: bool = False, max_loaded: Optional[int] = None) -> list[Brand]:
+        """
+        :param lazy: Only load the brand.json files, the materials, filaments and variants are loaded (and validated)
+        once they are used, see LazyLoader
+        :param max_loaded: The number of loaded lists of materials, filaments and variants kept when loading lazily,
+        unlimited if None
+        """
+        self.loader = LazyLoader(self, max_loaded) if lazy else None
+        brands = []
+        for folder in self.brand_folders():
+            brand = self.load_brand(folder.name, self.loader)
+            if brand is not None:
+                brands.append(brand)
+        self.brands = brands
+        self.__identifiers = None
+        return brands
+
+    @property
+    def identifiers(self) -> IdentifierIndex:
+        """The identifier index of the loaded brands, built on first use"""
+        if self.__identifiers is None:
+            self.__identifiers = IdentifierIndex(self.brands)
+        return self.__identifiers
+
+    def add(self, obj, parent=None):
+        """
+        Add a brand to the database, or a material, filament, variant or size to its parent
+        The identifier index is updated to match
+        """
+        if isinstance(obj, Brand):
+            self.brands.append(obj)
+        else:
+            children = getattr(parent, CHILD_LISTS[type(obj)])
+            if self.loader is not None:
+                self.loader.keep(parent)
+            children.append(obj)
+            if isinstance(obj, IChild):
+                obj._set_parent(parent)
+        if self.__identifiers is not None:
+            self.__identifiers.add(obj, parent)
+
+    def remove(self, obj, parent=None):
+        """
+        Remove a brand from the database, or a material, filament, variant or size from its parent
+        The identifier index is updated to match
+        """
+        if self.__identifiers is not None:
+            self.__identifiers.remove(obj, parent)
+        if isinstance(obj, Brand):
+            self.brands.remove(obj)
+        else:
+            children = getattr(parent, CHILD_LISTS[type(obj)])
+            if self.loader is not None:
+                self.loader.keep(parent)
+            children[:] = [x for x in children if x is not obj]
+
+    @property
+    def snapshot_file(self) -> Path:
+        return self.root.joinpath(SNAPSHOT_FILE_NAME)
+
+    def save_snapshot(self, snapshot_file: Optional[PathLike] = None, fingerprint: Optional['Fingerprint'] = None):
+        """
+        Write the stores and the loaded brands to a snapshot file, see load_snapshot
+        :param fingerprint: The fingerprint of the files the brands were loaded from
+        """
+        path = Path(snapshot_file or self.snapshot_file)
+        if fingerprint is None:
+            fingerprint = Fingerprint(self.root)
+        # The stores and brands are pickled together, so purchase links keep pointing at the same Store objects
+        payload = pickle.dumps((self.stores, self.brands), protocol=pickle.HIGHEST_PROTOCOL)
+        temp_path = path.with_name(path.name + ".tmp")
+        with temp_path.open(mode="wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, fingerprint.content_hash,
+                                         fingerprint.stat_hash))
+            f.write(payload)
+        os.replace(temp_path, path)
+
+    def read_snapshot(self, snapshot_file: Optional[PathLike] = None,
+                      fingerprint: Optional['Fingerprint'] = None) -> bool:
+        """
+        Replace the stores and brands with the ones of a snapshot file
+        :param fingerprint: The fingerprint of the files the snapshot has to match
+        :returns If the snapshot was read, False if it's missing, of another version or out of date
+        """
+        path = Path(snapshot_file or self.snapshot_file)
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            return False
+        if len(raw) < SNAPSHOT_HEADER.size:
+            return False
+        magic, version, content_hash, stat_hash = SNAPSHOT_HEADER.unpack_from(raw)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            return False
+
+        if fingerprint is None:
+            fingerprint = Fingerprint(self.root)
+        if stat_hash != fingerprint.stat_hash:
+            # Files were touched, the snapshot is still good if their content didn't change
+            if content_hash != fingerprint.content_hash:
+                return False
+            try:
+                with path.open(mode="r+b") as f:
+                    f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, content_hash, fingerprint.stat_hash))
+            except OSError:
+                # A read-only snapshot is still loaded, the content is hashed again next time
+                pass
+
+        self.__stores, self.brands = pickle.loads(memoryview(raw)[SNAPSHOT_HEADER.size:])
+        self.__identifiers = None
+        self.loader = None
+        return True
+
+    def __enter__(self) -> 'Database':
+        self.__tokens.append(current_database.set(self))
+        return self
+
+    def __exit__(self, *_):
+        current_database.reset(self.__tokens.pop())
+
+
+current_database: ContextVar[Optional[Database]] = ContextVar("current_database", default=None)
+_default_database: Optional[Database] = None
+_default_database_lock = threading.Lock()
+
+
+def get_database() -> Database:
+    """The current database, see Database"""
+    global _default_database
+    database = current_database.get()
+    if database is not None:
+        return database
+    if _default_database is None:
+        with _default_database_lock:
+            if _default_database is None:
+                _default_database = Database()
+    return _default_database
+
+
+# ---------------------------------
+# Loading the whole database
+# ---------------------------------
+
+# The number of materials from which load_database uses worker processes by default, a worker process has to
+# compile the schemas and pickle what it loaded, which costs about as much as loading 15 materials
+LOAD_PROCESS_MIN_MATERIALS = 32
+
+def load_material(folder_path: PathLike) -> Optional[Material]:
+    """The task that loads a material, along with its filaments, variants and sizes"""
+    return Material.from_folder(folder_path)
+
+
+def use_database(root: PathLike):
+    """Makes the database the current one of a worker process, for the tasks it runs"""
+    current_database.set(Database(root))
+
+
+def link_stores(material: Material, stores: dict[str, Store]):
+    """Point the purchase links of a material loaded in another process to the stores of this process"""
+    for filament in material.filaments:
+        for variant in filament.variants:
+            for size in variant.sizes:
+                for purchase_link in size.purchase_links:
+                    purchase_link.store = stores.get(purchase_link.store.store_id, purchase_link.store)
+
+
+def load_database(root: PathLike = DEFAULT_ROOT, workers: Optional[int] = None, processes: Optional[bool] = None,
+                  progress: Optional[Callable[[int, int, Path], None]] = None) -> Database:
+    """
+    Load every brand of the database along with everything within it
+    Materials are loaded concurrently, the result is the same as loading each brand with Brand.from_folder
+    :param workers: The number of processes (or threads) to load with, defaults to the number of CPU cores
+    :param processes: Parse and validate the files in worker processes, or on threads if False. Threads only overlap
+    reading the files as parsing and validating holds the GIL. By default processes are used when there's more than
+    one CPU core and at least LOAD_PROCESS_MIN_MATERIALS materials, see docs/benchmarks.md
+    :param progress: Called with the number of loaded materials, the total number of materials and the folder of the
+    material each time a material is loaded
+    :returns The database, with the brands in Database.brands
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    database = Database(root)
+    database.brands = []
+
+    with database:
+        stores = database.stores
+        brand_materials: list[tuple[Brand, list[Path]]] = []
+        for brand_folder in database.brand_folders():
+            if not Brand.check_folder(brand_folder):
+                continue
+            brand = Brand.from_json_file(brand_folder.joinpath(f"{Brand._file_name()}.json"), None)
+            if brand is None:
+                continue
+            brand_materials.append((brand, Brand.material_folders(brand_folder)))
+            database.brands.append(brand)
+
+        total = sum(len(x) for _, x in brand_materials)
+        if processes is None:
+            processes = (os.cpu_count() or 1) > 1 and total >= LOAD_PROCESS_MIN_MATERIALS
+        loaded: dict[Path, Optional[Material]] = {}
+
+        def done(folder: Path, material: Optional[Material]):
+            loaded[folder] = material
+            if progress is not None:
+                progress(len(loaded), total, folder)
+
+        if workers <= 1:
+            for _, material_folders in brand_materials:
+                for folder in material_folders:
+                    done(folder, load_material(folder))
+        else:
+            executor: Executor
+            if processes:
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=use_database, initargs=(database.root,))
+            else:
+                executor = ThreadPoolExecutor(max_workers=workers)
+            with executor:
+                futures: dict[Future, Path] = {}
+                for _, material_folders in brand_materials:
+                    for folder in material_folders:
+                        # Each thread task gets its own copy of the context, so it uses this database
+                        task = load_material if processes else copy_context().run
+                        args = (folder,) if processes else (load_material, folder)
+                        futures[executor.submit(task, *args)] = folder
+                for future in as_completed(futures):
+                    material = future.result()
+                    if processes and material is not None:
+                        link_stores(material, stores)
+                    done(futures[future], material)
+
+    for brand, material_folders in brand_materials:
+        brand.materials = [loaded[x] for x in material_folders if loaded[x] is not None]
+    return database
+
+
+# ---------------------------------
+# Saving the whole database
+# ---------------------------------
+
+# The number of files each task of save_database serializes or writes
+SAVE_BATCH_SIZE = 256
+# The number of files from which save_database serializes in worker processes by default, the documents have to be
+# pickled to the workers and back, which takes about a fifth of the time serializing them takes
+SAVE_PROCESS_MIN_FILES = 4096
+
+
+def plan_database(database: Database, root: Path) -> dict[Path, Any]:
+    """
+    Every json file save_database writes, along with its json data
+    The paths are the ones to_folder and save_stores use, if two objects end up at the same path the last one wins
+    """
+    files: dict[Path, Any] = {}
+    data_dir = root.joinpath("data")
+    for brand in database.brands:
+        brand_dir = data_dir.joinpath(cleanse_folder_name(brand.brand_name))
+        files[brand_dir.joinpath("brand.json")] = brand.to_dict()
+        for material in brand.materials:
+            material_dir = brand_dir.joinpath(cleanse_folder_name(material.material_name))
+            files[material_dir.joinpath("material.json")] = material.to_dict()
+            for filament in material.filaments:
+                filament_dir = material_dir.joinpath(cleanse_folder_name(filament.name))
+                files[filament_dir.joinpath("filament.json")] = filament.to_dict()
+                for variant in filament.variants:
+                    variant_dir = filament_dir.joinpath(cleanse_folder_name(variant.color_name))
+                    files[variant_dir.joinpath("variant.json")] = variant.to_dict()
+                    files[variant_dir.joinpath("sizes.json")] = [x.to_dict() for x in variant.sizes]
+    for store_id, store in database.stores.items():
+        files[root.joinpath("stores", store_id, "store.json")] = store.to_dict()
+    return files
+
+
+def serialize_batch(documents: list) -> list[bytes]:
+    """The task that serializes a batch of json documents"""
+    return [to_json_bytes(x) for x in documents]
+
+
+def write_batch(batch: list[tuple[Path, bytes]]) -> list[tuple[Path, Optional[bool], Optional[OSError]]]:
+    """
+    The task that writes a batch of files
+    :returns Whether each file changed, or the error writing it
+    """
+    results = []
+    for path, content in batch:
+        try:
+            results.append((path, write_if_changed(path, content), None))
+        except OSError as e:
+            results.append((path, None, e))
+    return results
+
+
+def save_database(database: Database, root: Optional[PathLike] = None, workers: Optional[int] = None,
+                  processes: Optional[bool] = None, progress: Optional[Callable[[int, int, Path], None]] = None
+                  ) -> list[Path]:
+    """
+    Save the loaded brands and the stores of the database, the files are the same as to_folder and save_stores write
+    Every file is planned first, then the folders are created, the files serialized and finally written on a thread
+    pool. Like to_folder, files that already hold the same json are left alone
+    :param root: The folder to save to, defaults to the folder of the database
+    :param workers: The number of threads that write, and of processes that serialize, defaults to the number of CPU
+    cores
+    :param processes: Serialize the files in worker processes when there's more than one worker, the calling thread
+    serializes them if False. By default processes are used when there's more than one CPU core and at least
+    SAVE_PROCESS_MIN_FILES files, see docs/benchmarks.md
+    :param progress: Called with the number of handled files, the total number of files and the last handled file
+    :returns The files that changed
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    root = Path(database.root if root is None else root)
+    files = plan_database(database, root)
+    paths = list(files)
+
+    for folder in sorted({x.parent for x in paths}):
+        folder.mkdir(parents=True, exist_ok=True)
+
+    documents = list(files.values())
+    if processes is None:
+        processes = (os.cpu_count() or 1) > 1 and len(documents) >= SAVE_PROCESS_MIN_FILES
+    batches = [documents[idx:idx + SAVE_BATCH_SIZE] for idx in range(0, len(documents), SAVE_BATCH_SIZE)]
+    if processes and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            contents = [x for batch in executor.map(serialize_batch, batches) for x in batch]
+    else:
+        contents = [x for batch in batches for x in serialize_batch(batch)]
+
+    changed: list[Path] = []
+    errors: list[tuple[Path, OSError]] = []
+    handled = 0
+    write_batches = [list(zip(paths[idx:idx + SAVE_BATCH_SIZE], contents[idx:idx + SAVE_BATCH_SIZE]))
+                     for idx in range(0, len(paths), SAVE_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for results in executor.map(write_batch, write_batches):
+            for path, was_changed, error in results:
+                if error is not None:
+                    errors.append((path, error))
+                elif was_changed:
+                    changed.append(path)
+            handled += len(results)
+            if progress is not None:
+                progress(handled, len(paths), results[-1][0])
+
+    if len(errors) > 0:
+        print(f"Failed to write {len(errors)} of {len(paths)} files:")
+        for path, error in errors:
+            print(f"{path}: {error}")
+    return changed
+
 
 # ---------------------------------
-# Init
+# Snapshots
 # ---------------------------------
 
-# Change the CWD to the parent directory of this script
-cwd = os.getcwd()
-os.chdir(Path(__file__).parent)
+SNAPSHOT_FILE_NAME = ".database_snapshot"
+SNAPSHOT_MAGIC = b"OFDBSNAP"
+# Bump this when the layout of the snapshot changes, which includes the slots and pickled state of the classes in it
+SNAPSHOT_VERSION = 3
+# The source files that a snapshot depends on besides the data, as it holds instances of the classes in this file
+# that were validated with the schema registry
+SNAPSHOT_SOURCE_FILES = ["db_serializer.py", "schema_registry.py"]
+# The magic bytes, the version, the content hash and the stat hash (see Fingerprint),
+# followed by the pickled stores and brands
+SNAPSHOT_HEADER = struct.Struct("<8sI32s32s")
 
-STORE_SCHEMA = get_json_from_file("schemas/store_schema.json")
-BRAND_SCHEMA = get_json_from_file("schemas/brand_schema.json")
-MATERIAL_SCHEMA = get_json_from_file("schemas/material_schema.json")
-FILAMENT_SCHEMA = get_json_from_file("schemas/filament_schema.json")
-VARIANT_SCHEMA = get_json_from_file("schemas/variant_schema.json")
-SIZE_SCHEMA = get_json_from_file("schemas/sizes_schema.json")
 
-# Automatically load the stores on import/run
-load_stores()
+class Fingerprint:
+    """
+    Identifies the state of the json files in the data and stores folders of a database and of the schemas
+    The stat hash only covers the paths, sizes and modification times of the files and is quick to get, the
+    content hash covers their content and is only calculated when it's needed
+    The files in SNAPSHOT_SOURCE_FILES are hashed as well
+    """
+    root: Path
+    stat_hash: bytes
+
+    def __init__(self, root: PathLike = DEFAULT_ROOT):
+        self.root = Path(root)
+        self.__files = self.__find_files()
+        self.__content_hash: Optional[bytes] = None
+
+        digest = hashlib.sha256()
+        for name, path, stat in self.__files:
+            digest.update(f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode("utf8"))
+        self.stat_hash = digest.digest()
+
+    def __find_files(self) -> list[tuple[str, str, os.stat_result]]:
+        files = []
+
+        def scan(folder: str, name: str):
+            for entry in sorted(os.scandir(folder), key=lambda x: x.name):
+                if entry.is_dir():
+                    scan(entry.path, f"{name}/{entry.name}")
+                elif entry.name.endswith(".json"):
+                    files.append((f"{name}/{entry.name}", entry.path, entry.stat()))
+
+        for folder in [self.root.joinpath("data"), self.root.joinpath("stores"), registry.schema_dir]:
+            if folder.is_dir():
+                scan(str(folder), folder.name)
+        source_dir = Path(__file__).parent
+        for name in SNAPSHOT_SOURCE_FILES:
+            path = str(source_dir.joinpath(name))
+            files.append((name, path, os.stat(path)))
+        return files
 
-# Revert to previous CWD
-os.chdir(cwd)
+    @property
+    def content_hash(self) -> bytes:
+        if self.__content_hash is None:
+            digest = hashlib.sha256()
+            for name, path, _ in self.__files:
+                with open(path, mode="rb") as f:
+                    content = f.read()
+                digest.update(f"{name}\0{len(content)}\0".encode("utf8"))
+                digest.update(content)
+            self.__content_hash = digest.digest()
+        return self.__content_hash
+
+
+def load_snapshot(root: PathLike = DEFAULT_ROOT, snapshot_file: Optional[PathLike] = None,
+                  workers: Optional[int] = None) -> Database:
+    """
+    Load the database from its snapshot, which skips parsing and validating every json file
+    If the snapshot is missing or out of date the database is loaded with load_database and the snapshot is rebuilt
+    Snapshots are pickled, only read snapshots that this code wrote
+    :param snapshot_file: Defaults to Database.snapshot_file
+    """
+    fingerprint = Fingerprint(root)
+    database = Database(root)
+    if database.read_snapshot(snapshot_file, fingerprint):
+        return database
+
+    print(f"The snapshot of {database.root} is missing or out of date, rebuilding it")
+    database = load_database(root, workers)
+    database.save_snapshot(snapshot_file, fingerprint)
+    return database
+
+
+def __getattr__(name: str):
+    # The schemas and stores are only loaded when they are first used
+    if name in SCHEMA_CONSTANTS:
+        return registry.schema(SCHEMA_CONSTANTS[name])
+    if name == "stores":
+        return get_database().stores
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
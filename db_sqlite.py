@@ -0,0 +1,298 @@
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from db_serializer import Brand, Database, DEFAULT_ROOT, VariantTraits, as_list, cleanse_folder_name, \
+    load_database, load_snapshot
+
+PathLike = Union[str, os.PathLike[str]]
+
+# The tables in the order they are filled, a table only refers to the tables before it
+# Every table has a text id, which is the path of the folder of the object in the data folder (the folders
+# save_database writes, see cleanse_folder_name), or the store id. Sizes and purchase links add their position to the
+# id of their variant and size. The ids stay the same between exports, so incremental exports can tell which rows
+# changed
+TABLES = {
+    "stores": """
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        storefront_url TEXT NOT NULL,
+        logo TEXT NOT NULL,
+        affiliate INTEGER NOT NULL,
+        ships_from TEXT NOT NULL,
+        ships_to TEXT NOT NULL
+    """,
+    "brands": """
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        website TEXT NOT NULL,
+        logo TEXT NOT NULL,
+        origin TEXT NOT NULL
+    """,
+    "materials": """
+        id TEXT PRIMARY KEY,
+        brand_id TEXT NOT NULL REFERENCES brands (id) ON DELETE CASCADE,
+        material TEXT NOT NULL,
+        default_max_dry_temperature INTEGER,
+        default_slicer_settings TEXT
+    """,
+    "filaments": """
+        id TEXT PRIMARY KEY,
+        material_id TEXT NOT NULL REFERENCES materials (id) ON DELETE CASCADE,
+        name TEXT NOT NULL,
+        diameter_tolerance REAL NOT NULL,
+        density REAL NOT NULL,
+        max_dry_temperature INTEGER,
+        resolved_max_dry_temperature INTEGER,
+        data_sheet_url TEXT,
+        safety_sheet_url TEXT,
+        discontinued INTEGER,
+        slicer_ids TEXT,
+        slicer_settings TEXT
+    """,
+    "variants": """
+        id TEXT PRIMARY KEY,
+        filament_id TEXT NOT NULL REFERENCES filaments (id) ON DELETE CASCADE,
+        color_name TEXT NOT NULL,
+        color_hex TEXT NOT NULL,
+        color_hexes TEXT NOT NULL,
+        discontinued INTEGER,
+        color_standards TEXT,
+        """ + ",\n".join(f"{x} INTEGER" for x in VariantTraits.__slots__),
+    "sizes": """
+        id TEXT PRIMARY KEY,
+        variant_id TEXT NOT NULL REFERENCES variants (id) ON DELETE CASCADE,
+        filament_weight REAL NOT NULL,
+        diameter REAL NOT NULL,
+        empty_spool_weight REAL,
+        spool_core_diameter REAL,
+        ean TEXT,
+        article_number TEXT,
+        barcode_identifier TEXT,
+        nfc_identifier TEXT,
+        qr_identifier TEXT,
+        discontinued INTEGER
+    """,
+    "purchase_links": """
+        id TEXT PRIMARY KEY,
+        size_id TEXT NOT NULL REFERENCES sizes (id) ON DELETE CASCADE,
+        store_id TEXT NOT NULL REFERENCES stores (id),
+        url TEXT NOT NULL,
+        affiliate INTEGER NOT NULL,
+        spool_refill INTEGER NOT NULL,
+        ships_from TEXT,
+        ships_to TEXT,
+        resolved_ships_from TEXT NOT NULL,
+        resolved_ships_to TEXT NOT NULL
+    """
+}
+
+# Created once the tables are filled, as filling an indexed table is slower
+INDEXES = {
+    "materials_brand_id": "materials (brand_id)",
+    "materials_material": "materials (material)",
+    "filaments_material_id": "filaments (material_id)",
+    "variants_filament_id": "variants (filament_id)",
+    "variants_color_hex": "variants (color_hex)",
+    "sizes_variant_id": "sizes (variant_id)",
+    "sizes_ean": "sizes (ean)",
+    "sizes_article_number": "sizes (article_number)",
+    "purchase_links_size_id": "purchase_links (size_id)",
+    "purchase_links_store_id": "purchase_links (store_id)"
+}
+
+
+# ---------------------------------
+# Rows
+# ---------------------------------
+
+def to_json(value) -> Optional[str]:
+    """Lists and nested objects are stored as json text, empty ones as NULL"""
+    if value is None or (isinstance(value, (list, tuple, dict)) and len(value) == 0):
+        return None
+    return json.dumps(value, separators=(",", ":"))
+
+
+def get_rows(stores: dict, brands: list[Brand]) -> dict[str, list[tuple]]:
+    """The rows of every table, see TABLES"""
+    rows: dict[str, list[tuple]] = {table: [] for table in TABLES}
+    for store in stores.values():
+        rows["stores"].append((store.store_id, store.name, store.storefront_url, store.logo, int(store.affiliate),
+                               json.dumps(as_list(store.ships_from)), json.dumps(as_list(store.ships_to))))
+
+    for brand in brands:
+        brand_id = cleanse_folder_name(brand.brand_name)
+        rows["brands"].append((brand_id, brand.brand_name, brand.website, brand.logo, brand.origin))
+        for material in brand.materials:
+            material_id = f"{brand_id}/{cleanse_folder_name(material.material_name)}"
+            default_slicer_settings = material.default_slicer_settings
+            rows["materials"].append((
+                material_id, brand_id, material.material_name, material.default_max_dry_temperature,
+                to_json(default_slicer_settings.to_dict() if default_slicer_settings else None)
+            ))
+            for filament in material.filaments:
+                filament_id = f"{material_id}/{cleanse_folder_name(filament.name)}"
+                rows["filaments"].append((
+                    filament_id, material_id, filament.name, filament.diameter_tolerance, filament.density,
+                    filament.max_dry_temperature, filament.get_max_dry_temperature(), filament.data_sheet_url,
+                    filament.safety_sheet_url, filament.discontinued, to_json(filament.slicer_ids.to_dict()),
+                    to_json(filament.slicer_settings.to_dict() if filament.slicer_settings else None)
+                ))
+                for variant in filament.variants:
+                    variant_id = f"{filament_id}/{cleanse_folder_name(variant.color_name)}"
+                    rows["variants"].append((
+                        variant_id, filament_id, variant.color_name, variant.pretty_color_hex[0],
+                        json.dumps(variant.pretty_color_hex), variant.discontinued,
+                        to_json(variant.color_standards.to_dict()),
+                        *(getattr(variant.traits, x) for x in VariantTraits.__slots__)
+                    ))
+                    for size_idx, size in enumerate(variant.sizes):
+                        size_id = f"{variant_id}#{size_idx}"
+                        rows["sizes"].append((
+                            size_id, variant_id, size.filament_weight, size.diameter, size.empty_spool_weight,
+                            size.spool_core_diameter, size.ean, size.article_number, size.barcode_identifier,
+                            size.nfc_identifier, size.qr_identifier, size.discontinued
+                        ))
+                        for link_idx, link in enumerate(size.purchase_links):
+                            rows["purchase_links"].append((
+                                f"{size_id}#{link_idx}", size_id, link.store.store_id, link.url, int(link.affiliate),
+                                int(link.spool_refill), to_json(as_list(link.ships_from)),
+                                to_json(as_list(link.ships_to)), json.dumps(as_list(link.get_ships_from())),
+                                json.dumps(as_list(link.get_ships_to()))
+                            ))
+    check_ids(rows)
+    return rows
+
+
+# The column that names the object of a row, for errors
+NAME_COLUMNS = {"stores": "name", "brands": "name", "materials": "material", "filaments": "name",
+                "variants": "color_name", "sizes": "id", "purchase_links": "url"}
+
+
+def check_ids(rows: dict[str, list[tuple]]):
+    """
+    Raise a ValueError if two rows of a table have the same id
+    Names that only differ in slashes or surrounding whitespace get the same folder name, see cleanse_folder_name, so
+    the objects with them would replace each other in the export, as they would in the data folder
+    """
+    for table, table_rows in rows.items():
+        name_column = get_columns(table).index(NAME_COLUMNS[table])
+        seen: dict[str, tuple] = {}
+        for row in table_rows:
+            other = seen.setdefault(row[0], row)
+            if other is not row:
+                raise ValueError(f"The {table} {other[name_column]!r} and {row[name_column]!r} both get the id "
+                                 f"{row[0]!r}, rename one of them so their folder names differ")
+
+
+# ---------------------------------
+# Export
+# ---------------------------------
+
+def get_columns(table: str) -> list[str]:
+    return [line.split()[0] for line in TABLES[table].split(",\n") if line.strip()]
+
+
+def create_tables(connection: sqlite3.Connection):
+    for table, columns in TABLES.items():
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+
+
+def create_indexes(connection: sqlite3.Connection):
+    for name, columns in INDEXES.items():
+        connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}")
+
+
+def export_full(rows: dict[str, list[tuple]], output_file: Path):
+    """Write every row to a new database, which replaces output_file once it's complete"""
+    temp_file = output_file.with_name(output_file.name + ".tmp")
+    temp_file.unlink(missing_ok=True)
+    connection = sqlite3.connect(temp_file)
+    try:
+        # Nothing needs to survive a crash, the file is only moved into place once it's complete
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        with connection:
+            create_tables(connection)
+            for table, table_rows in rows.items():
+                placeholders = ", ".join("?" for _ in get_columns(table))
+                connection.executemany(f"INSERT INTO {table} VALUES ({placeholders})", table_rows)
+            create_indexes(connection)
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+    os.replace(temp_file, output_file)
+
+
+def export_incremental(rows: dict[str, list[tuple]], output_file: Path) -> dict[str, tuple[int, int]]:
+    """
+    Update an earlier export in place, only rows that changed are written
+    :returns The number of upserted and deleted rows of each table
+    """
+    changes = {}
+    connection = sqlite3.connect(output_file)
+    try:
+        connection.execute("PRAGMA foreign_keys = ON")
+        with connection:
+            create_tables(connection)
+            deleted: dict[str, list[str]] = {}
+            for table, table_rows in rows.items():
+                columns = get_columns(table)
+                existing = {row[0]: row for row in connection.execute(f"SELECT {', '.join(columns)} FROM {table}")}
+                changed = [row for row in table_rows if existing.get(row[0]) != row]
+                ids = {row[0] for row in table_rows}
+                deleted[table] = [x for x in existing if x not in ids]
+
+                updates = ", ".join(f"{x} = excluded.{x}" for x in columns[1:])
+                placeholders = ", ".join("?" for _ in columns)
+                connection.executemany(
+                    f"INSERT INTO {table} VALUES ({placeholders}) ON CONFLICT (id) DO UPDATE SET {updates}", changed)
+                changes[table] = (len(changed), len(deleted[table]))
+
+            # Children go first, as purchase links refer to stores without cascading
+            for table in reversed(TABLES):
+                connection.executemany(f"DELETE FROM {table} WHERE id = ?", [(x,) for x in deleted[table]])
+            create_indexes(connection)
+    finally:
+        connection.close()
+    return changes
+
+
+def export_sqlite(database: Database, output_file: PathLike, incremental: bool = False) -> dict[str, tuple[int, int]]:
+    """
+    Export the stores and loaded brands of the database to an SQLite database
+    :param incremental: Update an earlier export instead of writing a new one, rows that didn't change aren't touched
+    :returns The number of written and deleted rows of each table
+    """
+    output_file = Path(output_file)
+    rows = get_rows(database.stores, database.brands)
+    if incremental and output_file.exists():
+        return export_incremental(rows, output_file)
+    export_full(rows, output_file)
+    return {table: (len(table_rows), 0) for table, table_rows in rows.items()}
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Export the database to SQLite")
+    parser.add_argument("output_file", help="The SQLite file to write")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="The folder with the data and stores folders")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Update an earlier export, only writing the rows that changed")
+    parser.add_argument("--snapshot", action="store_true", help="Load the database from its snapshot")
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    if args.snapshot:
+        loaded_database = load_snapshot(args.root)
+    else:
+        loaded_database = load_database(args.root)
+    loaded = time.perf_counter()
+    table_changes = export_sqlite(loaded_database, args.output_file, args.incremental)
+    for table_name, (written, removed) in table_changes.items():
+        print(f"{table_name}: {written} written, {removed} deleted")
+    print(f"Loaded in {loaded - start:.2f}s, exported in {time.perf_counter() - loaded:.2f}s")
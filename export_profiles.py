@@ -0,0 +1,275 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+
+from db_serializer import Brand, DEFAULT_ROOT, Filament, SAVE_BATCH_SIZE, cleanse_folder_name, load_database, \
+    load_snapshot, to_json_bytes, write_batch, write_if_changed
+from load_profiles import ProfileIndex, load_profile_index, profile_output_path
+
+PathLike = Union[str, os.PathLike[str]]
+
+# The slicers profiles are exported for, Cura profiles aren't converted from their XML files yet (see load_profiles)
+EXPORT_SLICERS = ["prusaslicer", "bambustudio", "orcaslicer"]
+
+# Keys of the base profiles that only belong to the base profile, these aren't exported
+PRUSASLICER_SKIPPED_KEYS = {"filament_settings_id", "inherits"}
+SLIC3R_SKIPPED_KEYS = {"setting_id"}
+
+# Lists the files of the last export, only those are removed when they aren't exported anymore
+EXPORT_MANIFEST_FILE_NAME = ".export_manifest.json"
+
+
+# ---------------------------------
+# Rendering
+# ---------------------------------
+
+def get_export_name(brand: Brand, filament: Filament) -> str:
+    """The name of the exported profiles of a filament, the printer suffix of the base profile is added to it"""
+    material_name = filament.parent.material_name if filament.parent is not None else ""
+    if material_name.lower() in filament.name.lower():
+        return f"{brand.brand_name} {filament.name}"
+    return f"{brand.brand_name} {material_name} {filament.name}"
+
+
+def get_printer_suffix(profile_name: str) -> str:
+    """The '@...' part of a profile name, or an empty string if it has none"""
+    return profile_name[profile_name.rfind("@"):] if "@" in profile_name else ""
+
+
+def to_setting(value: Any) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def apply_overrides(profile: dict[str, Any], overrides: dict[str, Any], separator: Optional[str]) -> dict[str, Any]:
+    """
+    A copy of the profile with the overrides applied, the values are converted to the type the profile uses
+    :param separator: What PrusaSlicer separates the values of a list with, lists are kept as lists if None
+    (BambuStudio and OrcaSlicer store settings as a list with a value per extruder)
+    """
+    result = dict(profile)
+    for key, value in overrides.items():
+        values = [to_setting(x) for x in value] if isinstance(value, (list, tuple)) else [to_setting(value)]
+        if separator is not None:
+            result[key] = separator.join(values)
+        elif isinstance(profile.get(key), list):
+            # A single value is used for every extruder
+            result[key] = values * max(len(profile[key]), 1) if len(values) == 1 else values
+        elif isinstance(value, (list, tuple)):
+            result[key] = values
+        else:
+            result[key] = values[0]
+    return result
+
+
+def render_prusaslicer(profile: dict[str, Any], name: str, brand_name: str, overrides: dict[str, Any]) -> str:
+    """A section of a PrusaSlicer config bundle"""
+    profile = apply_overrides(profile, overrides, ",")
+    profile["filament_vendor"] = brand_name
+    lines = [f"[filament:{name}]"]
+    lines.extend(f"{k} = {v}" for k, v in sorted(profile.items()) if k not in PRUSASLICER_SKIPPED_KEYS)
+    return "\n".join(lines) + "\n"
+
+
+def render_slic3r(base_name: str, profile: dict[str, Any], name: str, brand_name: str,
+                  overrides: dict[str, Any]) -> bytes:
+    """A BambuStudio or OrcaSlicer user preset, which inherits from the base profile"""
+    profile = apply_overrides(profile, overrides, None)
+    profile = {k: v for k, v in profile.items() if k not in SLIC3R_SKIPPED_KEYS}
+    profile.update({
+        "name": name,
+        "inherits": base_name,
+        "from": "User",
+        "instantiation": "true",
+        "filament_settings_id": [name],
+        "filament_vendor": [brand_name]
+    })
+    return (json.dumps(profile, indent=4, ensure_ascii=False) + "\n").encode("utf8")
+
+
+def render_profiles(job: tuple[str, list[tuple[str, str]], list[tuple[str, str, str, dict[str, Any]]]]) \
+        -> list[tuple[str, str, str | bytes]]:
+    """
+    The task that renders the exported profiles of a base profile name
+    Each base profile is only parsed once, for every filament that uses it
+    :param job: The slicer, the full name and path of each base profile and the brand name, brand folder, export name
+    and overrides of each filament
+    :returns The brand folder, name and content of each exported profile
+    """
+    slicer, base_profiles, targets = job
+    rendered = []
+    for base_name, base_path in base_profiles:
+        with open(base_path, mode="rb") as f:
+            profile = json.loads(f.read())
+        suffix = get_printer_suffix(base_name)
+        for brand_name, brand_folder, export_name, overrides in targets:
+            name = f"{export_name} {suffix}" if suffix else export_name
+            if slicer == "prusaslicer":
+                content = render_prusaslicer(profile, name, brand_name, overrides)
+            else:
+                content = render_slic3r(base_name, profile, name, brand_name, overrides)
+            rendered.append((brand_folder, name, content))
+    return rendered
+
+
+# ---------------------------------
+# Export
+# ---------------------------------
+
+def plan_profiles(brands: Iterable[Brand], index: ProfileIndex, slicers: Iterable[str] = EXPORT_SLICERS) \
+        -> list[tuple[str, list[tuple[str, str]], list[tuple[str, str, str, dict[str, Any]]]]]:
+    """
+    Group the filaments with slicer settings by the base profile they use, see render_profiles
+    Filaments whose base profile can't be found are printed and skipped
+    """
+    jobs: dict[tuple[str, str], list[tuple[str, str, str, dict[str, Any]]]] = {}
+    for brand in brands:
+        brand_folder = cleanse_folder_name(brand.brand_name)
+        for material in brand.materials:
+            for filament in material.filaments:
+                export_name = get_export_name(brand, filament)
+                for slicer in slicers:
+                    data = filament.get_slicer_data(slicer)
+                    if data is None:
+                        continue
+                    if len(index.find(slicer, data.profile_name)) == 0:
+                        print(f"'{data.profile_name}' is not a known {slicer} profile, used by {export_name}")
+                        continue
+                    jobs.setdefault((slicer, data.profile_name), []).append(
+                        (brand.brand_name, brand_folder, export_name, dict(data.overrides)))
+
+    return [(slicer, [(name, str(index.get_path(entry))) for name, entry in index.find(slicer, profile_name)], targets)
+            for (slicer, profile_name), targets in jobs.items()]
+
+
+def check_output_dir(output_dir: PathLike, profiles_dir: Optional[PathLike] = None):
+    """
+    Raises a ValueError if the output folder is, is within or holds the folder the profiles were extracted to,
+    exporting there could overwrite or remove the extracted profiles
+    """
+    output_dir = Path(output_dir).resolve()
+    profiles_dir = Path(profiles_dir or profile_output_path).resolve()
+    if output_dir.is_relative_to(profiles_dir) or profiles_dir.is_relative_to(output_dir):
+        raise ValueError(f"Can't export to {output_dir}, it overlaps the extracted profiles in {profiles_dir}")
+
+
+def read_manifest(output_dir: Path) -> list[str]:
+    """The files of the last export to the folder, relative to it"""
+    try:
+        with output_dir.joinpath(EXPORT_MANIFEST_FILE_NAME).open(mode="r", encoding="utf8") as f:
+            files = json.load(f)["files"]
+        # Never remove anything outside the folder, whatever the manifest says
+        return [x for x in files if isinstance(x, str) and not x.startswith("/") and ".." not in x.split("/")]
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+
+def export_profiles(brands: Iterable[Brand], output_dir: PathLike, profiles_dir: Optional[PathLike] = None,
+                    slicers: Iterable[str] = EXPORT_SLICERS, workers: Optional[int] = None,
+                    index: Optional[ProfileIndex] = None) -> list[Path]:
+    """
+    Export slicer profiles for every filament with slicer settings, each is its base profile with the overrides of
+    the filament (see Filament.get_slicer_data) applied, for every printer the base profile is made for
+    PrusaSlicer profiles are written as a config bundle for each brand (prusaslicer/<brand>.ini), BambuStudio and
+    OrcaSlicer profiles as a user preset for each profile (<slicer>/<brand>/<name>.json)
+    Files that already hold the same content are left alone. The exported files are listed in a manifest in
+    output_dir, files of the last export that aren't exported anymore are removed, other files are never touched
+    :param profiles_dir: The folder the profiles were extracted to, defaults to load_profiles.profile_output_path
+    :param workers: The number of processes that render the profiles, defaults to the number of CPU cores
+    :param index: The index of the base profiles, the one of profiles_dir if not given (see load_profile_index)
+    :returns The files that changed
+    :raises ValueError: If output_dir overlaps the profiles folder, see check_output_dir
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    slicers = list(slicers)
+    output_dir = Path(output_dir)
+    check_output_dir(output_dir, profiles_dir if index is None else index.profile_path)
+    if index is None:
+        index = load_profile_index(profiles_dir)
+    jobs = plan_profiles(brands, index, slicers)
+
+    # Biggest jobs first, so no worker is left with a big job at the end
+    jobs.sort(key=lambda x: len(x[1]) * len(x[2]), reverse=True)
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render_profiles, jobs))
+    else:
+        results = [render_profiles(x) for x in jobs]
+
+    files: dict[Path, bytes] = {}
+    bundles: dict[str, dict[str, str]] = {}
+    for (slicer, _, _), rendered in zip(jobs, results):
+        for brand_folder, name, content in rendered:
+            if slicer == "prusaslicer":
+                bundles.setdefault(brand_folder, {})[name] = content
+            else:
+                files[output_dir.joinpath(slicer, brand_folder, f"{cleanse_folder_name(name)}.json")] = content
+    for brand_folder, sections in bundles.items():
+        content = "\n".join(sections[x] for x in sorted(sections))
+        files[output_dir.joinpath("prusaslicer", f"{brand_folder}.ini")] = content.encode("utf8")
+
+    for folder in sorted({x.parent for x in files}):
+        folder.mkdir(parents=True, exist_ok=True)
+
+    changed: list[Path] = []
+    items = sorted(files.items())
+    batches = [items[idx:idx + SAVE_BATCH_SIZE] for idx in range(0, len(items), SAVE_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for batch in executor.map(write_batch, batches):
+            for path, was_changed, error in batch:
+                if error is not None:
+                    print(f"Failed to write {path}: {error}")
+                elif was_changed:
+                    changed.append(path)
+
+    # Remove the profiles of filaments that were removed, renamed or lost their slicer settings
+    # The files of slicers that weren't exported this time are kept, and stay in the manifest
+    exported = [x.relative_to(output_dir).as_posix() for x in sorted(files)]
+    kept = set(exported)
+    for rel_path in read_manifest(output_dir):
+        if rel_path.split("/", 1)[0] not in slicers:
+            kept.add(rel_path)
+            continue
+        path = output_dir.joinpath(rel_path)
+        if rel_path not in kept and path.is_file():
+            path.unlink()
+            changed.append(path)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    write_if_changed(output_dir.joinpath(EXPORT_MANIFEST_FILE_NAME), to_json_bytes({"files": sorted(kept)}))
+    return changed
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Export slicer profiles with the slicer settings of every filament")
+    parser.add_argument("output_dir", help="The folder to write the profiles to")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="The folder with the data and stores folders")
+    parser.add_argument("--profiles-dir", help="The folder the profiles were extracted to, see load_profiles.py")
+    parser.add_argument("--slicers", nargs="+", choices=EXPORT_SLICERS, default=EXPORT_SLICERS)
+    parser.add_argument("--workers", type=int, help="The number of processes to render with")
+    parser.add_argument("--snapshot", action="store_true", help="Load the database from its snapshot")
+
+    args = parser.parse_args()
+    try:
+        check_output_dir(args.output_dir, args.profiles_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    if args.snapshot:
+        loaded_database = load_snapshot(args.root)
+    else:
+        loaded_database = load_database(args.root)
+    loaded = time.perf_counter()
+    changed_files = export_profiles(loaded_database.brands, args.output_dir, args.profiles_dir, args.slicers,
+                                    args.workers)
+    print(f"{len(changed_files)} files changed")
+    print(f"Loaded in {loaded - start:.2f}s, exported in {time.perf_counter() - loaded:.2f}s")
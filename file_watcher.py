@@ -0,0 +1,190 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+PathLike = Union[str, os.PathLike[str]]
+
+# inotify flags, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | \
+             IN_DELETE_SELF | IN_MOVE_SELF
+
+# The header of each event read from an inotify file descriptor: wd, mask, cookie and the length of the name
+EVENT_HEADER = struct.Struct("iIII")
+
+# Editors often save a file in several steps, changes are collected until none came in for this long (in seconds)
+SETTLE_TIME = 0.03
+
+
+# ---------------------------------
+# inotify
+# ---------------------------------
+
+class InotifyWatcher:
+    """
+    Watches folders and everything within them with Linux inotify
+    Folders created later on are watched as soon as they show up
+    """
+    roots: list[Path]
+
+    def __init__(self, roots: list[PathLike]):
+        self.roots = [Path(x) for x in roots]
+        self.__libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.__fd = self.__libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), "Failed to initialize inotify")
+        self.__watches: dict[int, Path] = {}
+        try:
+            for root in self.roots:
+                self.__add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def __add_watch(self, folder: Path):
+        wd = self.__libc.inotify_add_watch(self.__fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Failed to watch {folder}")
+        self.__watches[wd] = folder
+
+    def __add_tree(self, folder: Path):
+        for root, _, _ in os.walk(folder):
+            self.__add_watch(Path(root))
+
+    def __read_events(self) -> set[Path]:
+        changed: set[Path] = set()
+        while True:
+            try:
+                data = os.read(self.__fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + name_length].rstrip(b"\0")
+                offset += name_length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost, so everything may have changed
+                    changed.update(self.roots)
+                    continue
+                folder = self.__watches.get(wd)
+                if mask & IN_IGNORED:
+                    self.__watches.pop(wd, None)
+                    continue
+                if folder is None:
+                    continue
+
+                path = folder.joinpath(os.fsdecode(name)) if name else folder
+                changed.add(path)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and path.is_dir():
+                    self.__add_tree(path)
+
+    def wait(self, timeout: Optional[float] = None) -> set[Path]:
+        """
+        Blocks until something changes or the timeout runs out
+        :returns The paths of the changed files and folders, a changed folder may have changes anywhere within it
+        """
+        ready, _, _ = select.select([self.__fd], [], [], timeout)
+        if len(ready) == 0:
+            return set()
+        changed = self.__read_events()
+        while len(select.select([self.__fd], [], [], SETTLE_TIME)[0]) > 0:
+            changed |= self.__read_events()
+        return changed
+
+    def close(self):
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+# ---------------------------------
+# Polling
+# ---------------------------------
+
+class PollingWatcher:
+    """Watches folders by comparing the modification time and size of every file within them"""
+    roots: list[Path]
+    interval: float  # In seconds
+
+    def __init__(self, roots: list[PathLike], interval: float = 0.5):
+        self.roots = [Path(x) for x in roots]
+        self.interval = interval
+        self.__snapshot = self.__scan()
+
+    def __scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot: dict[Path, tuple[int, int]] = {}
+        for root in self.roots:
+            for folder, _, files in os.walk(root):
+                for file_name in files:
+                    path = Path(folder, file_name)
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float] = None) -> set[Path]:
+        """
+        Blocks until something changes or the timeout runs out
+        :returns The paths of the changed files
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.__scan()
+            changed = {path for path in snapshot.keys() | self.__snapshot.keys()
+                       if snapshot.get(path) != self.__snapshot.get(path)}
+            self.__snapshot = snapshot
+            if len(changed) > 0:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else min(self.interval, max(deadline - time.monotonic(), 0)))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def create_watcher(roots: list[PathLike], polling: bool = False) -> Union[InotifyWatcher, PollingWatcher]:
+    """Watch the folders with inotify if it's available, falls back to polling otherwise"""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots)
@@ -1,10 +1,11 @@
 import fileinput
+import hashlib
 import json
 import os
 import re
 import shutil
 from pathlib import Path
-from typing import Union, Optional
+from typing import Callable, Union, Optional
 from urllib.request import urlretrieve
 from zipfile import ZipFile
 
@@ -25,6 +26,273 @@ ORCASLICER_URL = "https://github.com/SoftFever/OrcaSlicer/archive/refs/heads/mai
 CURA_URL = "https://github.com/Ultimaker/fdm_materials/archive/refs/heads/master.zip"
 
 
+# The slicers that profiles are extracted for, these are the folder names within the output path
+SLICERS = ["prusaslicer", "bambustudio", "orcaslicer", "cura"]
+
+
+def get_profile_name(profile: dict) -> Optional[str]:
+    """Returns the name a slicer knows the profile by, or None if the profile doesn't have a name"""
+    if "name" in profile:
+        return profile["name"]
+    if "filament_settings_id" in profile:
+        return profile["filament_settings_id"]
+    return None
+
+
+def strip_printer_suffix(profile_name: str) -> str:
+    """
+    Removes the printer specific part after the '@' from a slic3r style profile name
+    This is done the same way as when the database loads a profile_name, see db_serializer.SpecificSlicerSettings
+    """
+    if "@" in profile_name:
+        return profile_name[:profile_name.rfind("@")].rstrip()
+    return profile_name
+
+
+# ---------------------------------
+# Profile index
+# ---------------------------------
+
+# The index of the extracted profiles, written within the output path at the end of run()
+PROFILE_INDEX_FILE_NAME = ".profile_index.json"
+PROFILE_INDEX_VERSION = 1
+
+# The profiles each extracted profile inherits from (see get_inherits_chain), collected while the profiles are squashed
+# Keyed by slicer and then by profile name, run() stores these in the index
+profile_inherits: dict[str, dict[str, list[str]]] = {}
+
+
+def hash_profile(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def stat_profile_files(profile_path: Path) -> dict[str, tuple[int, int]]:
+    """The size and modification time of every file within the folders of the slicers, keyed by the relative path"""
+    files: dict[str, tuple[int, int]] = {}
+
+    def scan(folder: str, rel_folder: str):
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                rel_path = f"{rel_folder}/{entry.name}"
+                if entry.is_dir():
+                    scan(entry.path, rel_path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[rel_path] = (stat.st_size, stat.st_mtime_ns)
+
+    for slicer in SLICERS:
+        if profile_path.joinpath(slicer).is_dir():
+            scan(str(profile_path.joinpath(slicer)), slicer)
+    return files
+
+
+class ProfileEntry:
+    """Where an extracted profile is, along with what it was made from"""
+    __slots__ = ("path", "vendor", "inherits", "content_hash")
+
+    path: str  # Relative to the output path, with '/' separators
+    vendor: Optional[str]  # The vendor folder the profile is in, None if the slicer has no vendor folders (Cura)
+    inherits: list[str]  # The profiles it was squashed from, see get_inherits_chain
+    content_hash: str
+
+    def __init__(self, path: str, vendor: Optional[str], inherits: list[str], content_hash: str):
+        self.path = path
+        self.vendor = vendor
+        self.inherits = inherits
+        self.content_hash = content_hash
+
+    def to_dict(self) -> dict:
+        return {"path": self.path, "vendor": self.vendor, "inherits": self.inherits, "hash": self.content_hash}
+
+    @staticmethod
+    def from_dict(data: dict) -> 'ProfileEntry':
+        return ProfileEntry(data["path"], data.get("vendor"), data.get("inherits", []), data["hash"])
+
+
+class ProfileIndex:
+    """
+    The extracted profiles of every slicer by name, so a profile is found without opening any files
+    The size and modification time of every file are stored as well, to tell when the index is out of date
+    Use load_profile_index to get the index of an output path
+    """
+    __slots__ = ("profile_path", "profiles", "files", "__base_names")
+
+    profile_path: Path
+    profiles: dict[str, dict[str, ProfileEntry]]  # Keyed by slicer and then by profile name
+    files: dict[str, tuple[int, int]]  # The size and modification time of each file, see stat_profile_files
+
+    def __init__(self, profile_path: PathLike, profiles: dict[str, dict[str, ProfileEntry]],
+                 files: dict[str, tuple[int, int]]):
+        self.profile_path = Path(profile_path)
+        self.profiles = profiles
+        self.files = files
+        self.__base_names: dict[str, dict[str, list[str]]] = {}
+
+    def get(self, slicer_name: str, profile_name: str) -> Optional[ProfileEntry]:
+        """The profile with exactly this name"""
+        return self.profiles.get(slicer_name, {}).get(profile_name)
+
+    def get_path(self, entry: ProfileEntry) -> Path:
+        return self.profile_path.joinpath(entry.path)
+
+    def find(self, slicer_name: str, profile_name: str) -> list[tuple[str, ProfileEntry]]:
+        """
+        Every profile of the name regardless of its printer suffix, along with its full name
+        This is how the database refers to profiles, see db_serializer.SpecificSlicerSettings
+        """
+        if slicer_name not in self.__base_names:
+            base_names: dict[str, list[str]] = {}
+            for name in sorted(self.profiles.get(slicer_name, {})):
+                base_names.setdefault(strip_printer_suffix(name), []).append(name)
+            self.__base_names[slicer_name] = base_names
+        profiles = self.profiles.get(slicer_name, {})
+        return [(x, profiles[x]) for x in self.__base_names[slicer_name].get(strip_printer_suffix(profile_name), [])]
+
+    def get_names(self, slicer_name: str) -> set[str]:
+        """The names of the profiles of a slicer, with and without their printer suffix"""
+        names = set(self.profiles.get(slicer_name, {}))
+        names.update(strip_printer_suffix(x) for x in list(names))
+        return names
+
+    def is_stale(self) -> bool:
+        """If a profile was added, removed or changed since the index was built, only the files are stat'd"""
+        return stat_profile_files(self.profile_path) != self.files
+
+    @staticmethod
+    def build(profile_path: Optional[PathLike] = None, inherits: Optional[dict[str, dict[str, list[str]]]] = None,
+              previous: Optional['ProfileIndex'] = None) -> 'ProfileIndex':
+        """
+        Index the extracted profiles
+        :param inherits: The inherits chains collected while squashing (see profile_inherits), for profiles that
+        aren't in here the chain of the previous index is kept if the profile is unchanged
+        :param previous: An earlier index, files with the same size and modification time aren't read again
+        """
+        profile_path = Path(profile_path or profile_output_path)
+        if inherits is None:
+            inherits = {}
+        # The name and entry of each indexed file of the previous index
+        previous_entries: dict[str, tuple[str, ProfileEntry]] = {}
+        if previous is not None:
+            for profiles in previous.profiles.values():
+                for name, entry in profiles.items():
+                    previous_entries[entry.path] = (name, entry)
+
+        profiles: dict[str, dict[str, ProfileEntry]] = {x: {} for x in SLICERS}
+        files = stat_profile_files(profile_path)
+        # Sorted, so if two vendors have a profile with the same name the same one is always indexed
+        for rel_path, stat in sorted(files.items()):
+            slicer = rel_path.split("/", 1)[0]
+            # Only files that were indexed by their name are reused, other files may hold a name that was left out
+            # as another vendor has a profile with the same name
+            if previous is not None and previous.files.get(rel_path) == stat and rel_path in previous_entries:
+                name, entry = previous_entries[rel_path]
+                if name in inherits.get(slicer, {}):
+                    entry = ProfileEntry(entry.path, entry.vendor, inherits[slicer][name], entry.content_hash)
+                profiles[slicer].setdefault(name, entry)
+                continue
+
+            data = profile_path.joinpath(rel_path).read_bytes()
+            content_hash = hash_profile(data)
+            profile = None
+            if rel_path.endswith(".json"):
+                try:
+                    profile = json.loads(data)
+                    name = get_profile_name(profile) if isinstance(profile, dict) else None
+                except ValueError:
+                    name = None
+            else:
+                name = rel_path.rsplit("/", 1)[-1].split(".", 1)[0]
+            if not isinstance(name, str):
+                continue
+
+            chain = inherits.get(slicer, {}).get(name)
+            previous_entry = previous_entries[rel_path][1] if rel_path in previous_entries else None
+            if chain is None and previous_entry is not None and previous_entry.content_hash == content_hash:
+                chain = previous_entry.inherits
+            if chain is None:
+                # Profiles that weren't squashed still name what they inherit from
+                parent = profile.get("inherits") if isinstance(profile, dict) else None
+                chain = [x.strip() for x in parent.split(";") if x.strip() != ""] if isinstance(parent, str) else []
+            parts = rel_path.split("/")
+            vendor = parts[1] if len(parts) > 2 else None
+            profiles[slicer].setdefault(name, ProfileEntry(rel_path, vendor, chain, content_hash))
+        return ProfileIndex(profile_path, profiles, files)
+
+    def save(self):
+        """Write the index to the output path, see PROFILE_INDEX_FILE_NAME"""
+        data = {
+            "version": PROFILE_INDEX_VERSION,
+            "profiles": {slicer: {k: v.to_dict() for k, v in profiles.items()}
+                         for slicer, profiles in self.profiles.items()},
+            "files": {k: list(v) for k, v in self.files.items()}
+        }
+        path = self.profile_path.joinpath(PROFILE_INDEX_FILE_NAME)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open(mode="w", encoding="utf8") as f:
+            f.write(json.dumps(data, ensure_ascii=False))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(profile_path: Optional[PathLike] = None) -> Optional['ProfileIndex']:
+        """The saved index of the output path, None if there is none or it's from another version"""
+        profile_path = Path(profile_path or profile_output_path)
+        try:
+            with profile_path.joinpath(PROFILE_INDEX_FILE_NAME).open(mode="r", encoding="utf8") as f:
+                data = json.load(f)
+            if data.get("version") != PROFILE_INDEX_VERSION:
+                return None
+            profiles = {slicer: {k: ProfileEntry.from_dict(v) for k, v in entries.items()}
+                        for slicer, entries in data["profiles"].items()}
+            files = {k: (v[0], v[1]) for k, v in data["files"].items()}
+        except (OSError, ValueError, KeyError, TypeError, IndexError, AttributeError):
+            return None
+        return ProfileIndex(profile_path, profiles, files)
+
+
+def load_profile_index(profile_path: Optional[PathLike] = None, verify: bool = True) -> ProfileIndex:
+    """
+    The index of the extracted profiles, it's rebuilt (and saved again) if it's missing or out of date
+    Only the profiles that changed are read again when rebuilding
+    :param profile_path: The folder the profiles were extracted to, defaults to 'profile_output_path'
+    :param verify: Check if the index is out of date, which stats every file. Without this the saved index is trusted
+    """
+    profile_path = Path(profile_path or profile_output_path)
+    index = ProfileIndex.load(profile_path)
+    if index is not None and (not verify or not index.is_stale()):
+        return index
+
+    index = ProfileIndex.build(profile_path, previous=index)
+    if profile_path.is_dir():
+        try:
+            index.save()
+        except OSError as e:
+            print(f"Failed to save the profile index: {e}")
+    return index
+
+
+def write_profile_index():
+    """Index the extracted profiles along with the inherits chains collected while squashing them"""
+    print("Indexing profiles...")
+    ProfileIndex.build(profile_output_path, profile_inherits).save()
+
+
+def get_inherits_chain(profile_name: str, get_parents: Callable[[str], list[str]]) -> list[str]:
+    """
+    Every profile a profile inherits from, each of its parents followed by what that parent inherits from
+    :param get_parents: Returns the profiles a profile directly inherits from
+    """
+    chain: list[str] = []
+
+    def add_parents(name: str):
+        for parent in get_parents(name):
+            if parent not in chain:
+                chain.append(parent)
+                add_parents(parent)
+
+    add_parents(profile_name)
+    return chain
+
+
 def download_and_extract(slicer_name: str, url: str, member: str, pattern: str, ignore_existing=False):
     """
     :param slicer_name: The name of the slicer
@@ -122,10 +390,14 @@ def split_prusaslicer_bundle(path: Path):
     def cleanse_name(file_name: str) -> str:
         return file_name.replace("/", " ")
 
+    def get_parents(profile_name: str) -> list[str]:
+        return [x.strip() for x in profiles[profile_name].get("inherits", "").split(";") if x.strip() != ""]
+
     for name, data in profiles.items():
         # Profiles that begin with "*" are only for use within the config bundle and should not be exported
         if name.startswith("*"):
             continue
+        profile_inherits.setdefault("prusaslicer", {})[name] = get_inherits_chain(name, get_parents)
         out_path = path.parent.joinpath(f"{cleanse_name(name)}.json")
         data_out = squash_inherits(name)
         data_out["filament_settings_id"] = name
@@ -191,12 +463,8 @@ def squash_slic3r_profiles(slicer_name: str, filament_library_name: Optional[str
             with _item.open() as f:
                 file_data = json.load(f)
 
-            name: str
-            if "name" in file_data:
-                name = file_data["name"]
-            elif "filament_settings_id" in file_data:
-                name = file_data["filament_settings_id"]
-            else:
+            name = get_profile_name(file_data)
+            if name is None:
                 continue
 
             profiles[name] = (_item, file_data)
@@ -248,6 +516,8 @@ def squash_slic3r_profiles(slicer_name: str, filament_library_name: Optional[str
             # Ensure the folder name is in the path so profiles from the filament library aren't exported into vendor folders
             if data.get("instantiation") != "true" or _vendor_folder.name not in path.parts:
                 continue
+            profile_inherits.setdefault(slicer_name.lower(), {})[name] = get_inherits_chain(
+                name, lambda x: [profiles[x][1]["inherits"]] if "inherits" in profiles[x][1] else [])
             path.parent.mkdir(parents=True, exist_ok=True)
             with path.open("w") as f:
                 json.dump(squash_inherits(name), f, indent=4)
@@ -280,6 +550,8 @@ def run():
 
     # TODO: Convert cura XML files to custom json
 
+    write_profile_index()
+
 
 # If running from the command line, provide argument parsing
 if __name__ == "__main__":
@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Union
+
+# jsonschema takes a while to import, so it's only imported once a schema is compiled
+if TYPE_CHECKING:
+    from jsonschema.exceptions import ValidationError
+    from jsonschema.protocols import Validator
+
+PathLike = Union[str, os.PathLike[str]]
+
+SCHEMA_DIR = Path(__file__).parent.joinpath("schemas")
+
+# The schema file used for each kind of JSON file in the database
+# The names are the same as the JSON file names (without the .json extension)
+SCHEMA_FILES = {
+    "store": "store_schema.json",
+    "brand": "brand_schema.json",
+    "material": "material_schema.json",
+    "filament": "filament_schema.json",
+    "variant": "variant_schema.json",
+    "sizes": "sizes_schema.json"
+}
+
+# Keywords that depend on other keywords of the same schema object
+# A $ref target containing any of these is never merged with the keywords next to the $ref
+INTERACTING_KEYWORDS = {
+    "properties", "patternProperties", "additionalProperties", "unevaluatedProperties",
+    "items", "prefixItems", "additionalItems", "unevaluatedItems",
+    "contains", "minContains", "maxContains", "if", "then", "else"
+}
+
+# Drafts where keywords next to a $ref are ignored
+DRAFTS_IGNORING_REF_SIBLINGS = {
+    "http://json-schema.org/draft-03/schema#",
+    "http://json-schema.org/draft-04/schema#",
+    "http://json-schema.org/draft-06/schema#",
+    "http://json-schema.org/draft-07/schema#"
+}
+
+
+# ---------------------------------
+# $ref inlining
+# ---------------------------------
+
+def resolve_pointer(schema: dict, pointer: str) -> Any:
+    """Resolve a local JSON pointer such as '#/definitions/string_limit' against the schema"""
+    node: Any = schema
+    for part in pointer.removeprefix("#").lstrip("/").split("/"):
+        if part == "":
+            continue
+        part = part.replace("~1", "/").replace("~0", "~")
+        node = node[int(part)] if isinstance(node, list) else node[part]
+    return node
+
+
+def inline_refs(schema: dict, siblings_allowed: bool) -> dict:
+    """
+    Returns a copy of the schema where local $refs (those starting with '#') are replaced by what they point to
+    Keywords next to a $ref are kept if the draft of the schema allows them (2019-09 and later),
+    either merged into the resolved schema or combined with it through 'allOf'
+    Recursive $refs are left as they are
+    """
+
+    def inline(node: Any, active: tuple[str, ...]) -> Any:
+        if isinstance(node, list):
+            return [inline(x, active) for x in node]
+        if not isinstance(node, dict):
+            return node
+
+        ref = node.get("$ref")
+        if not isinstance(ref, str) or not ref.startswith("#") or ref in active:
+            return {k: inline(v, active) for k, v in node.items()}
+
+        target = inline(resolve_pointer(schema, ref), active + (ref,))
+        siblings = {k: inline(v, active) for k, v in node.items() if k != "$ref"}
+        if not siblings_allowed or len(siblings) == 0:
+            return target
+        if not isinstance(target, dict):
+            return {**siblings, "allOf": [target]}
+
+        if target.keys().isdisjoint(siblings.keys()) and target.keys().isdisjoint(INTERACTING_KEYWORDS):
+            # Keep the keywords in the order they were in so errors are reported in the same order
+            out = {}
+            for k, v in node.items():
+                if k == "$ref":
+                    out.update(target)
+                else:
+                    out[k] = siblings[k]
+            return out
+
+        out = siblings.copy()
+        out["allOf"] = out.get("allOf", []) + [target]
+        return out
+
+    return inline(schema, ())
+
+
+# ---------------------------------
+# Registry
+# ---------------------------------
+
+class SchemaRegistry:
+    """
+    Loads and compiles each schema on first use and shares the compiled validators between all callers
+    Schemas are referred to by the name of the JSON file they validate (see SCHEMA_FILES)
+    """
+    schema_dir: Path
+
+    def __init__(self, schema_dir: PathLike = SCHEMA_DIR):
+        self.schema_dir = Path(schema_dir)
+        self.__schemas: dict[str, dict] = {}
+        self.__validators: dict[str, 'Validator'] = {}
+        self.__lock = threading.Lock()
+
+    def schema_path(self, name: str) -> Path:
+        if name not in SCHEMA_FILES:
+            raise KeyError(f"There is no schema named '{name}'")
+        return self.schema_dir.joinpath(SCHEMA_FILES[name])
+
+    def schema(self, name: str) -> dict:
+        """Returns the schema as it is stored on disk"""
+        schema = self.__schemas.get(name)
+        if schema is None:
+            with self.__lock:
+                schema = self.__schemas.get(name)
+                if schema is None:
+                    with self.schema_path(name).open(mode="r", encoding="utf8") as f:
+                        schema = json.load(f)
+                    self.__schemas[name] = schema
+        return schema
+
+    def validator(self, name: str) -> 'Validator':
+        """Returns a validator for the schema that is checked and compiled only once"""
+        validator = self.__validators.get(name)
+        if validator is None:
+            from jsonschema.validators import validator_for
+
+            schema = self.schema(name)
+            with self.__lock:
+                validator = self.__validators.get(name)
+                if validator is None:
+                    cls = validator_for(schema)
+                    cls.check_schema(schema)
+                    siblings_allowed = cls.META_SCHEMA.get("$schema", "") not in DRAFTS_IGNORING_REF_SIBLINGS
+                    validator = cls(inline_refs(schema, siblings_allowed))
+                    self.__validators[name] = validator
+        return validator
+
+    def clear(self):
+        """Forget the loaded schemas, so changed schema files are loaded again on next use"""
+        with self.__lock:
+            self.__schemas.clear()
+            self.__validators.clear()
+
+    def iter_errors(self, name: str, document: Any) -> Iterator['ValidationError']:
+        return self.validator(name).iter_errors(document)
+
+    def best_error(self, name: str, document: Any) -> Optional['ValidationError']:
+        """
+        Returns the same error jsonschema.validate() would raise for the document
+        :returns The most relevant error or None if the document is valid
+        """
+        from jsonschema.exceptions import best_match
+
+        validator = self.validator(name)
+        if validator.is_valid(document):
+            return None
+        return best_match(validator.iter_errors(document))
+
+    def is_valid(self, name: str, document: Any) -> bool:
+        return self.validator(name).is_valid(document)
+
+
+# The registry shared by data_validator.py and db_serializer.py
+registry = SchemaRegistry()
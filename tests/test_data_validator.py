@@ -0,0 +1,106 @@
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR.joinpath("benchmarks")))
+
+import data_validator
+from data_validator import VALIDATOR_FILES, ValidationCache, cache_fingerprint, select_changes
+from generate_data import generate_dataset
+
+
+# ---------------------------------
+# Validation cache
+# ---------------------------------
+
+def test_cache_fingerprint_covers_every_validator_file():
+    assert set(cache_fingerprint()["validator"]) == set(VALIDATOR_FILES)
+    assert "schema_registry.py" in VALIDATOR_FILES
+
+
+def test_cache_is_dropped_when_schema_registry_changed(tmp_path: Path):
+    cache_file = tmp_path.joinpath("cache.json")
+    records = {"data/a/brand.json": {"hash": "0", "kind": "brand", "json-files": []}}
+    ValidationCache(dict(records), cache_fingerprint()).save(cache_file)
+    assert ValidationCache.load(cache_file).records == records
+
+    fingerprint = cache_fingerprint()
+    fingerprint["validator"]["schema_registry.py"] = data_validator.hash_bytes(b"an older schema_registry.py")
+    ValidationCache(dict(records), fingerprint).save(cache_file)
+    assert ValidationCache.load(cache_file).records == {}
+
+
+# ---------------------------------
+# Validating changes
+# ---------------------------------
+
+def git(*args: str):
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args], check=True,
+                   capture_output=True)
+
+
+@pytest.fixture
+def repository(tmp_path: Path, monkeypatch) -> Path:
+    """A git repository holding a committed synthetic database, which is the working directory"""
+    generate_dataset(tmp_path, variants=100, stores=5)
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q")
+    git("add", "data", "stores")
+    git("commit", "-q", "-m", "data")
+    return tmp_path
+
+
+def test_changed_file_selects_its_folder(repository: Path):
+    sizes_file = next(Path("data").rglob("sizes.json"))
+    sizes_file.write_text(sizes_file.read_text(encoding="utf8") + "\n", encoding="utf8")
+
+    selection = select_changes("HEAD")
+    assert selection.paths == {sizes_file.parent.as_posix()}
+    assert selection.kinds == set()
+
+
+def test_changed_material_selects_its_filaments(repository: Path):
+    material_file = next(Path("data").rglob("material.json"))
+    material_file.write_text(material_file.read_text(encoding="utf8") + "\n", encoding="utf8")
+
+    selection = select_changes("HEAD")
+    filament_folders = {x.as_posix() for x in material_file.parent.iterdir() if x.is_dir()}
+    assert len(filament_folders) > 0
+    assert selection.paths == {material_file.parent.as_posix()} | filament_folders
+    selected = [x for x in data_validator.scan_unit("brand", material_file.parent.parent).entries
+                if selection.includes(x)]
+    assert {x.folder.as_posix() for x in selected if x.kind == "filament"} == filament_folders
+
+
+def test_changed_store_id_selects_the_sizes_referencing_it(repository: Path):
+    store_file = Path("stores", "store0001", "store.json")
+    store_data = json.loads(store_file.read_text(encoding="utf8"))
+    store_data["id"] = "renamed"
+    store_file.write_text(json.dumps(store_data), encoding="utf8")
+
+    referencing = {x.as_posix() for x in Path("data").rglob("sizes.json") if '"store0001"' in x.read_text("utf8")}
+    assert len(referencing) > 0
+    selection = select_changes("HEAD")
+    assert selection.paths == {store_file.parent.as_posix()} | referencing
+
+
+def test_untracked_and_removed_files_are_selected(repository: Path):
+    variant_folder = next(Path("data").rglob("variant.json")).parent
+    shutil.rmtree(variant_folder)
+    new_folder = Path("stores", "new_store")
+    new_folder.mkdir()
+    new_folder.joinpath("store.json").write_text("{}", encoding="utf8")
+
+    selection = select_changes("HEAD")
+    assert selection.paths == {variant_folder.as_posix(), new_folder.as_posix()}
+
+
+def test_changed_validator_selects_everything(repository: Path):
+    Path("schema_registry.py").write_text("", encoding="utf8")
+    assert select_changes("HEAD") is None
@@ -0,0 +1,135 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from db_columns import ColorIndex, SizeTable, StringColumn
+from db_serializer import Brand, Filament, FilamentSize, FilamentVariant, Material, VariantTraits
+
+
+@pytest.fixture
+def brands() -> list[Brand]:
+    """
+    Two materials, red, green and blue variants and a variant with two colors, the green one has two sizes
+    """
+    brand = Brand("Brand", "https://example.com/", "logo.png", "NL")
+    pla = Material("PLA", default_max_dry_temperature=50)
+    petg = Material("PETG", default_max_dry_temperature=65)
+    brand.materials = [pla, petg]
+
+    pla_filament = Filament(pla, "Basic", 0.02, 1.24, discontinued=True)
+    pla.filaments = [pla_filament]
+    red = FilamentVariant(pla_filament, "Red", "#FF0000", traits=VariantTraits(matte=True))
+    red.sizes = [FilamentSize(1000, 1.75, empty_spool_weight=180, ean="0000000000017")]
+    green = FilamentVariant(pla_filament, "Green", "#00FF00", traits=VariantTraits(matte=True, glow=True))
+    green.sizes = [FilamentSize(750, 1.75, ean="0000000000024"), FilamentSize(1000, 2.85, discontinued=True)]
+    pla_filament.variants = [red, green]
+
+    petg_filament = Filament(petg, "Tough", 0.02, 1.27, max_dry_temperature=70)
+    petg.filaments = [petg_filament]
+    blue = FilamentVariant(petg_filament, "Blue", "#0000FF")
+    blue.sizes = [FilamentSize(1000, 1.75)]
+    duo = FilamentVariant(petg_filament, "Duo", ["#FF0000", "#FFFFFF"])
+    duo.sizes = [FilamentSize(1000, 1.75)]
+    petg_filament.variants = [blue, duo]
+    return [brand]
+
+
+# ---------------------------------
+# Size table
+# ---------------------------------
+
+def test_size_table_has_a_row_for_every_size(brands: list[Brand]):
+    table = SizeTable.from_brands(brands)
+    assert len(table) == 5
+    assert table["filament_weight"].tolist() == [1000, 750, 1000, 1000, 1000]
+    assert table["max_dry_temperature"].tolist() == [50, 50, 50, 70, 70]
+    assert np.isnan(table["empty_spool_weight"][1])
+
+
+def test_size_table_masks(brands: list[Brand]):
+    table = SizeTable.from_brands(brands)
+    mask = (table["diameter"] == 1.75) & (table["filament_weight"] >= 1000)
+    assert [x.diameter for x in table.get_sizes(mask)] == [1.75, 1.75, 1.75]
+    assert [x.color_name for x in table.get_variants(table["material"] == "PLA")] == ["Red", "Green"]
+    # A size is discontinued if it, its variant or its filament is
+    assert table["discontinued"].tolist() == [True, True, True, False, False]
+    assert table.get_rows(~table["discontinued"]).tolist() == [3, 4]
+
+
+def test_size_table_has_traits(brands: list[Brand]):
+    table = SizeTable.from_brands(brands)
+    assert table.has_traits("matte").tolist() == [True, True, True, False, False]
+    assert table.has_traits("matte", "glow").tolist() == [False, True, True, False, False]
+    assert table.has_traits().all()
+
+
+# ---------------------------------
+# String columns
+# ---------------------------------
+
+def test_string_column_compares_every_row():
+    column = StringColumn.from_strings(["a", None, "b", "a"])
+    assert (column == "a").tolist() == [True, False, False, True]
+    assert (column != "a").tolist() == [False, True, True, False]
+    assert column.isin("a", "b").tolist() == [True, False, True, True]
+    assert [column[x] for x in range(len(column))] == ["a", None, "b", "a"]
+
+
+def test_string_column_unknown_value():
+    column = StringColumn.from_strings(["a", "b"])
+    assert (column == "c").tolist() == [False, False]
+    assert (column != "c").tolist() == [True, True]
+    assert column.isin().tolist() == [False, False]
+
+
+def test_string_column_is_not_hashable():
+    with pytest.raises(TypeError):
+        hash(StringColumn.from_strings(["a"]))
+
+
+# ---------------------------------
+# Color index
+# ---------------------------------
+
+def test_nearest_known_distances(brands: list[Brand]):
+    index = ColorIndex.from_brands(brands)
+    nearest = index.nearest("#FF0000", k=4)
+    assert [x.color_name for x, _ in nearest] == ["Red", "Duo", "Green", "Blue"]
+    assert nearest[0][1] == pytest.approx(0, abs=1e-9)
+    # Duo is as close as its closest color, which is red as well
+    assert nearest[1][1] == pytest.approx(0, abs=1e-9)
+    # The ΔE (CIE76) between sRGB red and green and between red and blue
+    assert nearest[2][1] == pytest.approx(170.57, abs=0.05)
+    assert nearest[3][1] == pytest.approx(176.33, abs=0.05)
+
+
+def test_nearest_with_k_larger_than_the_variants(brands: list[Brand]):
+    index = ColorIndex.from_brands(brands)
+    nearest = index.nearest("00FF00", k=100)
+    assert len(nearest) == 4
+    assert nearest[0][0].color_name == "Green"
+    distances = [x for _, x in nearest]
+    assert distances == sorted(distances)
+
+
+def test_nearest_returns_each_variant_once(brands: list[Brand]):
+    index = ColorIndex.from_brands(brands)
+    # Green has a row for each diameter and Duo a row for each color
+    assert len(index.lab) == 6
+    nearest = index.nearest("#FFFFFF", k=4)
+    assert len({id(x) for x, _ in nearest}) == 4
+    assert nearest[0][0].color_name == "Duo"
+    assert nearest[0][1] == pytest.approx(0, abs=1e-9)
+
+
+def test_nearest_filters(brands: list[Brand]):
+    index = ColorIndex.from_brands(brands)
+    assert [x.color_name for x, _ in index.nearest("#FF0000", materials=["PETG"])] == ["Duo", "Blue"]
+    assert [x.color_name for x, _ in index.nearest("#FF0000", diameter=2.85)] == ["Green"]
+    assert [x.color_name for x, _ in index.nearest("#FF0000", traits=["glow"])] == ["Green"]
+    assert index.nearest("#FF0000", materials=["ABS"]) == []
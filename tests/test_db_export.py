@@ -0,0 +1,56 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR.joinpath("benchmarks")))
+
+from db_export import iter_rows
+from db_serializer import Database
+from generate_data import generate_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset_dir(tmp_path_factory) -> Path:
+    """
+    A database where the first brand has a slash in its name, and the second one a name that doesn't match its folder
+    as it has a character that can't be in a folder name
+    """
+    dataset_dir = generate_dataset(tmp_path_factory.mktemp("export"), variants=400, stores=5)
+    data_dir = dataset_dir.joinpath("data")
+    for folder_name, brand_name in (("Brand 0000", "Brand/0000"), ("Brand 0001", "Brand: 0001")):
+        brand_file = data_dir.joinpath(folder_name, "brand.json")
+        brand = json.loads(brand_file.read_text(encoding="utf8"))
+        brand["brand"] = brand_name
+        brand_file.write_text(json.dumps(brand), encoding="utf8")
+    return dataset_dir
+
+
+def get_brands(dataset_dir: Path, brands: list[str], materials=None) -> list[str]:
+    return [x["brand"] for x in iter_rows(Database(dataset_dir), ["brand"], brands=brands, materials=materials)]
+
+
+@pytest.mark.parametrize("name", ["Brand/0000", "Brand 0000"])
+def test_brand_by_name_or_folder_name(dataset_dir: Path, name: str):
+    brands = get_brands(dataset_dir, [name])
+    assert len(brands) > 0
+    assert set(brands) == {"Brand/0000"}
+
+
+def test_brand_by_a_name_that_differs_from_its_folder(dataset_dir: Path):
+    brands = get_brands(dataset_dir, ["Brand: 0001"])
+    assert len(brands) > 0
+    assert set(brands) == {"Brand: 0001"}
+    assert get_brands(dataset_dir, ["Brand 0001"]) == brands
+
+
+def test_brand_and_material(dataset_dir: Path):
+    material = sorted(x.name for x in dataset_dir.joinpath("data", "Brand 0000").iterdir() if x.is_dir())[0]
+    rows = list(iter_rows(Database(dataset_dir), ["brand", "material"], brands=["Brand/0000", "Brand: 0001"],
+                          materials=[material]))
+    assert len(rows) > 0
+    assert {x["material"] for x in rows} == {material}
+    assert get_brands(dataset_dir, ["Brand 9999"]) == []
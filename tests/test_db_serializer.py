@@ -0,0 +1,93 @@
+import gc
+import pickle
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR.joinpath("benchmarks")))
+
+import db_serializer
+from db_serializer import (SNAPSHOT_SOURCE_FILES, Database, FilamentSize, FilamentVariant, Fingerprint, Material,
+                           Store)
+from generate_data import generate_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset_dir(tmp_path_factory) -> Path:
+    return generate_dataset(tmp_path_factory.mktemp("serializer"), variants=100, stores=5)
+
+
+def get_material_folder(dataset_dir: Path) -> Path:
+    return next(dataset_dir.joinpath("data").rglob("material.json")).parent
+
+
+# ---------------------------------
+# Parent links
+# ---------------------------------
+
+def test_child_keeps_its_parent(dataset_dir: Path):
+    with Database(dataset_dir):
+        material = Material.from_folder(get_material_folder(dataset_dir), None)
+    default_max_dry_temperature = material.default_max_dry_temperature
+    filament = material.filaments[0]
+    variant = filament.variants[0]
+    del material, filament
+    gc.collect()
+
+    filament = variant.parent
+    assert filament is not None
+    assert filament.parent is not None
+    assert filament.parent.default_max_dry_temperature == default_max_dry_temperature
+    if filament.max_dry_temperature is None:
+        assert filament.get_max_dry_temperature() == default_max_dry_temperature
+    else:
+        assert filament.get_max_dry_temperature() == filament.max_dry_temperature
+
+
+def test_pickled_children_keep_their_parent(dataset_dir: Path):
+    with Database(dataset_dir):
+        material = Material.from_folder(get_material_folder(dataset_dir), None)
+    copied = pickle.loads(pickle.dumps(material))
+    for filament in copied.filaments:
+        assert filament.parent is copied
+        for variant in filament.variants:
+            assert variant.parent is filament
+
+
+# ---------------------------------
+# Lists
+# ---------------------------------
+
+def test_default_lists_are_separate_lists():
+    variant = FilamentVariant(None, "Red", "#FF0000")
+    size = FilamentSize(1000, 1.75)
+    store = Store("store", "Store", "https://example.com/", "logo.png")
+    for value in (variant.sizes, size.purchase_links, store.ships_from, store.ships_to):
+        assert value == []
+        assert isinstance(value, list)
+    variant.sizes.append(size)
+    assert FilamentVariant(None, "Blue", "#0000FF").sizes == []
+
+
+# ---------------------------------
+# Snapshots
+# ---------------------------------
+
+@pytest.mark.parametrize("name", SNAPSHOT_SOURCE_FILES)
+def test_fingerprint_covers_the_source_files(dataset_dir: Path, tmp_path: Path, monkeypatch, name: str):
+    assert "schema_registry.py" in SNAPSHOT_SOURCE_FILES
+    for source_name in SNAPSHOT_SOURCE_FILES:
+        shutil.copy(ROOT_DIR.joinpath(source_name), tmp_path.joinpath(source_name))
+    monkeypatch.setattr(db_serializer, "__file__", str(tmp_path.joinpath("db_serializer.py")))
+    before = Fingerprint(dataset_dir)
+    content_hash = before.content_hash
+
+    with tmp_path.joinpath(name).open(mode="a", encoding="utf8") as f:
+        f.write("\n# changed\n")
+    after = Fingerprint(dataset_dir)
+    assert after.stat_hash != before.stat_hash
+    assert after.content_hash != content_hash
@@ -0,0 +1,74 @@
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR.joinpath("benchmarks")))
+
+from db_serializer import Database, FilamentVariant, load_database
+from db_sqlite import TABLES, export_sqlite, get_rows
+from generate_data import generate_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset_dir(tmp_path_factory) -> Path:
+    return generate_dataset(tmp_path_factory.mktemp("sqlite"), variants=100, stores=5)
+
+
+def read_tables(output_file: Path) -> dict[str, set[tuple]]:
+    connection = sqlite3.connect(output_file)
+    try:
+        return {table: set(connection.execute(f"SELECT * FROM {table}")) for table in TABLES}
+    finally:
+        connection.close()
+
+
+def test_incremental_export_matches_a_full_export(dataset_dir: Path, tmp_path: Path):
+    database = load_database(dataset_dir, processes=False)
+    output_file = tmp_path.joinpath("database.sqlite")
+    counts = export_sqlite(database, output_file)
+    assert all(removed == 0 for _, removed in counts.values())
+    assert counts["variants"][0] == 100
+
+    # Nothing changed
+    counts = export_sqlite(database, output_file, incremental=True)
+    assert counts == {table: (0, 0) for table in TABLES}
+
+    variants = [x for brand in database.brands for material in brand.materials for filament in material.filaments
+                for x in filament.variants]
+    changed = variants[0]
+    changed.sizes[0].filament_weight += 1
+    removed = variants[1]
+    assert len(removed.sizes) > 0
+    removed.parent.variants.remove(removed)
+    added = FilamentVariant(changed.parent, "Added", "#123456")
+    changed.parent.variants.append(added)
+
+    counts = export_sqlite(database, output_file, incremental=True)
+    assert counts["stores"] == (0, 0)
+    assert counts["brands"] == (0, 0)
+    assert counts["materials"] == (0, 0)
+    assert counts["filaments"] == (0, 0)
+    assert counts["variants"] == (1, 1)
+    assert counts["sizes"] == (1, len(removed.sizes))
+    assert counts["purchase_links"] == (0, sum(len(x.purchase_links) for x in removed.sizes))
+
+    full_file = tmp_path.joinpath("full.sqlite")
+    export_sqlite(database, full_file)
+    assert read_tables(output_file) == read_tables(full_file)
+
+
+def test_names_with_the_same_id_are_refused(dataset_dir: Path):
+    database = Database(dataset_dir)
+    with database:
+        database.brands = database.load_brands()
+    filament = database.brands[0].materials[0].filaments[0]
+    variant = filament.variants[0]
+    filament.variants.append(FilamentVariant(filament, f" {variant.color_name}/", "#123456"))
+
+    with pytest.raises(ValueError, match=re.escape(f"{variant.color_name!r} and ' {variant.color_name}/'")):
+        get_rows(database.stores, database.brands)
@@ -0,0 +1,116 @@
+import json
+import sys
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from db_serializer import Brand, load_database
+from export_profiles import EXPORT_MANIFEST_FILE_NAME, check_output_dir, export_profiles, read_manifest
+
+PROFILES_DIR = ROOT_DIR.joinpath("profiles")
+
+
+@pytest.fixture
+def brands() -> list[Brand]:
+    """The brands of the repository that have slicer settings"""
+    with redirect_stdout(StringIO()):
+        database = load_database(ROOT_DIR, processes=False)
+    brands = [x for x in database.brands
+              if any(filament.slicer_settings for material in x.materials for filament in material.filaments)]
+    assert len(brands) > 0
+    return brands
+
+
+def remove_filament(brands: list[Brand]):
+    """Remove a filament with BambuStudio settings, along with the profiles exported for it"""
+    for brand in brands:
+        for material in brand.materials:
+            for filament in material.filaments:
+                if filament.get_slicer_data("bambustudio") is not None:
+                    material.filaments.remove(filament)
+                    return
+    raise AssertionError("No filament has BambuStudio settings")
+
+
+def export(brands: list[Brand], output_dir: Path, **kwargs) -> list[Path]:
+    with redirect_stdout(StringIO()):
+        return export_profiles(brands, output_dir, PROFILES_DIR, workers=1, **kwargs)
+
+
+# ---------------------------------
+# Output folder
+# ---------------------------------
+
+@pytest.mark.parametrize("output_dir", [PROFILES_DIR, ROOT_DIR, PROFILES_DIR.joinpath("exported"),
+                                        PROFILES_DIR.joinpath("orcaslicer", "..")])
+def test_output_dir_overlapping_the_profiles_is_refused(output_dir: Path):
+    with pytest.raises(ValueError):
+        check_output_dir(output_dir, PROFILES_DIR)
+    with pytest.raises(ValueError):
+        export_profiles([], output_dir, PROFILES_DIR)
+
+
+def test_output_dir_next_to_the_profiles_is_allowed(tmp_path: Path):
+    check_output_dir(tmp_path, PROFILES_DIR)
+    check_output_dir(ROOT_DIR.joinpath("exported_profiles"), PROFILES_DIR)
+
+
+# ---------------------------------
+# Removing files
+# ---------------------------------
+
+def test_only_files_of_the_last_export_are_removed(brands: list[Brand], tmp_path: Path):
+    export(brands, tmp_path)
+    first = read_manifest(tmp_path)
+    assert len(first) > 0
+    assert all(tmp_path.joinpath(x).is_file() for x in first)
+
+    # Files that weren't exported, next to the exported ones and in the folder itself
+    slicer_folder = tmp_path.joinpath(first[0]).parent
+    placed = [slicer_folder.joinpath("placed.json"), tmp_path.joinpath("placed.txt")]
+    for path in placed:
+        path.write_text("placed", encoding="utf8")
+
+    remove_filament(brands)
+    changed = export(brands, tmp_path)
+    second = read_manifest(tmp_path)
+    removed = set(first) - set(second)
+    assert len(removed) > 0
+    assert set(second) < set(first)
+    assert all(not tmp_path.joinpath(x).exists() for x in removed)
+    assert all(tmp_path.joinpath(x).is_file() for x in second)
+    assert {tmp_path.joinpath(x) for x in removed} <= set(changed)
+    assert all(x.read_text(encoding="utf8") == "placed" for x in placed)
+
+
+def test_files_of_other_slicers_are_kept(brands: list[Brand], tmp_path: Path):
+    export(brands, tmp_path)
+    first = read_manifest(tmp_path)
+    others = [x for x in first if not x.startswith("prusaslicer/")]
+    assert len(others) > 0
+
+    remove_filament(brands)
+    export(brands, tmp_path, slicers=["prusaslicer"])
+    second = read_manifest(tmp_path)
+    assert set(others) <= set(second)
+    assert len(second) == len(first)
+    assert all(tmp_path.joinpath(x).is_file() for x in others)
+
+
+def test_manifest_entries_outside_the_folder_are_ignored(brands: list[Brand], tmp_path: Path):
+    output_dir = tmp_path.joinpath("output")
+    outside = tmp_path.joinpath("prusaslicer", "outside.ini")
+    outside.parent.mkdir()
+    outside.write_text("outside", encoding="utf8")
+    output_dir.mkdir()
+    files = ["../prusaslicer/outside.ini", str(outside), "prusaslicer/../../prusaslicer/outside.ini"]
+    output_dir.joinpath(EXPORT_MANIFEST_FILE_NAME).write_text(json.dumps({"files": files}), encoding="utf8")
+    assert read_manifest(output_dir) == []
+
+    export(brands, output_dir)
+    assert outside.read_text(encoding="utf8") == "outside"
@@ -0,0 +1,137 @@
+import gc
+import json
+import sys
+import weakref
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR.joinpath("benchmarks")))
+
+from db_serializer import IDENTIFIER_KINDS, Database, Filament, FilamentSize, FilamentVariant
+from generate_data import generate_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset_dir(tmp_path_factory) -> Path:
+    return generate_dataset(tmp_path_factory.mktemp("lazy"), variants=200, stores=5)
+
+
+def load_database(dataset_dir: Path) -> Database:
+    """Loads lazily, keeping a single list of children loaded so every other list is dropped right away"""
+    database = Database(dataset_dir)
+    database.brands = database.load_brands(lazy=True, max_loaded=1)
+    return database
+
+
+def test_add_survives_dropping_the_list(dataset_dir: Path):
+    database = load_database(dataset_dir)
+    brand = database.brands[0]
+    material = brand.materials[0]
+    filament_count = len(material.filaments)
+    filament = Filament(material, "Added", 0.02, 1.24)
+    database.add(filament, material)
+    del material
+    gc.collect()
+
+    # Loading other lists would drop the changed ones if they weren't kept
+    for other in database.brands[1:]:
+        for other_material in other.materials:
+            assert other_material.filaments is not None
+    gc.collect()
+
+    filaments = brand.materials[0].filaments
+    assert len(filaments) == filament_count + 1
+    assert filaments[-1] is filament
+
+
+def test_add_to_a_variant_keeps_every_list_above_it(dataset_dir: Path):
+    database = load_database(dataset_dir)
+    brand = database.brands[0]
+    variant = brand.materials[0].filaments[0].variants[0]
+    size = FilamentSize(1000, 1.75, ean="0000000000017")
+    database.add(size, variant)
+    del variant
+    gc.collect()
+
+    for other in database.brands[1:]:
+        for other_material in other.materials:
+            assert other_material.filaments is not None
+    gc.collect()
+
+    assert brand.materials[0].filaments[0].variants[0].sizes[-1] is size
+
+
+def test_remove_survives_dropping_the_list(dataset_dir: Path):
+    database = load_database(dataset_dir)
+    brand = database.brands[0]
+    filament = brand.materials[0].filaments[0]
+    variant_count = len(filament.variants)
+    removed = filament.variants[0]
+    database.remove(removed, filament)
+    del filament
+    gc.collect()
+
+    for other in database.brands[1:]:
+        for other_material in other.materials:
+            assert other_material.filaments is not None
+    gc.collect()
+
+    variants = brand.materials[0].filaments[0].variants
+    assert len(variants) == variant_count - 1
+    assert all(x is not removed for x in variants)
+
+
+def test_identifier_index_matches_after_dropping(dataset_dir: Path):
+    database = load_database(dataset_dir)
+    identifiers = database.identifiers
+    brand = database.brands[0]
+    variant = brand.materials[0].filaments[0].variants[0]
+    assert isinstance(variant, FilamentVariant)
+    database.add(FilamentSize(1000, 1.75, ean="0000000000024"), variant)
+    del variant
+    gc.collect()
+
+    location = identifiers.find("ean", "0000000000024")
+    assert location is not None
+    assert location.brand is brand
+    assert location.material is brand.materials[0]
+    assert location.filament is brand.materials[0].filaments[0]
+    assert location.variant is brand.materials[0].filaments[0].variants[0]
+
+
+@pytest.fixture(scope="module")
+def unindexed_dataset_dir(tmp_path_factory) -> Path:
+    """A database where no size has an identifier, so the identifier index doesn't hold any material"""
+    dataset_dir = generate_dataset(tmp_path_factory.mktemp("unindexed"), variants=200, stores=5)
+    for sizes_file in dataset_dir.joinpath("data").rglob("sizes.json"):
+        sizes = json.loads(sizes_file.read_text(encoding="utf8"))
+        for size in sizes:
+            for kind in IDENTIFIER_KINDS:
+                size.pop(kind, None)
+        sizes_file.write_text(json.dumps(sizes), encoding="utf8")
+    return dataset_dir
+
+
+def test_identifier_index_finds_the_brand_of_a_reloaded_material(unindexed_dataset_dir: Path):
+    database = load_database(unindexed_dataset_dir)
+    identifiers = database.identifiers
+    brand = database.brands[0]
+    dropped = weakref.ref(brand.materials[0])
+    # Loading the filaments of the other materials drops the list of materials
+    for other_material in brand.materials[1:]:
+        assert other_material.filaments is not None
+    gc.collect()
+    assert dropped() is None
+
+    # Loaded again as a new object, which the index didn't see before
+    material = brand.materials[0]
+    variant = material.filaments[0].variants[0]
+    database.add(FilamentSize(1000, 1.75, ean="0000000000031"), variant)
+
+    location = identifiers.find("ean", "0000000000031")
+    assert location is not None
+    assert location.brand is brand
+    assert location.material is material
@@ -0,0 +1,94 @@
+import copy
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from jsonschema.validators import validator_for
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from schema_registry import SCHEMA_DIR, SCHEMA_FILES, SchemaRegistry
+
+
+def get_errors(validator, document) -> set[tuple[tuple, str]]:
+    return {(tuple(x.absolute_path), x.message) for x in validator.iter_errors(document)}
+
+
+def get_documents(name: str) -> list:
+    """Every file of the kind in the repository, along with copies that miss a key or have a value of another type"""
+    documents = []
+    for folder in (ROOT_DIR.joinpath("data"), ROOT_DIR.joinpath("stores")):
+        for path in sorted(folder.rglob(f"{name}.json"))[:50]:
+            with path.open(mode="r", encoding="utf8") as f:
+                documents.append(json.load(f))
+
+    broken = []
+    for document in documents[:5]:
+        items = document if isinstance(document, list) else [document]
+        for item in items[:1]:
+            for key in item:
+                for value in (None, 12345, "x", [], {}):
+                    changed = copy.deepcopy(item)
+                    changed[key] = value
+                    broken.append([changed] if isinstance(document, list) else changed)
+                missing = {k: v for k, v in item.items() if k != key}
+                broken.append([missing] if isinstance(document, list) else missing)
+    return documents + broken
+
+
+def write_schema(schema_dir: Path, schema: dict) -> SchemaRegistry:
+    schema_dir.joinpath(SCHEMA_FILES["store"]).write_text(json.dumps(schema), encoding="utf8")
+    return SchemaRegistry(schema_dir)
+
+
+@pytest.mark.parametrize("name", list(SCHEMA_FILES))
+def test_inlined_schemas_match_ref_resolution(name: str):
+    registry = SchemaRegistry()
+    with SCHEMA_DIR.joinpath(SCHEMA_FILES[name]).open(mode="r", encoding="utf8") as f:
+        schema = json.load(f)
+    resolving = validator_for(schema)(schema)
+    documents = get_documents(name)
+    assert len(documents) > 0
+    for document in documents:
+        assert registry.is_valid(name, document) == resolving.is_valid(document)
+        assert get_errors(registry.validator(name), document) == get_errors(resolving, document)
+
+
+def test_draft_07_ignores_ref_siblings(tmp_path: Path):
+    schema = {
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "definitions": {"name": {"type": "string"}},
+        "type": "object",
+        "properties": {"name": {"$ref": "#/definitions/name", "maxLength": 3}}
+    }
+    registry = write_schema(tmp_path, schema)
+    resolving = validator_for(schema)(schema)
+    for document in ({"name": "abc"}, {"name": "too long"}, {"name": 1}):
+        assert registry.is_valid("store", document) == resolving.is_valid(document)
+        assert get_errors(registry.validator("store"), document) == get_errors(resolving, document)
+    assert registry.is_valid("store", {"name": "too long"})
+
+
+def test_2020_12_keeps_ref_siblings(tmp_path: Path):
+    schema = {
+        "$schema": "https://json-schema.org/draft/2020-12/schema",
+        "$defs": {
+            "name": {"type": "string"},
+            "object": {"type": "object", "properties": {"a": {"type": "integer"}}}
+        },
+        "type": "object",
+        "properties": {
+            "name": {"$ref": "#/$defs/name", "maxLength": 3},
+            "nested": {"$ref": "#/$defs/object", "properties": {"b": {"type": "string"}}, "required": ["a"]}
+        }
+    }
+    registry = write_schema(tmp_path, schema)
+    resolving = validator_for(schema)(schema)
+    documents = [{"name": "abc"}, {"name": "too long"}, {"name": 1}, {"nested": {"a": 1, "b": "x"}},
+                 {"nested": {"a": "x", "b": 1}}, {"nested": {"b": "x"}}]
+    for document in documents:
+        assert registry.is_valid("store", document) == resolving.is_valid(document)
+        assert get_errors(registry.validator("store"), document) == get_errors(resolving, document)
+    assert not registry.is_valid("store", {"name": "too long"})